@@ -1,15 +1,19 @@
-import fitz  # PyMuPDF
 import re
 import os
+import hashlib
 import logging
-from tqdm import tqdm
-MODULE_PATH = "/home/guzhouhong/cxz/paper_agent"
+from typing import Optional
+
+from tool.profiler import TRACER
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-os.chdir(MODULE_PATH)
+# 数据集相关句子的筛选模式，PDF与LaTeX/HTML提取器共用
+DATASET_PATTERN = re.compile(r'\b(dataset(s)?|data(\s+)?set|corpus|benchmark|training\s+data|test\s+set|repository|collection|evaluation\s+data)\b', re.IGNORECASE)
+URL_PATTERN = re.compile(r'https?://\S+', re.IGNORECASE)
+REFERENCE_PATTERN = re.compile(r'\b(github|huggingface|kaggle|zenodo|figshare|uci|openml)\b', re.IGNORECASE)
 
 
 # class ExtractDatasetName:
@@ -37,52 +41,182 @@ os.chdir(MODULE_PATH)
 #         self.doc.close()
 
 
+def source_name(source, default: str = "<memory>") -> str:
+    """PDF输入的显示名称：路径取文件名，文件对象取其name属性，内存数据返回default"""
+    if isinstance(source, (PdfSource, ExtractDatasetName)):
+        return source.name
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.basename(os.fspath(source))
+    name = getattr(source, "name", None)
+    if isinstance(name, str) and name:
+        return os.path.basename(name)
+    return default
+
+
+class PdfSource:
+    """PDF输入的统一封装，PyMuPDF与内容哈希共用同一块缓冲区
+
+    支持：
+      - 文件路径：以只读mmap映射文件，不整体读入内存
+      - bytes / bytearray / memoryview：直接使用，不复制
+      - mmap.mmap：取其memoryview
+      - 文件对象：BytesIO 取 getbuffer()；位于开头的普通文件映射其文件描述符；
+        其余流（如 tarfile.extractfile、网络响应）读入内存一次
+    content_hash() 对同一缓冲区计算SHA-256，不需要再次读取文件。
+    """
+    def __init__(self, source, name: Optional[str] = None):
+        import mmap
+        self.path: Optional[str] = None
+        self._mmap = None
+        self.buffer: Optional[memoryview] = None
+        self._hash: Optional[str] = None
+        self.name = name or source_name(source)
+
+        if isinstance(source, (str, os.PathLike)):
+            self.path = os.fspath(source)
+            with open(self.path, 'rb') as f:
+                try:
+                    self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                except ValueError:
+                    # 空文件无法映射，交给PyMuPDF按路径打开并报告错误
+                    self._mmap = None
+        elif isinstance(source, mmap.mmap):
+            self.buffer = memoryview(source)
+        elif isinstance(source, (bytes, bytearray, memoryview)):
+            self.buffer = memoryview(source)
+        elif hasattr(source, "getbuffer"):
+            self.buffer = source.getbuffer()
+        elif hasattr(source, "read"):
+            self._mmap = self._map_file(source)
+            if self._mmap is None:
+                self.buffer = memoryview(source.read())
+        else:
+            raise TypeError(f"不支持的PDF输入类型: {type(source).__name__}")
+        if self._mmap is not None:
+            self.buffer = memoryview(self._mmap)
+
+    @staticmethod
+    def _map_file(stream):
+        """位于文件开头的普通文件直接映射其文件描述符，避免读入内存"""
+        import mmap
+        try:
+            if stream.tell() != 0:
+                return None
+            return mmap.mmap(stream.fileno(), 0, access=mmap.ACCESS_READ)
+        except (AttributeError, OSError, ValueError):
+            return None
+
+    @property
+    def size(self) -> int:
+        if self.buffer is not None:
+            return self.buffer.nbytes
+        return os.path.getsize(self.path) if self.path else 0
+
+    def content_hash(self) -> str:
+        """PDF内容的SHA-256（十六进制），在打开文档所用的同一缓冲区上计算"""
+        if self._hash is None:
+            if self.buffer is None:
+                # 只有无法映射的空文件会走到这里
+                with open(self.path, 'rb') as f:
+                    self._hash = hashlib.sha256(f.read()).hexdigest()
+            else:
+                self._hash = hashlib.sha256(self.buffer).hexdigest()
+        return self._hash
+
+    def open_document(self):
+        """用PyMuPDF打开文档"""
+        import fitz  # PyMuPDF
+        if self.buffer is None:
+            return fitz.open(self.path)
+        return fitz.open(stream=self.buffer, filetype="pdf")
+
+    def close(self):
+        """释放缓冲区和文件映射；必须在文档关闭之后调用"""
+        if self.buffer is not None:
+            try:
+                self.buffer.release()
+            except BufferError:
+                # 仍有其他对象引用该缓冲区，等待垃圾回收
+                return
+            self.buffer = None
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                pass
+            self._mmap = None
+
+
 class ExtractDatasetName:
-    def __init__(self, pdf_path):
-        self.pdf_path = pdf_path
+    def __init__(self, pdf_path, name: Optional[str] = None):
+        """
+        Args:
+            pdf_path: PDF文件路径、bytes/bytearray/memoryview、mmap、文件对象或 PdfSource
+            name: 内存输入的显示名称（日志、追踪中使用）
+        """
+        self.source = pdf_path if isinstance(pdf_path, PdfSource) else PdfSource(pdf_path, name)
+        self.name = self.source.name
+        # 路径输入时保持为原路径，内存输入时为显示名称
+        self.pdf_path = self.source.path or self.name
         try:
-            self.doc = fitz.open(pdf_path)
-            logger.info(f"成功打开PDF文件: {pdf_path}, 共{len(self.doc)}页")
+            with TRACER.span("pdf_open", path=self.name) as span:
+                self.doc = self.source.open_document()
+                span["pages"] = len(self.doc)
+                span["bytes"] = self.source.size
+            logger.info(f"成功打开PDF文件: {self.pdf_path}, 共{len(self.doc)}页")
         except Exception as e:
             logger.error(f"打开PDF文件失败: {str(e)}")
+            self.source.close()
             raise
             
         # 预编译正则表达式模式 - 增强数据集识别能力
-        self.dataset_pattern = re.compile(r'\b(dataset(s)?|data(\s+)?set|corpus|benchmark|training\s+data|test\s+set|repository|collection|evaluation\s+data)\b', re.IGNORECASE)
-        self.url_pattern = re.compile(r'https?://\S+', re.IGNORECASE)
-        self.reference_pattern = re.compile(r'\b(github|huggingface|kaggle|zenodo|figshare|uci|openml)\b', re.IGNORECASE)
+        self.dataset_pattern = DATASET_PATTERN
+        self.url_pattern = URL_PATTERN
+        self.reference_pattern = REFERENCE_PATTERN
     
     def extract_sentences(self, max_sentences=None):
         """提取与数据集相关的句子，增加进度条显示和更多筛选条件"""
+        from tqdm import tqdm
         dataset_sentences = []
+        # 与返回的句子一一对应的页码（从1开始），供提及索引使用
+        self.sentence_pages = []
         
         # 使用tqdm添加进度条
         for page in tqdm(self.doc, desc="处理PDF页面"):
-            text = page.get_text("text").replace('\n', ' ').strip()
-            # 分割句子
-            sentences = re.split(r'[.!?]', text)
+            with TRACER.span("page_text", page=page.number) as span:
+                text = page.get_text("text").replace('\n', ' ').strip()
+                span["chars"] = len(text)
             
-            # 过滤与数据集相关的句子
-            for sentence in sentences:
-                sentence = sentence.strip()
-                if not sentence:
-                    continue
-                    
-                # 增加对表格和引用部分的识别
-                if (self.dataset_pattern.search(sentence) or 
-                    self.url_pattern.search(sentence) or 
-                    self.reference_pattern.search(sentence)):
-                    dataset_sentences.append(sentence)
-                    
-                # 如果设置了限制则提前返回
-                if max_sentences and len(dataset_sentences) >= max_sentences:
-                    break
+            with TRACER.span("sentence_filter", page=page.number) as span:
+                # 分割句子
+                sentences = re.split(r'[.!?]', text)
+                matched = len(dataset_sentences)
+                
+                # 过滤与数据集相关的句子
+                for sentence in sentences:
+                    sentence = sentence.strip()
+                    if not sentence:
+                        continue
+                        
+                    # 增加对表格和引用部分的识别
+                    if (self.dataset_pattern.search(sentence) or 
+                        self.url_pattern.search(sentence) or 
+                        self.reference_pattern.search(sentence)):
+                        dataset_sentences.append(sentence)
+                        self.sentence_pages.append(page.number + 1)
+                        
+                    # 如果设置了限制则提前返回
+                    if max_sentences and len(dataset_sentences) >= max_sentences:
+                        break
+                span["sentences"] = len(sentences)
+                span["matched"] = len(dataset_sentences) - matched
         
         logger.info(f"已提取{len(dataset_sentences)}个相关句子")
         return dataset_sentences
     
     def extract_tables(self):
         """提取PDF中的表格数据"""
+        from tqdm import tqdm
         table_data = []
         try:
             for page in tqdm(self.doc, desc="提取表格"):
@@ -91,9 +225,10 @@ class ExtractDatasetName:
                 if tables and tables.tables:
                     for table in tables.tables:
                         cells = []
-                        for row in table.cells:
+                        # table.extract() 按行返回单元格文本（table.cells 只是单元格坐标）
+                        for row in table.extract():
                             if row:
-                                row_text = [cell.text.strip() for cell in row if cell]
+                                row_text = [cell.strip() for cell in row if cell]
                                 cells.append(row_text)
                         if cells:
                             table_data.append(cells)
@@ -116,11 +251,22 @@ class ExtractDatasetName:
             logger.warning(f"元数据提取失败: {str(e)}")
             return {}
             
+    def content_hash(self) -> str:
+        """PDF内容的SHA-256，可用作缓存键"""
+        return self.source.content_hash()
+
+    def close(self):
+        """关闭文档并释放输入缓冲区"""
+        if getattr(self, 'doc', None):
+            self.doc.close()
+            self.doc = None
+            logger.debug(f"已关闭PDF文件: {self.pdf_path}")
+        if hasattr(self, 'source'):
+            self.source.close()
+
     def __del__(self):
         try:
-            if hasattr(self, 'doc') and self.doc:
-                self.doc.close()
-                logger.debug(f"已关闭PDF文件: {self.pdf_path}")
+            self.close()
         except Exception as e:
             logger.error(f"关闭PDF文件失败: {str(e)}")
 
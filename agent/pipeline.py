@@ -0,0 +1,233 @@
+import os
+import time
+import asyncio
+import logging
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Any, Callable, Iterable
+
+from tool.profiler import TRACER
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 队列结束标记
+_DONE = object()
+
+
+def parse_pdf_stage(pdf_path: str) -> Dict[str, Any]:
+    """解析阶段：在子进程中提取数据集相关句子（CPU密集），按文件类型选择提取器"""
+    from agent.source import create_extractor
+    extractor = create_extractor(pdf_path)
+    sentences = extractor.extract_sentences()
+    return {"sentences": sentences, "pages": extractor.sentence_pages}
+
+
+class StageMetrics:
+    """单个流水线阶段的统计：处理数量、错误数、累计耗时和输入队列深度"""
+    def __init__(self, name: str):
+        self.name = name
+        self.processed = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self._depth_sum = 0
+        self._samples = 0
+
+    def sample(self, depth: int):
+        self.max_depth = max(self.max_depth, depth)
+        self._depth_sum += depth
+        self._samples += 1
+
+    def summary(self) -> Dict[str, Any]:
+        return {
+            "processed": self.processed,
+            "errors": self.errors,
+            "busy_seconds": round(self.busy_seconds, 3),
+            "max_queue_depth": self.max_depth,
+            "avg_queue_depth": round(self._depth_sum / self._samples, 2) if self._samples else 0.0
+        }
+
+
+class PaperPipeline:
+    """目录处理的分阶段流水线
+
+    三个阶段通过有界队列相连，使CPU、LLM和网络同时工作：
+      1. 解析：进程池中解析PDF、筛选句子
+      2. LLM：异步阶段并发调用LLM提取数据集名称和下载信息
+      3. 下载：提交到线程池下载队列（tool.download_queue.DownloadQueue）
+    下游队列满时上游阶段阻塞（背压），不会无限制地积压已解析的论文。
+    """
+    def __init__(self, llm_client, registry=None, download_queue=None, parse_workers: Optional[int] = None,
+                 llm_concurrency: int = 4, queue_size: int = 8,
+                 parse_func: Callable[[str], Dict[str, Any]] = parse_pdf_stage,
+                 on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None, index=None, fanout=None):
+        self.llm_client = llm_client
+        self.registry = registry
+        # 数据集提及索引（tool.mention_index.MentionIndex），LLM阶段完成后增量更新
+        self.index = index
+        # 按数据集拆分查询下载信息（model.model.DownloadInfoFanout），每个数据集解析后立即提交下载
+        self.fanout = fanout
+        self.download_queue = download_queue
+        self.parse_workers = (os.cpu_count() or 1) if parse_workers is None else parse_workers
+        self.llm_concurrency = max(1, llm_concurrency)
+        self.queue_size = max(1, queue_size)
+        self.parse_func = parse_func
+        # 每篇论文全部阶段完成后的回调，如写入检查点
+        self.on_result = on_result
+        self.metrics = {name: StageMetrics(name) for name in ("parse", "llm", "download")}
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def run(self, pdf_files: Iterable[Path]) -> Dict[str, Dict[str, Any]]:
+        """处理所有PDF，返回与process_directory相同格式的结果
+
+        pdf_files 可以是惰性的迭代器（如租约队列逐个领取的论文），解析阶段取用时才会推进。
+        """
+        start = time.perf_counter()
+        self._order: List[str] = []
+        asyncio.run(self._run(pdf_files))
+        # 按输入顺序整理结果，保证输出稳定
+        self.results = {name: self.results[name] for name in self._order if name in self.results}
+        elapsed = time.perf_counter() - start
+        logger.info(f"流水线处理完成: {len(self._order)}篇论文, 耗时{elapsed:.1f}秒")
+        for name, stats in self.stats().items():
+            logger.info(f"  阶段 {name}: {stats}")
+        return self.results
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """各阶段统计信息"""
+        return {name: metrics.summary() for name, metrics in self.metrics.items()}
+
+    def _finish(self, name: str, result: Dict[str, Any]):
+        """记录一篇论文的最终结果"""
+        self.results[name] = result
+        if self.on_result is not None:
+            try:
+                self.on_result(name, result)
+            except Exception as e:
+                logger.error(f"保存 {name} 的结果失败: {str(e)}")
+
+    def _analyze(self, pdf_path: str, parsed: Dict[str, Any]) -> Dict[str, Any]:
+        """LLM阶段的同步部分：提取数据集名称并获取下载信息"""
+        from model.model import PaperAnalyzer, parse_dataset_names
+        sentences = parsed["sentences"]
+        futures = {}
+        def submit_download(name: str, info: Any):
+            futures[name] = self.download_queue.submit(name, info)
+        early = self.fanout is not None and self.download_queue is not None
+        with TRACER.paper(Path(pdf_path).name):
+            analyzer = PaperAnalyzer(pdf_path, self.llm_client, self.registry, self.fanout)
+            dataset_names = analyzer.extract_dataset_names(sentences)
+            download_info = analyzer.get_dataset_download_info(dataset_names, "\n".join(sentences),
+                                                               submit_download if early else None)
+        if self.index is not None:
+            self.index.add_paper(Path(pdf_path).name, parse_dataset_names(dataset_names), download_info,
+                                 sentences, parsed.get("pages"), pdf_path)
+        result = {"dataset_names": dataset_names, "download_info": download_info, "download_results": {}}
+        if early:
+            # 下载已在LLM阶段逐个提交，下载阶段只需等待
+            result["download_futures"] = futures
+        return result
+
+    async def _run(self, pdf_files: Iterable[Path]):
+        loop = asyncio.get_running_loop()
+        parsed_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        download_queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        pending = iter(pdf_files)
+
+        if self.parse_workers > 0:
+            parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers)
+        else:
+            # parse_workers=0 时在线程中解析，适用于无法使用多进程的环境
+            parse_executor = ThreadPoolExecutor(max_workers=1)
+        llm_executor = ThreadPoolExecutor(max_workers=self.llm_concurrency, thread_name_prefix="llm")
+
+        async def parse_worker():
+            metrics = self.metrics["parse"]
+            for pdf_file in pending:
+                self._order.append(pdf_file.name)
+                started = time.perf_counter()
+                try:
+                    parsed = await loop.run_in_executor(parse_executor, self.parse_func, str(pdf_file))
+                    metrics.processed += 1
+                except Exception as e:
+                    logger.error(f"处理 {pdf_file.name} 失败: {str(e)}")
+                    self._finish(pdf_file.name, {"error": str(e)})
+                    metrics.errors += 1
+                    continue
+                finally:
+                    metrics.busy_seconds += time.perf_counter() - started
+                    # 解析在子进程中进行，这里只记录整体耗时
+                    TRACER.record("parse", started, time.perf_counter(), paper=pdf_file.name)
+                # 队列满时在此等待，形成背压
+                await parsed_queue.put((pdf_file, parsed))
+
+        async def llm_worker():
+            metrics = self.metrics["llm"]
+            while True:
+                item = await parsed_queue.get()
+                if item is _DONE:
+                    break
+                pdf_file, parsed = item
+                started = time.perf_counter()
+                try:
+                    result = await loop.run_in_executor(llm_executor, self._analyze, str(pdf_file), parsed)
+                    metrics.processed += 1
+                except Exception as e:
+                    logger.error(f"处理 {pdf_file.name} 失败: {str(e)}")
+                    self._finish(pdf_file.name, {"error": str(e)})
+                    metrics.errors += 1
+                    continue
+                finally:
+                    metrics.busy_seconds += time.perf_counter() - started
+                if self.download_queue is not None and result["download_info"]:
+                    self.results[pdf_file.name] = result
+                    await download_queue.put((pdf_file, result))
+                else:
+                    self._finish(pdf_file.name, result)
+
+        async def download_worker():
+            metrics = self.metrics["download"]
+            while True:
+                item = await download_queue.get()
+                if item is _DONE:
+                    break
+                pdf_file, result = item
+                started = time.perf_counter()
+                futures = result.pop("download_futures", None)
+                if futures is None:
+                    futures = {name: self.download_queue.submit(name, info, pdf_file.name)
+                               for name, info in result["download_info"].items()}
+                await asyncio.gather(*(asyncio.wrap_future(f) for f in futures.values()), return_exceptions=True)
+                result["download_results"] = self.download_queue.collect(futures)
+                self._finish(pdf_file.name, result)
+                metrics.processed += 1
+                metrics.busy_seconds += time.perf_counter() - started
+                TRACER.record("downloads", started, time.perf_counter(), paper=pdf_file.name, datasets=len(futures))
+
+        async def sampler():
+            while True:
+                self.metrics["llm"].sample(parsed_queue.qsize())
+                self.metrics["download"].sample(download_queue.qsize())
+                await asyncio.sleep(0.1)
+
+        parse_count = max(1, self.parse_workers)
+        download_count = self.download_queue.max_workers if self.download_queue is not None else 1
+        sampler_task = asyncio.create_task(sampler())
+        try:
+            parse_tasks = [asyncio.create_task(parse_worker()) for _ in range(parse_count)]
+            llm_tasks = [asyncio.create_task(llm_worker()) for _ in range(self.llm_concurrency)]
+            download_tasks = [asyncio.create_task(download_worker()) for _ in range(download_count)]
+
+            await asyncio.gather(*parse_tasks)
+            for _ in llm_tasks:
+                await parsed_queue.put(_DONE)
+            await asyncio.gather(*llm_tasks)
+            for _ in download_tasks:
+                await download_queue.put(_DONE)
+            await asyncio.gather(*download_tasks)
+        finally:
+            sampler_task.cancel()
+            parse_executor.shutdown(wait=True)
+            llm_executor.shutdown(wait=True)
@@ -0,0 +1,318 @@
+import os
+import json
+import time
+import signal
+import logging
+import threading
+import socketserver
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Any, Tuple
+
+from tool.profiler import TRACER
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class PaperService:
+    """常驻服务的处理核心
+
+    进程内常驻以下状态，避免每篇论文重复付出冷启动开销：
+      - LLM客户端：连接池复用的 Qwen2API，外包一层响应缓存（CachedLLMClient）
+      - 句子提取缓存：按 (路径, 修改时间, 大小) 缓存PDF中的数据集相关句子，上传的PDF按内容SHA-256缓存
+      - 下载器：一个 DatasetDownloader（下载历史只加载一次）和共享的 DownloadQueue
+      - 本地数据集目录（DatasetRegistry）
+      - 可选的数据集提及索引（MentionIndex），每处理一篇论文增量更新
+      - 可选的按数据集拆分查询（DownloadInfoFanout），每个数据集解析后立即提交下载
+    max_concurrent 限制同时进行解析和LLM调用的论文数，下载在下载队列的线程池中进行。
+    """
+    def __init__(self, download_dir: str = "datasets", downloader_options: Optional[Dict[str, Any]] = None,
+                 download_workers: int = 4, max_concurrent: int = 4, llm_client=None,
+                 sentence_cache_size: int = 256, response_cache_size: int = 1024, index=None, fanout=None):
+        from model.model import Qwen2API, CachedLLMClient
+        from tool.dataset_downloader import DatasetDownloader
+        from tool.download_queue import DownloadQueue
+        from tool.dataset_registry import DatasetRegistry, REGISTRY_FILENAME
+
+        self.download_dir = download_dir
+        self.llm_client = CachedLLMClient(llm_client or Qwen2API(pool_size=max(8, max_concurrent * 2)),
+                                          max_entries=response_cache_size)
+        self.downloader = DatasetDownloader(download_dir=download_dir, **(downloader_options or {}))
+        self.download_queue = DownloadQueue(self.downloader, max_workers=download_workers, retry_failed=True)
+        self.registry = DatasetRegistry.shared(os.path.join(download_dir, REGISTRY_FILENAME),
+                                               (downloader_options or {}).get("catalog_paths"))
+        self.index = index
+        # 按数据集拆分并发查询下载信息，所有请求共享其并发上限
+        self.fanout = fanout
+        self.max_concurrent = max(1, max_concurrent)
+        self._slots = threading.BoundedSemaphore(self.max_concurrent)
+        self.sentence_cache_size = sentence_cache_size
+        # (路径, 修改时间, 大小) 或 ("sha256", 内容哈希) -> (句子, 句子所在页码)
+        self._sentences: "OrderedDict[Tuple, Tuple[List[str], List[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.started = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.active = 0
+        self.sentence_hits = 0
+
+    def extract_sentences(self, pdf_path) -> Tuple[List[str], List[int]]:
+        """提取数据集相关句子及其页码，文件或内容未变化时直接使用缓存
+
+        pdf_path 可以是文件路径，也可以是 PdfSource（上传的PDF）；后者用同一块内存
+        计算内容哈希和解析，不额外复制或读取。
+        """
+        from agent.source import create_extractor
+        if isinstance(pdf_path, str):
+            stat = os.stat(pdf_path)
+            key = (os.path.realpath(pdf_path), stat.st_mtime_ns, stat.st_size)
+        else:
+            key = ("sha256", pdf_path.content_hash())
+        with self._lock:
+            if key in self._sentences:
+                self._sentences.move_to_end(key)
+                self.sentence_hits += 1
+                return self._sentences[key]
+        extractor = create_extractor(pdf_path)
+        sentences = extractor.extract_sentences()
+        with self._lock:
+            self._sentences[key] = (sentences, extractor.sentence_pages)
+            while len(self._sentences) > self.sentence_cache_size:
+                self._sentences.popitem(last=False)
+        return sentences, extractor.sentence_pages
+
+    def process(self, pdf_path, download: bool = False, wait_downloads: bool = True,
+                name: Optional[str] = None) -> Dict[str, Any]:
+        """处理单篇论文，返回与 main.py 单文件模式相同格式的结果
+
+        Args:
+            pdf_path: PDF文件路径（相对路径按服务的工作目录解析），或上传的PDF内容（bytes等）
+            download: 是否下载数据集
+            wait_downloads: 是否等待下载完成；为False时下载在后台进行，结果中记为"已提交下载"
+            name: 上传内容的论文名称，用于日志、追踪和提及索引
+        """
+        from agent.agent import PdfSource
+        from model.model import PaperAnalyzer, parse_dataset_names
+        from tool.download_queue import DownloadQueue
+
+        source = None
+        if isinstance(pdf_path, (str, os.PathLike)):
+            pdf_path = os.path.abspath(pdf_path)
+            if not os.path.isfile(pdf_path):
+                raise FileNotFoundError(f"文件不存在: {pdf_path}")
+            paper = os.path.basename(pdf_path)
+        else:
+            source = PdfSource(pdf_path, name)
+            paper = source.name
+
+        futures = {}
+        def submit_download(name: str, info: Any):
+            futures[name] = self.download_queue.submit(name, info)
+
+        with self._slots:
+            with self._lock:
+                self.active += 1
+            try:
+                with TRACER.paper(paper), TRACER.span("paper", cat="paper"):
+                    sentences, pages = self.extract_sentences(source or pdf_path)
+                    analyzer = PaperAnalyzer(source or pdf_path, self.llm_client, self.registry, self.fanout)
+                    dataset_names = analyzer.extract_dataset_names(sentences)
+                    # 需要下载时每得到一个数据集的下载信息就提交，与其余数据集的查询并行
+                    download_info = analyzer.get_dataset_download_info(dataset_names, "\n".join(sentences),
+                                                                       submit_download if download else None)
+                if self.index is not None:
+                    self.index.add_paper(paper, parse_dataset_names(dataset_names), download_info,
+                                         sentences, pages, pdf_path if source is None else None)
+            except Exception:
+                with self._lock:
+                    self.failed += 1
+                raise
+            finally:
+                if source is not None:
+                    source.close()
+                with self._lock:
+                    self.active -= 1
+
+        # 下载不占用处理名额，由共享下载队列合并重复目标
+        download_results = {}
+        if download and download_info:
+            if wait_downloads:
+                download_results = DownloadQueue.collect(futures)
+            else:
+                download_results = {name: "已提交下载" for name in futures}
+
+        with self._lock:
+            self.processed += 1
+        result = {
+            "pdf": pdf_path if source is None else paper,
+            "dataset_names": dataset_names,
+            "download_info": download_info,
+            "download_results": download_results
+        }
+        if source is not None:
+            result["content_hash"] = source.content_hash()
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        """服务运行状态与缓存命中情况"""
+        with self._lock:
+            return {
+                "uptime_seconds": round(time.time() - self.started, 1),
+                "processed": self.processed,
+                "failed": self.failed,
+                "active": self.active,
+                "max_concurrent": self.max_concurrent,
+                "sentence_cache": {"entries": len(self._sentences), "hits": self.sentence_hits},
+                "response_cache": self.llm_client.stats(),
+                "download_queue": {"submitted": self.download_queue.submitted,
+                                   "coalesced": self.download_queue.coalesced},
+                "mention_index": self.index.stats() if self.index is not None else None
+            }
+
+    def close(self):
+        """等待进行中的下载完成并关闭下载队列"""
+        if self.fanout is not None:
+            self.fanout.shutdown()
+        self.download_queue.shutdown()
+        if self.index is not None:
+            self.index.close()
+
+
+class ServiceRequestHandler(BaseHTTPRequestHandler):
+    """JSON接口
+
+      GET  /health   存活检查
+      GET  /stats    运行状态与缓存统计
+      POST /process  {"path": "论文.pdf", "download": false, "wait_downloads": true}
+      POST /process?name=论文.pdf&download=1&wait_downloads=0
+                     请求体直接为PDF内容（Content-Type: application/pdf 或 application/octet-stream），
+                     在内存中处理，不写临时文件；名称也可通过 X-Paper-Name 请求头指定
+    """
+    server_version = "PaperAgent/1.0"
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self) -> PaperService:
+        return self.server.service
+
+    def _send_json(self, status: int, data: Dict[str, Any]):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif self.path == "/stats":
+            self._send_json(200, self.service.stats())
+        else:
+            self._send_json(404, {"error": f"未知路径: {self.path}"})
+
+    def _read_upload(self, length: int) -> Tuple[bytearray, Dict[str, Any]]:
+        """读取PDF请求体到一个预分配的缓冲区，参数来自查询字符串和请求头"""
+        from urllib.parse import urlsplit, parse_qs
+        query = {key: values[-1] for key, values in parse_qs(urlsplit(self.path).query).items()}
+        body = bytearray(length)
+        view = memoryview(body)
+        received = 0
+        while received < length:
+            count = self.rfile.readinto(view[received:])
+            if not count:
+                raise ValueError(f"请求体不完整: {received}/{length}字节")
+            received += count
+        view.release()
+        flag = lambda value: str(value).lower() in ("1", "true", "yes")
+        return body, {
+            "name": self.headers.get("X-Paper-Name") or query.get("name") or "upload.pdf",
+            "download": flag(query.get("download", "0")),
+            "wait_downloads": flag(query.get("wait_downloads", "1"))
+        }
+
+    def do_POST(self):
+        if self.path.split("?", 1)[0] != "/process":
+            self._send_json(404, {"error": f"未知路径: {self.path}"})
+            return
+        content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            if content_type in ("application/pdf", "application/octet-stream"):
+                # 直接上传的PDF：同一缓冲区用于解析和计算内容哈希
+                pdf_path, request = self._read_upload(length)
+            else:
+                request = json.loads(self.rfile.read(length) or b"{}")
+                pdf_path = request["path"]
+        except (ValueError, KeyError, TypeError) as e:
+            self._send_json(400, {"error": f"请求格式错误，需要JSON对象 {{\"path\": ...}} 或PDF请求体: {str(e)}"})
+            return
+
+        started = time.perf_counter()
+        label = request.get("name") or pdf_path
+        try:
+            result = self.service.process(pdf_path, bool(request.get("download", False)),
+                                          bool(request.get("wait_downloads", True)), request.get("name"))
+        except FileNotFoundError as e:
+            self._send_json(404, {"error": str(e)})
+            return
+        except Exception as e:
+            logger.error(f"处理 {label} 失败: {str(e)}")
+            self._send_json(500, {"error": str(e)})
+            return
+        result["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        self._send_json(200, result)
+
+    def log_message(self, format, *args):
+        # Unix套接字的client_address为空字符串，统一走日志而不是stderr
+        logger.debug(format % args)
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """基于Unix套接字的多线程HTTP服务"""
+    daemon_threads = True
+
+    def get_request(self):
+        request, _ = super().get_request()
+        # BaseHTTPRequestHandler 需要 (host, port) 形式的客户端地址
+        return request, ("unix", 0)
+
+
+def create_server(address: str, service: PaperService):
+    """根据地址创建服务："host:port" 为TCP，"unix:/path/to.sock" 为Unix套接字"""
+    if address.startswith("unix:"):
+        path = address[len("unix:"):]
+        if os.path.exists(path):
+            os.remove(path)
+        server = ThreadingUnixHTTPServer(path, ServiceRequestHandler)
+    else:
+        host, _, port = address.rpartition(":")
+        server = ThreadingHTTPServer((host or "127.0.0.1", int(port)), ServiceRequestHandler)
+        server.daemon_threads = True
+    server.service = service
+    return server
+
+
+def serve(address: str, service: PaperService):
+    """启动服务并阻塞，直到收到SIGINT/SIGTERM"""
+    server = create_server(address, service)
+    logger.info(f"服务已启动: {address}（并发上限 {service.max_concurrent}）")
+
+    def stop(signum, frame):
+        logger.info("收到退出信号，正在关闭服务...")
+        # shutdown() 会等待serve_forever退出，不能在serve_forever所在线程中直接调用
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, stop)
+        signal.signal(signal.SIGINT, stop)
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+        if address.startswith("unix:") and os.path.exists(address[len("unix:"):]):
+            os.remove(address[len("unix:"):])
+        service.close()
+        logger.info("服务已关闭")
@@ -0,0 +1,572 @@
+import re
+import os
+import logging
+from html.parser import HTMLParser
+from typing import Dict, List, Optional, Any, Tuple, Set
+
+from agent.agent import ExtractDatasetName, DATASET_PATTERN, URL_PATTERN, REFERENCE_PATTERN
+from tool.profiler import TRACER
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 支持的论文文件类型（后缀 -> 提取器类型）
+PAPER_SUFFIXES = {".pdf": "pdf", ".tex": "latex", ".html": "html", ".htm": "html"}
+# arXiv源码包的后缀；论文目录中也常有同类后缀的数据集归档，因此只在显式启用时作为论文处理
+SOURCE_BUNDLE_SUFFIXES = (".tar.gz", ".tgz", ".tar")
+
+# 源码包中需要读取的成员，其余成员（图片、样式文件等）在流中直接跳过
+LATEX_MEMBER_SUFFIXES = (".tex", ".bib", ".bbl")
+
+# 句子边界：句末标点后接大写字母、数字或括号，避免在 e.g. 和URL中的点处断开
+SENTENCE_SPLIT = re.compile(r'(?<=[.!?])\s+(?=[A-Z0-9\[("])')
+PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+# 文本中的引用标记，切分句子后再移除，用于关联被引用的参考文献
+CITE_MARK = re.compile(r'\x01([^\x02]*)\x02')
+
+COMMENT_PATTERN = re.compile(r'(?<!\\)%.*')
+MATH_PATTERN = re.compile(r'(?<!\\)\$\$?[^$]*?(?<!\\)\$\$?')
+COMMAND_PATTERN = re.compile(r'\\([A-Za-z@]+\*?|.)', re.DOTALL)
+BIBITEM_PATTERN = re.compile(r'\\bibitem\s*(?:\[[^\]]*\])?\s*\{([^}]*)\}')
+BIB_ENTRY_PATTERN = re.compile(r'@(\w+)\s*\{\s*([^,\s]+)\s*,')
+BIB_FIELD_PATTERN = re.compile(r'(\w+)\s*=\s*')
+CITE_COMMAND = re.compile(r'^[A-Za-z]*cite[a-z]*\*?$', re.IGNORECASE)
+
+SECTION_COMMANDS = {"section", "subsection", "subsubsection", "paragraph", "subparagraph", "chapter",
+                    "caption", "title", "abstract", "section*", "subsection*", "subsubsection*", "paragraph*"}
+# 这些命令连同参数一起丢弃
+DROP_COMMANDS = {"label", "ref", "eqref", "cref", "Cref", "autoref", "pageref", "vspace", "vspace*", "hspace",
+                 "hspace*", "includegraphics", "bibliographystyle", "bibliography", "usepackage", "documentclass",
+                 "newcommand", "renewcommand", "def", "setlength", "addbibresource", "newblock", "thanks",
+                 "input@path", "graphicspath", "affiliation", "email", "orcid"}
+INCLUDE_COMMANDS = {"input", "include", "subfile", "import"}
+MATH_ENVIRONMENTS = {"equation", "equation*", "align", "align*", "eqnarray", "eqnarray*", "math", "displaymath",
+                     "gather", "gather*", "multline", "multline*", "tikzpicture", "verbatim", "lstlisting", "comment"}
+BREAK_COMMANDS = {"item", "par", "bibitem", "maketitle", "newline", "hline", "toprule", "midrule", "bottomrule"}
+
+
+def paper_type(path: str, source_bundles: bool = False) -> Optional[str]:
+    """按文件名判断论文类型："pdf"、"latex"、"html"，不支持时返回None
+
+    source_bundles=True 时 .tar.gz/.tgz/.tar 视为LaTeX源码包，否则不作为论文。
+    """
+    name = os.path.basename(str(path)).lower()
+    if source_bundles and name.endswith(SOURCE_BUNDLE_SUFFIXES):
+        return "latex"
+    for suffix, kind in PAPER_SUFFIXES.items():
+        if name.endswith(suffix):
+            return kind
+    return None
+
+
+def is_paper_file(path: str, source_bundles: bool = False) -> bool:
+    """是否为可处理的论文文件（PDF、LaTeX源码、HTML，启用时包括源码包），忽略隐藏文件"""
+    return not os.path.basename(str(path)).startswith(".") and paper_type(path, source_bundles) is not None
+
+
+def create_extractor(path, name: Optional[str] = None):
+    """按文件类型创建与 ExtractDatasetName 接口兼容的提取器
+
+    路径按后缀选择提取器（已通过 is_paper_file 筛选，源码包后缀一律按LaTeX处理）；
+    内存中的数据（bytes、memoryview、mmap、文件对象）视为PDF。
+    """
+    if isinstance(path, (str, os.PathLike)):
+        kind = paper_type(path, source_bundles=True)
+        if kind == "latex":
+            return LatexExtractor(path)
+        if kind == "html":
+            return HtmlExtractor(path)
+    return ExtractDatasetName(path, name)
+
+
+def _skip_space(text: str, pos: int) -> int:
+    while pos < len(text) and text[pos] in " \t\n\r":
+        pos += 1
+    return pos
+
+
+def _braced(text: str, pos: int, open_char: str = "{", close_char: str = "}") -> Tuple[Optional[str], int]:
+    """读取从pos开始（可跳过空白）的一个括号参数，返回 (内容, 结束位置)；没有参数时返回 (None, pos)"""
+    start = _skip_space(text, pos)
+    if start >= len(text) or text[start] != open_char:
+        return None, pos
+    depth, i = 0, start
+    while i < len(text):
+        char = text[i]
+        if char == "\\":
+            i += 2
+            continue
+        if char == open_char:
+            depth += 1
+        elif char == close_char:
+            depth -= 1
+            if depth == 0:
+                return text[start + 1:i], i + 1
+        i += 1
+    return text[start + 1:], len(text)
+
+
+def _argument(text: str, pos: int) -> Tuple[str, int]:
+    """读取命令的必选参数，跳过其前面的可选参数 [..]"""
+    while True:
+        optional, end = _braced(text, pos, "[", "]")
+        if optional is None:
+            break
+        pos = end
+    value, pos = _braced(text, pos)
+    return value or "", pos
+
+
+class SourceExtractor:
+    """LaTeX/HTML提取器的公共部分：句子切分、筛选和参考文献关联
+
+    与 ExtractDatasetName 接口一致（extract_sentences / extract_tables / extract_metadata /
+    sentence_pages），源码中没有页码，sentence_pages 中为None。被数据集相关句子引用的参考
+    文献（标题、URL）作为额外的句子附在最后，帮助LLM确定数据集的来源。
+    """
+    def __init__(self, path: str):
+        self.pdf_path = path
+        self.dataset_pattern = DATASET_PATTERN
+        self.url_pattern = URL_PATTERN
+        self.reference_pattern = REFERENCE_PATTERN
+        self.sentence_pages: List[Optional[int]] = []
+        # 参考文献键 -> 参考文献文本；键 -> 正文中显示的引用标签
+        self.references: Dict[str, str] = {}
+        self.cite_labels: Dict[str, str] = {}
+        self.tables: List[List[List[str]]] = []
+        self.metadata: Dict[str, str] = {}
+        self.text = ""
+        with TRACER.span("source_read", path=os.path.basename(str(path))) as span:
+            self._load(span)
+        logger.info(f"成功读取论文源文件: {path}, 共{len(self.text)}字符, {len(self.references)}条参考文献")
+
+    def _load(self, span: Dict[str, Any]):
+        raise NotImplementedError
+
+    def _is_dataset_sentence(self, sentence: str) -> bool:
+        return bool(self.dataset_pattern.search(sentence) or self.url_pattern.search(sentence) or
+                    self.reference_pattern.search(sentence))
+
+    def extract_sentences(self, max_sentences=None) -> List[str]:
+        """提取与数据集相关的句子，URL、脚注和引用键保留在所在句子中"""
+        dataset_sentences: List[str] = []
+        cited: List[str] = []
+        with TRACER.span("sentence_filter") as span:
+            total = 0
+            for paragraph in PARAGRAPH_SPLIT.split(self.text):
+                paragraph = " ".join(paragraph.split())
+                for sentence in SENTENCE_SPLIT.split(paragraph):
+                    keys = CITE_MARK.findall(sentence)
+                    sentence = " ".join(CITE_MARK.sub("", sentence).split())
+                    if not sentence:
+                        continue
+                    total += 1
+                    if self._is_dataset_sentence(sentence):
+                        dataset_sentences.append(sentence)
+                        cited.extend(key for key in keys if key not in cited)
+                    if max_sentences and len(dataset_sentences) >= max_sentences:
+                        break
+                if max_sentences and len(dataset_sentences) >= max_sentences:
+                    break
+            for key in cited:
+                reference = self.references.get(key)
+                if reference and not (max_sentences and len(dataset_sentences) >= max_sentences):
+                    dataset_sentences.append(f"[{self.cite_labels.get(key, key)}] {reference}")
+            span.update(sentences=total, matched=len(dataset_sentences))
+        self.sentence_pages = [None] * len(dataset_sentences)
+        logger.info(f"已提取{len(dataset_sentences)}个相关句子")
+        return dataset_sentences
+
+    def extract_tables(self) -> List[List[List[str]]]:
+        return self.tables
+
+    def extract_metadata(self) -> Dict[str, str]:
+        return {key: self.metadata.get(key, "") for key in ("title", "author", "subject", "keywords")}
+
+
+class LatexExtractor(SourceExtractor):
+    """直接读取LaTeX源码（.tex 或 arXiv源码包 .tar.gz/.tgz/.tar；只有一个 .tex 时可能是单个gzip文件）
+
+    源码包以流模式逐个读取成员，只把 .tex/.bib/.bbl 读入内存，不解压到磁盘。从主文件
+    （含 \\documentclass）开始按 \\input/\\include 展开，保持正文顺序；\\url、\\href、
+    脚注、\\cite 键原样保留在句子中，不经过PDF排版，不会出现URL断行或脚注错位。
+    """
+    def _load(self, span: Dict[str, Any]):
+        files = self._read_files(span)
+        tex_files = {name: text for name, text in files.items() if name.endswith(".tex")}
+        for name, text in files.items():
+            if name.endswith(".bib"):
+                self._parse_bib(text)
+            elif name.endswith(".bbl"):
+                self._parse_bibitems(text)
+        main = next((name for name, text in tex_files.items() if "\\documentclass" in text), None)
+        self._files = tex_files
+        self._visited: Set[str] = set()
+        self._tables: List[List[List[str]]] = []
+        order = [main] if main else sorted(tex_files)
+        parts = [self._expand(name) for name in order]
+        self.text = "\n\n".join(part for part in parts if part)
+        self.tables = self._tables
+        span.update(files=len(files), chars=len(self.text))
+
+    def _read_files(self, span: Dict[str, Any]) -> Dict[str, str]:
+        path = str(self.pdf_path)
+        name = os.path.basename(path).lower()
+        span["bytes"] = os.path.getsize(path)
+        if name.endswith(".tex"):
+            with open(path, 'rb') as f:
+                return {os.path.basename(path): self._decode(f.read())}
+
+        import tarfile
+        files: Dict[str, str] = {}
+        try:
+            # 流模式（r|*）顺序读取，跳过的成员不会被解压或写入磁盘
+            with tarfile.open(path, mode="r|*") as tar:
+                for member in tar:
+                    if not member.isfile() or not member.name.lower().endswith(LATEX_MEMBER_SUFFIXES):
+                        continue
+                    f = tar.extractfile(member)
+                    if f is not None:
+                        files[os.path.normpath(member.name).lstrip("./")] = self._decode(f.read())
+        except tarfile.ReadError:
+            if not name.endswith(".gz"):
+                raise
+            # arXiv 只有一个 .tex 文件时源码是单个gzip文件而不是tar包
+            import gzip
+            with gzip.open(path, 'rb') as f:
+                files = {os.path.basename(path)[:-3] + ".tex": self._decode(f.read())}
+        return files
+
+    @staticmethod
+    def _decode(data: bytes) -> str:
+        try:
+            return data.decode("utf-8")
+        except UnicodeDecodeError:
+            return data.decode("latin-1")
+
+    def _resolve(self, name: str) -> Optional[str]:
+        """把 \\input{sections/intro} 解析为源码包中的文件名"""
+        name = os.path.normpath(name.strip()).lstrip("./")
+        for candidate in (name, f"{name}.tex"):
+            if candidate in self._files:
+                return candidate
+        return None
+
+    def _expand(self, name: str) -> str:
+        if name in self._visited:
+            return ""
+        self._visited.add(name)
+        source = COMMENT_PATTERN.sub("", self._files[name])
+        if "\\begin{document}" in source:
+            preamble, _, body = source.partition("\\begin{document}")
+            self._read_preamble(preamble)
+            source = body.split("\\end{document}")[0]
+        # 正文中的 thebibliography 环境作为参考文献，不计入正文
+        source = re.sub(r'\\begin\{thebibliography\}.*?(\\end\{thebibliography\}|$)',
+                        lambda m: self._parse_bibitems(m.group(0)) or "", source, flags=re.DOTALL)
+        source = MATH_PATTERN.sub(" ", source)
+        return self._convert(source)
+
+    def _read_preamble(self, preamble: str):
+        for key, command in (("title", "title"), ("author", "author"), ("keywords", "keywords")):
+            match = re.search(r'\\' + command + r'\s*(?:\[[^\]]*\])?\s*\{', preamble)
+            if match and key not in self.metadata:
+                value, _ = _braced(preamble, match.end() - 1)
+                self.metadata[key] = self._plain(value or "")
+
+    def _plain(self, text: str) -> str:
+        """不带引用标记的纯文本，用于标题、参考文献等"""
+        return " ".join(CITE_MARK.sub("", self._convert(text)).split())
+
+    def _convert(self, text: str) -> str:
+        """把LaTeX正文转换为纯文本，保留URL、脚注内容和引用键"""
+        parts: List[str] = []
+        pos = 0
+        while True:
+            match = COMMAND_PATTERN.search(text, pos)
+            if match is None:
+                parts.append(text[pos:])
+                break
+            parts.append(text[pos:match.start()])
+            name = match.group(1)
+            pos = match.end()
+            if len(name) == 1 and not name.isalpha():
+                # 转义字符：\% \_ \& 等保留字符本身，\\ 为换行
+                parts.append("\n" if name == "\\" else (" " if name in ", ;" else name))
+            elif name == "url":
+                url, pos = _argument(text, pos)
+                parts.append(f" {url.strip()} ")
+            elif name == "href":
+                url, pos = _argument(text, pos)
+                label, pos = _argument(text, pos)
+                label = self._plain(label)
+                url = url.strip()
+                parts.append(f" {label} ({url}) " if label and label != url else f" {url} ")
+            elif name in ("footnote", "footnotetext"):
+                note, pos = _argument(text, pos)
+                parts.append(f" ({self._convert(note).strip()}) ")
+            elif CITE_COMMAND.match(name):
+                keys, pos = _argument(text, pos)
+                keys = [key.strip() for key in keys.split(",") if key.strip()]
+                if keys:
+                    marks = "".join(f"\x01{key}\x02" for key in keys)
+                    parts.append(f" [{', '.join(keys)}]{marks}")
+            elif name in INCLUDE_COMMANDS:
+                target, pos = _argument(text, pos)
+                if name == "import":
+                    # \import{目录}{文件}
+                    filename, pos = _argument(text, pos)
+                    target = os.path.join(target, filename)
+                resolved = self._resolve(target)
+                if resolved is not None:
+                    parts.append("\n\n" + self._expand(resolved) + "\n\n")
+            elif name in ("begin", "end"):
+                environment, pos = _braced(text, pos)
+                environment = (environment or "").strip()
+                if name == "begin" and environment in MATH_ENVIRONMENTS:
+                    end = text.find(f"\\end{{{environment}}}", pos)
+                    pos = len(text) if end < 0 else end + len(f"\\end{{{environment}}}")
+                elif name == "begin" and environment.startswith("tabular"):
+                    # 表格每行作为一段，单元格以 | 分隔
+                    end = text.find(f"\\end{{{environment}}}", pos)
+                    body = text[pos:] if end < 0 else text[pos:end]
+                    pos = len(text) if end < 0 else end + len(f"\\end{{{environment}}}")
+                    rows = self._parse_tabular(body)
+                    if rows:
+                        self._tables.append(rows)
+                        parts.append("".join("\n\n" + " | ".join(row) for row in rows))
+                parts.append("\n\n")
+            elif name in SECTION_COMMANDS:
+                title, pos = _argument(text, pos)
+                parts.append(f"\n\n{self._convert(title).strip()}\n\n")
+            elif name in DROP_COMMANDS:
+                _, pos = _argument(text, pos)
+            elif name == "and":
+                parts.append(", ")
+            elif name in BREAK_COMMANDS:
+                parts.append("\n\n")
+            # 其余命令（\textbf、\emph等）只去掉命令名，参数中的文字保留
+        text = "".join(parts)
+        return text.replace("{", "").replace("}", "").replace("~", " ")
+
+    def _parse_tabular(self, body: str) -> List[List[str]]:
+        # 跳过列格式参数，如 {lcc}
+        spec, pos = _braced(body, 0)
+        if spec is not None:
+            body = body[pos:]
+        rows = []
+        for row in re.split(r'\\\\', body):
+            cells = [self._plain(cell) for cell in row.split("&")]
+            cells = [cell for cell in cells if cell]
+            if cells:
+                rows.append(cells)
+        return rows
+
+    def _parse_bibitems(self, text: str) -> str:
+        """解析 \\bibitem 形式的参考文献（.bbl 或 thebibliography 环境）"""
+        matches = list(BIBITEM_PATTERN.finditer(text))
+        for i, match in enumerate(matches):
+            end = matches[i + 1].start() if i + 1 < len(matches) else len(text)
+            entry = text[match.end():end].split("\\end{thebibliography}")[0]
+            self.references.setdefault(match.group(1).strip(), self._plain(COMMENT_PATTERN.sub("", entry)))
+        return ""
+
+    def _parse_bib(self, text: str):
+        """解析 .bib 文件，只保留标题、URL等有助于定位数据集的字段"""
+        for match in BIB_ENTRY_PATTERN.finditer(text):
+            body, _ = _braced(text, text.index("{", match.start()))
+            if body is None:
+                continue
+            fields: Dict[str, str] = {}
+            # 跳过条目键，从第一个字段开始
+            for field in BIB_FIELD_PATTERN.finditer(body, body.find(",") + 1):
+                if body[field.end():field.end() + 1] == "{":
+                    value, _ = _braced(body, field.end())
+                elif body[field.end():field.end() + 1] == '"':
+                    end = body.find('"', field.end() + 1)
+                    value = body[field.end() + 1:end]
+                else:
+                    continue
+                fields.setdefault(field.group(1).lower(), self._plain(value or ""))
+            parts = [fields.get(key) for key in ("title", "author", "year", "url", "howpublished", "note", "doi")]
+            reference = ". ".join(part for part in parts if part)
+            if reference:
+                self.references.setdefault(match.group(2), reference)
+
+
+class _HtmlTextParser(HTMLParser):
+    """把HTML转换为带段落边界的纯文本，同时收集链接、参考文献和表格"""
+    BLOCK_TAGS = {"p", "div", "section", "article", "li", "ul", "ol", "h1", "h2", "h3", "h4", "h5", "h6", "br",
+                  "tr", "table", "blockquote", "figcaption", "caption", "dd", "dt", "header", "footer", "pre",
+                  "figure", "nav", "aside", "main"}
+    SKIP_TAGS = {"script", "style", "noscript", "svg", "math", "template", "button"}
+    VOID_TAGS = {"br", "img", "meta", "link", "input", "hr", "wbr", "source", "col", "area", "base", "embed"}
+
+    def __init__(self, extractor: "HtmlExtractor"):
+        super().__init__(convert_charrefs=True)
+        self.extractor = extractor
+        self.parts: List[str] = []
+        self._skip = 0
+        # 标签名 -> 当前嵌套深度；需要在结束标签处理的元素 (标签名, 深度, 动作)
+        self._depth: Dict[str, int] = {}
+        self._closers: List[Tuple[str, int, str]] = []
+        self._title: Optional[List[str]] = None
+        # (链接地址, 链接文本起始位置)
+        self._links: List[Tuple[str, int]] = []
+        # 正在读取的参考文献条目 (键, 文本片段, li嵌套深度)
+        self._bib: Optional[Tuple[str, List[str]]] = None
+        self._bib_depth = 0
+        self._rows: Optional[List[List[str]]] = None
+        self._cell: Optional[List[str]] = None
+
+    def _emit(self, text: str):
+        if self._bib is not None:
+            self._bib[1].append(text)
+        else:
+            self.parts.append(text)
+        if self._cell is not None:
+            self._cell.append(text)
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "title":
+            self._title = []
+            return
+        if tag == "meta":
+            name = (attrs.get("name") or attrs.get("property") or "").lower()
+            content = attrs.get("content") or ""
+            for key, names in (("title", ("citation_title", "og:title", "dc.title")),
+                               ("author", ("citation_author", "author", "dc.creator")),
+                               ("keywords", ("keywords", "citation_keywords"))):
+                if name in names and content:
+                    existing = self.extractor.metadata.get(key)
+                    if key == "author" and existing:
+                        self.extractor.metadata[key] = f"{existing}; {content}"
+                    elif not existing or name == "citation_title":
+                        self.extractor.metadata[key] = content
+            return
+        if tag in self.VOID_TAGS:
+            if tag == "br" and not self._skip:
+                self._emit("\n\n")
+            return
+        depth = self._depth[tag] = self._depth.get(tag, 0) + 1
+        classes = attrs.get("class") or ""
+        if tag in self.SKIP_TAGS or "ltx_note_mark" in classes or "ltx_tag_note" in classes:
+            # 脚注编号等不计入正文
+            self._closers.append((tag, depth, "skip"))
+            self._skip += 1
+            return
+        if self._skip:
+            return
+        if "ltx_note_content" in classes:
+            # 脚注内容放在括号中，紧跟正文
+            self._closers.append((tag, depth, "note"))
+            self._emit(" (")
+        if tag == "li":
+            element_id = attrs.get("id") or ""
+            if self._bib is None and element_id.startswith("bib"):
+                self._bib = (element_id, [])
+                self._bib_depth = 0
+            elif self._bib is not None:
+                self._bib_depth += 1
+        if tag in self.BLOCK_TAGS:
+            self._emit("\n\n")
+        if tag == "table":
+            self._rows = []
+        elif tag == "tr" and self._rows is not None:
+            self._rows.append([])
+        elif tag in ("td", "th") and self._rows is not None:
+            self._cell = []
+        elif tag in ("td", "th"):
+            self._emit(" ")
+        elif tag == "a":
+            self._links.append((attrs.get("href") or "", len(self.parts)))
+
+    def handle_endtag(self, tag):
+        if tag == "title":
+            if self._title is not None and "title" not in self.extractor.metadata:
+                self.extractor.metadata["title"] = " ".join("".join(self._title).split())
+            self._title = None
+            return
+        depth = self._depth.get(tag, 0)
+        if depth:
+            self._depth[tag] = depth - 1
+        action = None
+        if self._closers and self._closers[-1][:2] == (tag, depth):
+            action = self._closers.pop()[2]
+        if action == "skip":
+            self._skip -= 1
+            return
+        if self._skip:
+            return
+        if action == "note":
+            self._emit(") ")
+        if tag == "a" and self._links:
+            href, start = self._links.pop()
+            if self._bib is None:
+                self._close_link(href, start)
+        elif tag in ("td", "th") and self._cell is not None:
+            if self._rows:
+                self._rows[-1].append(" ".join("".join(self._cell).split()))
+            self._cell = None
+            self._emit(" ")
+        elif tag == "table" and self._rows is not None:
+            rows = [[cell for cell in row if cell] for row in self._rows]
+            rows = [row for row in rows if row]
+            if rows:
+                self.extractor.tables.append(rows)
+            self._rows = None
+        elif tag == "li" and self._bib is not None:
+            if self._bib_depth:
+                self._bib_depth -= 1
+            else:
+                key, parts = self._bib
+                self.extractor.references.setdefault(key, " ".join("".join(parts).split()))
+                self._bib = None
+        if tag in self.BLOCK_TAGS:
+            self._emit("\n\n")
+
+    def _close_link(self, href: str, start: int):
+        label = " ".join("".join(self.parts[start:]).split())
+        if href.startswith("#bib"):
+            # 指向参考文献的链接即引用，记下正文中显示的标签（如 28 或 Yang et al., 2018）
+            key = href[1:]
+            if label:
+                self.extractor.cite_labels.setdefault(key, label)
+            self.parts.append(f"\x01{key}\x02")
+        elif href.startswith(("http://", "https://")) and href not in label:
+            self.parts.append(f" ({href})")
+
+    def handle_data(self, data):
+        if self._title is not None:
+            self._title.append(data)
+            return
+        if not self._skip:
+            self._emit(data)
+
+
+class HtmlExtractor(SourceExtractor):
+    """读取HTML论文（如arXiv的LaTeXML页面）
+
+    按块读取并增量解析，链接地址保留在链接文字之后，脚注内容留在所在位置，
+    指向参考文献列表（id以bib开头的li）的链接作为引用处理。
+    """
+    CHUNK_SIZE = 64 * 1024
+
+    def _load(self, span: Dict[str, Any]):
+        import codecs
+        parser = _HtmlTextParser(self)
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        size = 0
+        with open(self.pdf_path, 'rb') as f:
+            while True:
+                chunk = f.read(self.CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                parser.feed(decoder.decode(chunk))
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+        self.text = "".join(parser.parts)
+        span.update(bytes=size, chars=len(self.text))
@@ -0,0 +1,231 @@
+import os
+import time
+import errno
+import select
+import struct
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Callable, Tuple
+
+from agent.source import is_paper_file
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# inotify事件掩码（见 <sys/inotify.h>）
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """通过ctypes直接调用Linux inotify，监听单个目录中文件的创建、写入和移入"""
+    def __init__(self, path: str):
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        if not hasattr(libc, "inotify_init1"):
+            raise OSError(errno.ENOSYS, "当前系统不支持inotify")
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1失败")
+        if libc.inotify_add_watch(self.fd, os.fsencode(path), WATCH_MASK) < 0:
+            err = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(err, f"inotify_add_watch失败: {path}")
+
+    def read(self, timeout: float) -> Tuple[List[str], bool]:
+        """等待最多timeout秒，返回 (发生变化的文件名, 是否事件队列溢出)"""
+        readable, _, _ = select.select([self.fd], [], [], max(0.0, timeout))
+        if not readable:
+            return [], False
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return [], False
+        names, overflow, offset = [], False, 0
+        while offset + EVENT_HEADER.size <= len(data):
+            _, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+            offset += EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b"\0")
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+            elif name:
+                names.append(os.fsdecode(name))
+        return names, overflow
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """监视目录中新增或修改的论文文件（PDF、LaTeX源码、HTML），并交给处理函数
+
+    优先使用inotify，不可用时退化为定时扫描。文件大小和修改时间在 settle_seconds
+    内保持不变才视为写入完成（防抖），避免处理仍在复制中的文件；处理中的文件再次
+    变化时，会在当前处理结束后重新处理。同时处理的文件数不超过 max_workers。
+    """
+    def __init__(self, dir_path: str, handler: Callable[[str], None], settle_seconds: float = 2.0,
+                 poll_interval: float = 2.0, max_workers: int = 2, use_inotify: bool = True,
+                 skip: Optional[Callable[[str], bool]] = None, rescan_interval: float = 60.0,
+                 source_bundles: bool = False):
+        self.dir_path = os.path.abspath(dir_path)
+        self.handler = handler
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.max_workers = max(1, max_workers)
+        self.use_inotify = use_inotify
+        # 启动时已存在的文件若 skip(path) 为True 则不处理（如检查点中已完成的论文）
+        self.skip = skip
+        # 使用inotify时仍定期全量扫描一次，兜底丢失的事件
+        self.rescan_interval = rescan_interval
+        # 是否把 .tar.gz/.tgz/.tar 当作LaTeX源码包处理
+        self.source_bundles = source_bundles
+        # 路径 -> 已提交处理的文件签名 (大小, 修改时间)
+        self._processed: Dict[str, Tuple[int, int]] = {}
+        # 路径 -> (最近观察到的签名, 签名最近变化的时间)
+        self._pending: Dict[str, Tuple[Tuple[int, int], float]] = {}
+        self._running: set = set()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self.submitted = 0
+
+    @staticmethod
+    def _signature(path: str) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _is_paper(self, name: str) -> bool:
+        return is_paper_file(name, self.source_bundles)
+
+    def _observe(self, path: str, now: float):
+        """记录一次文件变化，签名变化时重新开始计时"""
+        signature = self._signature(path)
+        if signature is None or signature[0] == 0:
+            self._pending.pop(path, None)
+            return
+        if self._processed.get(path) == signature and path not in self._pending:
+            return
+        previous = self._pending.get(path)
+        if previous is None or previous[0] != signature:
+            self._pending[path] = (signature, now)
+
+    def _scan(self, now: float):
+        try:
+            names = os.listdir(self.dir_path)
+        except OSError as e:
+            logger.error(f"扫描目录失败: {self.dir_path}, {str(e)}")
+            return
+        for name in names:
+            if self._is_paper(name):
+                self._observe(os.path.join(self.dir_path, name), now)
+
+    def _dispatch(self, executor: ThreadPoolExecutor, now: float):
+        """提交已稳定的文件"""
+        for path, (signature, changed) in list(self._pending.items()):
+            current = self._signature(path)
+            if current is None:
+                del self._pending[path]
+                continue
+            if current != signature:
+                self._pending[path] = (current, now)
+                continue
+            if now - changed < self.settle_seconds:
+                continue
+            with self._lock:
+                if path in self._running:
+                    # 处理中再次变化：等本次处理结束后再提交
+                    continue
+                self._running.add(path)
+            del self._pending[path]
+            self._processed[path] = signature
+            self.submitted += 1
+            logger.info(f"检测到新的或已修改的论文: {os.path.basename(path)}")
+            executor.submit(self._run, path)
+
+    def _run(self, path: str):
+        try:
+            self.handler(path)
+        except Exception as e:
+            logger.error(f"处理 {os.path.basename(path)} 失败: {str(e)}")
+        finally:
+            with self._lock:
+                self._running.discard(path)
+
+    def _next_timeout(self, now: float) -> float:
+        if not self._pending:
+            return self.poll_interval
+        earliest = min(changed for _, changed in self._pending.values())
+        return min(self.poll_interval, max(0.05, earliest + self.settle_seconds - now))
+
+    def stop(self):
+        self._stop.set()
+
+    def run(self):
+        """阻塞运行直到 stop() 或 KeyboardInterrupt；退出前等待进行中的处理完成"""
+        inotify = None
+        if self.use_inotify:
+            try:
+                inotify = Inotify(self.dir_path)
+            except (OSError, AttributeError) as e:
+                logger.warning(f"inotify不可用，改用定时扫描: {str(e)}")
+
+        # 启动时已存在的文件
+        now = time.monotonic()
+        for name in sorted(os.listdir(self.dir_path)):
+            path = os.path.join(self.dir_path, name)
+            if not self._is_paper(name):
+                continue
+            if self.skip is not None and self.skip(path):
+                signature = self._signature(path)
+                if signature is not None:
+                    self._processed[path] = signature
+                continue
+            # 已存在的文件不需要等待写入完成
+            self._observe(path, now - self.settle_seconds)
+
+        mode = "inotify" if inotify is not None else f"定时扫描（{self.poll_interval}秒）"
+        logger.info(f"开始监视目录: {self.dir_path}（{mode}，并发 {self.max_workers}）")
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="watch")
+        last_scan = now
+        interrupted = False
+        try:
+            while not self._stop.is_set():
+                now = time.monotonic()
+                self._dispatch(executor, now)
+                timeout = self._next_timeout(now)
+                if inotify is not None:
+                    names, overflow = inotify.read(timeout)
+                    now = time.monotonic()
+                    for name in names:
+                        if self._is_paper(name):
+                            self._observe(os.path.join(self.dir_path, name), now)
+                    if overflow or now - last_scan >= self.rescan_interval:
+                        self._scan(now)
+                        last_scan = now
+                else:
+                    self._stop.wait(timeout)
+                    self._scan(time.monotonic())
+        except KeyboardInterrupt:
+            interrupted = True
+            logger.info("停止监视目录，取消排队中的论文，等待进行中的处理完成...")
+            raise
+        finally:
+            # 被中断时排队中的论文不再处理（不会产生LLM调用），之后可用 --resume 继续
+            executor.shutdown(wait=True, cancel_futures=interrupted)
+            if inotify is not None:
+                inotify.close()
+            logger.info(f"目录监视结束，共处理{self.submitted}个文件")
@@ -0,0 +1,340 @@
+"""离线基准测试套件
+
+覆盖以下环节，全部在本地完成，不访问外网、不调用真实LLM：
+  - ExtractDatasetName.extract_sentences / extract_tables（仓库自带的三篇PDF）
+  - Qwen2API.parse_dataset_response（合成的LLM响应）
+  - DatasetDownloader 的URL下载（本地HTTP服务器，含304条件请求）与Git克隆（本地裸仓库）
+  - 使用桩LLM的端到端 process_directory
+
+结果写入JSON，并与基线比较，慢于基线超过容差的用例标记为回归。
+
+用法:
+    python benchmark/run_benchmarks.py                          # 运行全部用例并与基线比较
+    python benchmark/run_benchmarks.py --only extract parse     # 只运行部分用例组
+    python benchmark/run_benchmarks.py --check                  # 有回归时以非零状态退出
+    python benchmark/run_benchmarks.py --update-baseline        # 用本次结果更新基线
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import logging
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+import contextlib
+import io
+from datetime import datetime
+from functools import partial
+from http.server import ThreadingHTTPServer, SimpleHTTPRequestHandler
+from typing import Dict, List, Callable, Optional, Any
+
+MODULE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(MODULE_PATH)
+
+# 关闭进度条和INFO日志，避免干扰计时和输出
+os.environ.setdefault("TQDM_DISABLE", "1")
+logging.basicConfig(level=logging.WARNING)
+logging.getLogger().setLevel(logging.WARNING)
+
+BENCHMARK_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCHMARK_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCHMARK_DIR, "results.json")
+SAMPLE_PDFS = [
+    "FakeNews.pdf",
+    "NeurIPS-2023-reflexion-language-agents-with-verbal-reinforcement-learning-Paper-Conference.pdf",
+    "music_vel.pdf",
+]
+GROUPS = ("extract", "parse", "download", "end_to_end")
+
+
+def measure(func: Callable[[], Any], repeat: int, setup: Optional[Callable[[], Any]] = None,
+            number: int = 1) -> Dict[str, Any]:
+    """重复运行func并统计耗时（秒）；setup在每次计时前运行且不计入耗时"""
+    timings = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        "repeat": repeat,
+        "number": number,
+        "min": min(timings),
+        "median": statistics.median(timings),
+        "mean": statistics.mean(timings),
+    }
+
+
+class LocalHTTPServer:
+    """在后台线程中提供目录静态文件的HTTP服务器（支持Last-Modified/304）"""
+    def __init__(self, directory: str):
+        handler = partial(_QuietHandler, directory=directory)
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class _QuietHandler(SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+class StubLLM:
+    """桩LLM：按提示词类型返回固定响应，不访问网络"""
+    def __init__(self, download_info: Dict[str, List[str]]):
+        self.download_info = download_info
+
+    def call(self, prompt: str):
+        if "请仅返回数据集的名称" in prompt:
+            return f"#### name: {', '.join(self.download_info)}", {}
+        return "####\n" + json.dumps(self.download_info) + "\n####", {}
+
+    def parse_dataset_response(self, response: str):
+        from model.model import Qwen2API
+        return Qwen2API.parse_dataset_response(self, response)
+
+
+def make_git_repo(root: str) -> str:
+    """创建一个包含若干数据文件的本地裸仓库，返回其路径"""
+    work = os.path.join(root, "work")
+    bare = os.path.join(root, "bench_repo.git")
+    os.makedirs(work)
+    for i in range(20):
+        with open(os.path.join(work, f"part-{i:02d}.jsonl"), "w") as f:
+            f.write('{"question": "q", "answer": "a"}\n' * 2000)
+    git = ["git", "-c", "user.name=bench", "-c", "user.email=bench@localhost"]
+    subprocess.run(git + ["init", "-q", work], check=True)
+    subprocess.run(git + ["-C", work, "add", "."], check=True)
+    subprocess.run(git + ["-C", work, "commit", "-q", "-m", "data"], check=True)
+    subprocess.run(["git", "clone", "-q", "--bare", work, bare], check=True)
+    return bare
+
+
+def bench_extract(repeat: int) -> Dict[str, Dict[str, Any]]:
+    from agent.agent import ExtractDatasetName
+    results = {}
+    for pdf in SAMPLE_PDFS:
+        path = os.path.join(MODULE_PATH, pdf)
+        name = os.path.splitext(pdf)[0][:24]
+        extractor = ExtractDatasetName(path)
+        pages = len(extractor.doc)
+        stats = measure(lambda: ExtractDatasetName(path).extract_sentences(), repeat)
+        stats["pages_per_second"] = pages / stats["median"]
+        results[f"extract_sentences[{name}]"] = stats
+        results[f"extract_tables[{name}]"] = measure(lambda: extractor.extract_tables(), max(1, repeat // 2))
+    return results
+
+
+def bench_parse(repeat: int) -> Dict[str, Dict[str, Any]]:
+    from model.model import Qwen2API
+    client = Qwen2API()
+    small = {f"Dataset{i}": ["huggingface", f"org/dataset-{i}"] for i in range(5)}
+    large = {f"Dataset{i}": ["url", f"https://example.org/data/{i}.zip"] for i in range(200)}
+    responses = {
+        "small": "说明文字\n####\n" + json.dumps(small, ensure_ascii=False) + "\n####\n",
+        "large": "####\n" + json.dumps(large, ensure_ascii=False, indent=4) + "\n####",
+        "fenced": "```json\n####\n" + json.dumps(small) + "\n####\n```",
+        "malformed": "####\n{'A': ('git', 'https://github.com/a/b'),}\n####",
+    }
+    results = {}
+    for name, response in responses.items():
+        def run(response=response):
+            # parse_dataset_response 可能打印调试输出和错误日志，计时时丢弃
+            logging.disable(logging.ERROR)
+            try:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    client.parse_dataset_response(response)
+            finally:
+                logging.disable(logging.NOTSET)
+        results[f"parse_dataset_response[{name}]"] = measure(run, repeat, number=200)
+    return results
+
+
+def bench_download(repeat: int, workdir: str) -> Dict[str, Dict[str, Any]]:
+    from tool.dataset_downloader import DatasetDownloader, is_module_available
+    serve_dir = os.path.join(workdir, "serve")
+    os.makedirs(serve_dir)
+    size = 16 * 1024 * 1024
+    with open(os.path.join(serve_dir, "data.bin"), "wb") as f:
+        f.write(os.urandom(size))
+
+    results = {}
+    download_dir = os.path.join(workdir, "downloads")
+    with LocalHTTPServer(serve_dir) as server:
+        url = f"{server.url}/data.bin"
+
+        def fresh():
+            shutil.rmtree(download_dir, ignore_errors=True)
+
+        stats = measure(lambda: DatasetDownloader(download_dir).download_from_url(url), repeat, setup=fresh)
+        stats["mb_per_second"] = size / 1024 / 1024 / stats["median"]
+        results["download_from_url[16MB]"] = stats
+
+        # 已下载过的文件：条件请求应直接得到304
+        fresh()
+        DatasetDownloader(download_dir).download_from_url(url)
+        results["download_from_url_not_modified[16MB]"] = measure(
+            lambda: DatasetDownloader(download_dir).download_from_url(url), repeat)
+
+    if shutil.which("git") and is_module_available("git"):
+        bare = make_git_repo(os.path.join(workdir, "git"))
+        results["download_from_git[local]"] = measure(
+            lambda: DatasetDownloader(download_dir).download_from_git(bare), repeat,
+            setup=lambda: shutil.rmtree(download_dir, ignore_errors=True))
+    return results
+
+
+def bench_end_to_end(repeat: int, workdir: str) -> Dict[str, Dict[str, Any]]:
+    import main
+    papers = os.path.join(workdir, "papers")
+    serve_dir = os.path.join(workdir, "e2e_serve")
+    os.makedirs(papers)
+    os.makedirs(serve_dir)
+    for pdf in SAMPLE_PDFS:
+        shutil.copy(os.path.join(MODULE_PATH, pdf), papers)
+    with open(os.path.join(serve_dir, "bench.zip"), "wb") as f:
+        f.write(os.urandom(1024 * 1024))
+
+    results = {}
+    with LocalHTTPServer(serve_dir) as server:
+        stub = StubLLM({"BenchData": ["url", f"{server.url}/bench.zip"]})
+        original = main.Qwen2API
+        main.Qwen2API = lambda *args, **kwargs: stub
+        runs = [0]
+        try:
+            def run():
+                # 每次使用新的下载目录，避免下载历史和数据集目录影响计时
+                runs[0] += 1
+                download_dir = os.path.join(workdir, f"e2e_downloads_{runs[0]}")
+                main.process_directory(papers, download=True, download_dir=download_dir)
+
+            stats = measure(run, repeat)
+            stats["papers_per_second"] = len(SAMPLE_PDFS) / stats["median"]
+            results["process_directory[3 papers, stub LLM]"] = stats
+        finally:
+            main.Qwen2API = original
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], tolerance: float) -> Dict[str, Dict[str, Any]]:
+    """与基线中位数比较，慢于基线超过容差视为回归"""
+    comparison = {}
+    for name, stats in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            comparison[name] = {"baseline": None, "current": stats["median"], "ratio": None, "regression": False}
+            continue
+        ratio = stats["median"] / base["median"] if base["median"] else None
+        comparison[name] = {
+            "baseline": base["median"],
+            "current": stats["median"],
+            "ratio": ratio,
+            "regression": ratio is not None and ratio > 1 + tolerance
+        }
+    return comparison
+
+
+def git_revision() -> Optional[str]:
+    """当前提交的短哈希；工作区有未提交的修改时加 "-dirty"，表示结果不对应该提交本身"""
+    try:
+        revision = subprocess.run(["git", "-C", MODULE_PATH, "rev-parse", "--short", "HEAD"],
+                                  capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(["git", "-C", MODULE_PATH, "status", "--porcelain", "--untracked-files=no"],
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return f"{revision}-dirty" if dirty else revision
+    except Exception:
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="离线基准测试套件")
+    parser.add_argument("--only", nargs="+", choices=GROUPS, help="只运行指定的用例组")
+    parser.add_argument("--repeat", type=int, default=5, help="每个用例的重复次数")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="结果JSON路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线JSON路径")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="允许慢于基线的比例")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线")
+    parser.add_argument("--check", action="store_true", help="存在回归时以非零状态退出")
+    args = parser.parse_args()
+
+    groups = args.only or GROUPS
+    results: Dict[str, Dict[str, Any]] = {}
+    workdir = tempfile.mkdtemp(prefix="paper_agent_bench_")
+    try:
+        for group in groups:
+            started = time.perf_counter()
+            try:
+                if group == "extract":
+                    results.update(bench_extract(args.repeat))
+                elif group == "parse":
+                    results.update(bench_parse(args.repeat))
+                elif group == "download":
+                    results.update(bench_download(args.repeat, workdir))
+                elif group == "end_to_end":
+                    results.update(bench_end_to_end(args.repeat, workdir))
+            except ImportError as e:
+                print(f"跳过用例组 {group}: 缺少依赖 {e.name}", file=sys.stderr)
+                continue
+            print(f"用例组 {group} 完成，用时 {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+    comparison = compare(results, baseline, args.tolerance)
+
+    meta = {
+        "timestamp": datetime.now().isoformat(),
+        "revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": args.repeat,
+    }
+    report = {"meta": meta, "results": results, "comparison": comparison}
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f"{'用例':<52} {'中位数':>10} {'基线':>10} {'比值':>7}")
+    for name, item in comparison.items():
+        base = f"{item['baseline'] * 1000:.2f}ms" if item["baseline"] is not None else "-"
+        ratio = f"{item['ratio']:.2f}" if item["ratio"] is not None else "-"
+        flag = "  回归" if item["regression"] else ""
+        print(f"{name:<52} {item['current'] * 1000:>8.2f}ms {base:>10} {ratio:>7}{flag}")
+    print(f"结果已写入: {args.output}")
+
+    if args.update_baseline:
+        # 只更新本次运行的用例，每个用例记录其测量时的版本，未重新测量的用例保留原版本
+        merged = dict(baseline.get("results", {}))
+        merged.update({name: {"median": stats["median"], "revision": meta["revision"]}
+                       for name, stats in results.items()})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"meta": meta, "results": merged}, f, ensure_ascii=False, indent=2)
+        print(f"基线已更新: {args.baseline}")
+
+    if args.check and any(item["regression"] for item in comparison.values()):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
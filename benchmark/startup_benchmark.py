@@ -0,0 +1,114 @@
+"""CLI启动耗时基准测试
+
+基于 `python -X importtime` 统计 `main.py` 启动阶段的导入耗时，并测量整体墙钟时间。
+
+用法:
+    python benchmark/startup_benchmark.py                  # 测量 main.py --help
+    python benchmark/startup_benchmark.py --runs 10 --top 15
+    python benchmark/startup_benchmark.py --threshold-ms 100 -- some.pdf --output r.json
+"""
+import os
+import sys
+import re
+import time
+import json
+import argparse
+import statistics
+import subprocess
+from typing import Dict, List, Tuple
+
+MODULE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MAIN_SCRIPT = os.path.join(MODULE_PATH, "main.py")
+
+# importtime 输出格式: "import time: self [us] | cumulative | imported package"
+IMPORTTIME_PATTERN = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S.*)$')
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """解析 -X importtime 输出
+
+    Returns:
+        [(模块名, self微秒, cumulative微秒, 嵌套层级)] 列表
+    """
+    entries = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_PATTERN.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = match.groups()
+        entries.append((name.strip(), int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return entries
+
+
+def run_once(cli_args: List[str]) -> Tuple[float, List[Tuple[str, int, int, int]]]:
+    """运行一次 main.py，返回墙钟耗时(ms)和导入耗时明细"""
+    cmd = [sys.executable, "-X", "importtime", MAIN_SCRIPT] + cli_args
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=MODULE_PATH, capture_output=True, text=True)
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    return elapsed_ms, parse_importtime(proc.stderr)
+
+
+def summarize(runs: List[Tuple[float, List[Tuple[str, int, int, int]]]], top: int) -> Dict:
+    """汇总多次运行结果，导入明细取中位数"""
+    wall = [r[0] for r in runs]
+    cumulative: Dict[str, List[int]] = {}
+    import_totals = []
+    for _, entries in runs:
+        # 顶层导入的cumulative之和即为导入总耗时
+        import_totals.append(sum(e[2] for e in entries if e[3] == 0) / 1000)
+        for name, _, cum_us, _ in entries:
+            cumulative.setdefault(name, []).append(cum_us)
+
+    slowest = sorted(
+        ((name, statistics.median(values) / 1000) for name, values in cumulative.items()),
+        key=lambda item: item[1],
+        reverse=True
+    )[:top]
+
+    return {
+        "runs": len(runs),
+        "wall_ms": {
+            "min": min(wall),
+            "median": statistics.median(wall),
+            "max": max(wall)
+        },
+        "import_ms_median": statistics.median(import_totals),
+        "slowest_imports_ms": [{"module": name, "cumulative_ms": ms} for name, ms in slowest]
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="main.py 启动耗时基准测试")
+    parser.add_argument("--runs", type=int, default=5, help="运行次数")
+    parser.add_argument("--top", type=int, default=10, help="显示最慢的前N个导入")
+    parser.add_argument("--threshold-ms", type=float, default=None,
+                        help="墙钟中位数超过该阈值时以非零状态退出")
+    parser.add_argument("--json", action="store_true", help="以JSON格式输出结果")
+    parser.add_argument("cli_args", nargs="*", help="传给 main.py 的参数，默认 --help")
+    args = parser.parse_args()
+
+    cli_args = args.cli_args or ["--help"]
+    runs = [run_once(cli_args) for _ in range(max(1, args.runs))]
+    summary = summarize(runs, args.top)
+    summary["command"] = ["main.py"] + cli_args
+
+    if args.json:
+        print(json.dumps(summary, ensure_ascii=False, indent=2))
+    else:
+        print(f"命令: {' '.join(summary['command'])}  (运行{summary['runs']}次)")
+        wall = summary["wall_ms"]
+        print(f"墙钟耗时: 最小 {wall['min']:.1f} ms, 中位数 {wall['median']:.1f} ms, 最大 {wall['max']:.1f} ms")
+        print(f"导入耗时中位数: {summary['import_ms_median']:.1f} ms")
+        print("最慢的导入 (cumulative):")
+        for item in summary["slowest_imports_ms"]:
+            print(f"  {item['cumulative_ms']:8.2f} ms  {item['module']}")
+
+    if args.threshold_ms is not None and summary["wall_ms"]["median"] > args.threshold_ms:
+        print(f"启动耗时超过阈值 {args.threshold_ms} ms", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
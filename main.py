@@ -27,7 +27,8 @@ import sys
 import argparse
 import logging
 import json
-from typing import Dict, Tuple, List, Optional, Any
+import threading
+from typing import Dict, Tuple, List, Optional, Any, Callable, TYPE_CHECKING
 from pathlib import Path
 
 # 设置日志
@@ -36,21 +37,31 @@ logger = logging.getLogger(__name__)
 
 # 获取模块路径
 MODULE_PATH = os.path.dirname(os.path.abspath(__file__))
-os.chdir(MODULE_PATH)
 sys.path.append(MODULE_PATH)
 
-# 导入所需模块
-from agent.agent import ExtractDatasetName
-from model.model import Qwen2API, PaperAnalyzer
+# 导入所需模块（各模块内部延迟导入fitz/requests/tqdm等重量级依赖，保证启动速度）
+from agent.agent import source_name
+from model.model import Qwen2API, PaperAnalyzer, DownloadInfoFanout, parse_dataset_names
 from prompt.get_paper_name import GET_PAPER_NAME_PROMPT, GET_DOWNLOAD_URL
 from tool.dataset_downloader import DatasetDownloader
+from tool.download_queue import DownloadQueue
+from tool.dataset_registry import DatasetRegistry, REGISTRY_FILENAME
+from tool.profiler import TRACER
 
-def download_datasets(dataset_info: Dict[str, Tuple[str, str]], download_dir: str = "datasets") -> Dict[str, str]:
+# 流水线、检查点、分片、提及索引等按功能开关使用的模块在用到时才导入，不影响 --help 等命令的启动速度
+if TYPE_CHECKING:
+    from tool.checkpoint import ResultCheckpoint
+    from tool.sharding import LeaseQueue
+    from tool.mention_index import MentionIndex
+
+def download_datasets(dataset_info: Dict[str, Tuple[str, str]], download_dir: str = "datasets",
+                      downloader_options: Optional[Dict[str, Any]] = None) -> Dict[str, str]:
     """使用DatasetDownloader下载数据集
     
     Args:
         dataset_info: 数据集信息字典，格式为 {"数据集名称": ("平台", "URL")}
         download_dir: 下载目录
+        downloader_options: 传给DatasetDownloader的额外参数（如HF文件过滤、并行度等）
     
     Returns:
         下载结果字典，格式为 {"数据集名称": "结果消息"}
@@ -60,83 +71,172 @@ def download_datasets(dataset_info: Dict[str, Tuple[str, str]], download_dir: st
         return {}
     
     logger.info(f"准备下载{len(dataset_info)}个数据集到目录: {download_dir}")
-    downloader = DatasetDownloader(download_dir=download_dir)
+    downloader = DatasetDownloader(download_dir=download_dir, **(downloader_options or {}))
     
-    results = {}
-    for name, info in dataset_info.items():
-        logger.info(f"下载数据集: {name}")
-        try:
-            # 检查是否已经在下载历史中
-            if name in downloader.history and os.path.exists(downloader.history[name].get("path", "")):
-                logger.info(f"数据集 {name} 已存在于下载历史，跳过下载")
-                results[name] = f"已存在: {downloader.history[name]['path']}"
-                continue
-                
-            result = downloader.download(info)
-            results[name] = result
-        except Exception as e:
-            logger.error(f"下载 {name} 时出错: {str(e)}")
-            results[name] = f"下载失败: {str(e)}"
+    # 单篇论文内同样按规范化目标去重，并跳过下载历史中已存在的数据集
+    queue = DownloadQueue(downloader, max_workers=1)
+    interrupted = False
+    try:
+        futures = {name: queue.submit(name, info) for name, info in dataset_info.items()}
+        return DownloadQueue.collect(futures)
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        queue.shutdown(cancel_pending=interrupted)
+
+def run_download_plan(requests: List[Tuple[str, str, Any]], download_dir: str = "datasets",
+                      downloader_options: Optional[Dict[str, Any]] = None,
+                      planner_options: Optional[Dict[str, Any]] = None,
+                      dry_run: bool = False, download_workers: int = 4) -> Dict[str, Dict[str, str]]:
+    """先预检规划再下载：估算大小、检查磁盘空间并排序，然后按计划顺序下载
+    
+    Args:
+        requests: [(论文, 数据集名称, 下载信息)] 列表
+        download_dir: 下载目录
+        downloader_options: 传给DatasetDownloader的额外参数
+        planner_options: 传给DownloadPlanner的额外参数
+        dry_run: 只打印计划，不下载
+        download_workers: 并行下载数
+    
+    Returns:
+        每篇论文的下载结果，格式为 {"论文": {"数据集名称": "结果消息"}}
+    """
+    results: Dict[str, Dict[str, str]] = {}
+    if not requests:
+        logger.warning("没有数据集信息可供下载")
+        return results
     
+    from tool.download_planner import DownloadPlanner
+    downloader = DatasetDownloader(download_dir=download_dir, **(downloader_options or {}))
+    planner = DownloadPlanner(downloader, **(planner_options or {}))
+    plan = planner.plan(requests)
+    print(DownloadPlanner.format_plan(plan))
+    
+    for job in plan["skipped"]:
+        for paper, name in job["requests"]:
+            results.setdefault(paper, {})[name] = f"已跳过: {job['reason']}"
+    if dry_run:
+        for job in plan["jobs"]:
+            for paper, name in job["requests"]:
+                results.setdefault(paper, {})[name] = "计划下载"
+        return results
+    
+    # 线程池按提交顺序执行，即按计划顺序下载
+    queue = DownloadQueue(downloader, max_workers=download_workers)
+    futures: Dict[str, Dict[str, Any]] = {}
+    interrupted = False
+    try:
+        for job in plan["jobs"]:
+            future = queue.submit(job["names"][0], job["info"], job["papers"][0])
+            for paper, name in job["requests"]:
+                futures.setdefault(paper, {})[name] = future
+        for paper, paper_futures in futures.items():
+            results.setdefault(paper, {}).update(DownloadQueue.collect(paper_futures))
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        queue.shutdown(cancel_pending=interrupted)
     return results
 
-def process_pdf(pdf_path: str, download: bool = False, download_dir: str = "datasets", verbose: bool = False) -> Tuple[str, Dict[str, Any]]:
+def process_pdf(pdf_path, download: bool = False, download_dir: str = "datasets", verbose: bool = False,
+                downloader_options: Optional[Dict[str, Any]] = None,
+                download_queue: Optional[DownloadQueue] = None,
+                index: Optional["MentionIndex"] = None,
+                fanout: Optional[DownloadInfoFanout] = None,
+                name: Optional[str] = None) -> Tuple[str, Dict[str, Any]]:
     """处理单个PDF文件，提取数据集信息并可选下载
     
     Args:
-        pdf_path: PDF文件路径
+        pdf_path: 论文文件路径，或内存中的PDF（bytes、memoryview、mmap、文件对象）
         download: 是否下载数据集
         download_dir: 数据集下载目录
         verbose: 是否显示详细日志
+        downloader_options: 传给DatasetDownloader的额外参数
+        download_queue: 批处理共享的下载队列；提供时每得到一个数据集的下载信息就提交任务，
+            结果以Future形式放在返回值的 "download_futures" 中，由调用方统一等待
+        index: 数据集提及索引，提供时写入本论文的数据集、页码和句子
+        fanout: 提供时按数据集拆分并发查询下载信息，每个数据集解析后立即开始下载
+        name: 内存输入的论文名称，用于日志、追踪和提及索引
     
     Returns:
         数据集名称和下载信息元组
     """
+    from agent.source import create_extractor
     if verbose:
         logging.getLogger().setLevel(logging.DEBUG)
     
-    logger.info(f"处理PDF: {pdf_path}")
+    paper = name or source_name(pdf_path)
+    is_path = isinstance(pdf_path, (str, os.PathLike))
+    # --profile 模式下记录整篇论文的区间，期间各阶段的区间都带上论文ID
+    with TRACER.paper(paper), TRACER.span("paper", cat="paper"):
+        logger.info(f"处理PDF: {pdf_path if is_path else paper}")
     
-    # 1. 初始化LLM客户端
-    llm = Qwen2API()
+        # 1. 初始化LLM客户端
+        llm = Qwen2API()
     
-    # 2. 创建论文分析器
-    analyzer = PaperAnalyzer(pdf_path, llm)
+        # 2. 提取与数据集相关的句子（只打开一次PDF，同时用于名称提取和下载信息上下文）
+        #    LaTeX源码包和HTML论文直接读取源文件，不经过PDF渲染
+        extractor = create_extractor(pdf_path, paper)
+        dataset_sentences = extractor.extract_sentences()
+        context = "\n".join(dataset_sentences)
     
-    # 3. 提取数据集名称
-    dataset_names = analyzer.extract_dataset_names()
-    logger.info(f"发现数据集: {dataset_names}")
+        # 3. 创建论文分析器，复用已打开的提取器（本地数据集目录能解析的名称不再询问LLM）
+        registry = DatasetRegistry.shared(os.path.join(download_dir, REGISTRY_FILENAME),
+                                          (downloader_options or {}).get("catalog_paths"))
+        analyzer = PaperAnalyzer(extractor, llm, registry, fanout)
     
-    # 4. 提取与数据集相关的句子作为上下文
-    extractor = ExtractDatasetName(pdf_path)
-    dataset_sentences = extractor.extract_sentences()
-    context = "\n".join(dataset_sentences)
+        # 4. 提取数据集名称
+        dataset_names = analyzer.extract_dataset_names(dataset_sentences)
+        logger.info(f"发现数据集: {dataset_names}")
     
-    # 5. 获取数据集下载信息
-    download_info = analyzer.get_dataset_download_info(dataset_names, context)
+        # 5. 获取数据集下载信息；使用下载队列时每得到一个数据集的下载信息就提交下载，
+        #    与其余数据集的查询并行进行
+        futures = {}
+        def submit_download(name: str, info: Any):
+            futures[name] = download_queue.submit(name, info)
+        use_queue = download and download_queue is not None
+        download_info = analyzer.get_dataset_download_info(dataset_names, context,
+                                                           submit_download if use_queue else None)
+        if index is not None:
+            index.add_paper(paper, parse_dataset_names(dataset_names), download_info,
+                            dataset_sentences, extractor.sentence_pages, pdf_path if is_path else None)
     
-    # 将下载信息存储到结果中
-    download_results = {}
+        # 将下载信息存储到结果中
+        download_results = {}
     
-    if download_info:
-        logger.info(f"数据集下载信息:")
-        for name, info in download_info.items():
-            logger.info(f"  {name}: {info}")
+        if download_info:
+            logger.info(f"数据集下载信息:")
+            for name, info in download_info.items():
+                logger.info(f"  {name}: {info}")
         
-        # 6. 可选：下载数据集
-        if download:
-            logger.info("开始下载数据集...")
-            download_results = download_datasets(download_info, download_dir)
+            # 6. 可选：下载数据集
+            if use_queue:
+                logger.info(f"已提交{len(futures)}个下载任务到下载队列")
+                return dataset_names, {"download_info": download_info, "download_futures": futures}
+            elif download:
+                logger.info("开始下载数据集...")
+                download_results = download_datasets(download_info, download_dir, downloader_options)
             
-            logger.info("下载结果:")
-            for name, result in download_results.items():
-                logger.info(f"  {name}: {result}")
-    else:
-        logger.warning("未找到数据集下载信息")
+                logger.info("下载结果:")
+                for name, result in download_results.items():
+                    logger.info(f"  {name}: {result}")
+        else:
+            logger.warning("未找到数据集下载信息")
     
-    return dataset_names, {"download_info": download_info, "download_results": download_results}
+        return dataset_names, {"download_info": download_info, "download_results": download_results}
 
-def process_directory(dir_path: str, download: bool = False, download_dir: str = "datasets", verbose: bool = False) -> Dict[str, Dict]:
+def process_directory(dir_path: str, download: bool = False, download_dir: str = "datasets", verbose: bool = False,
+                      downloader_options: Optional[Dict[str, Any]] = None, download_workers: int = 4,
+                      planner_options: Optional[Dict[str, Any]] = None, plan_only: bool = False,
+                      pipeline_options: Optional[Dict[str, Any]] = None,
+                      checkpoint: Optional["ResultCheckpoint"] = None, resume: bool = False,
+                      shard: Optional[Tuple[int, int]] = None,
+                      lease_queue: Optional["LeaseQueue"] = None,
+                      index: Optional["MentionIndex"] = None,
+                      fanout: Optional[DownloadInfoFanout] = None,
+                      source_bundles: bool = False) -> Dict[str, Dict]:
     """处理目录下的所有PDF文件
     
     Args:
@@ -144,86 +244,582 @@ def process_directory(dir_path: str, download: bool = False, download_dir: str =
         download: 是否下载数据集
         download_dir: 数据集下载目录
         verbose: 是否显示详细日志
+        downloader_options: 传给DatasetDownloader的额外参数
+        download_workers: 全局下载队列的并行下载数
+        planner_options: 提供时先处理完所有论文，再对全部下载目标统一预检规划后下载
+        plan_only: 只打印下载计划，不下载
+        pipeline_options: 提供时使用分阶段流水线（PaperPipeline）并行处理解析、LLM调用和下载
+        checkpoint: JSONL检查点，每篇论文完成后立即追加其结果
+        resume: 跳过检查点中已成功完成的论文
+        shard: (i, N) 时只处理按文件名哈希属于第i个分片的论文，多台机器各取一个分片
+        lease_queue: 共享文件系统上的租约队列，多台机器动态领取论文；可与shard同时使用
+        index: 数据集提及索引，每篇论文分析完成后增量更新
+        fanout: 按数据集拆分并发查询下载信息，所有论文共享其并发上限
+        source_bundles: 把 .tar.gz/.tgz/.tar 当作arXiv LaTeX源码包处理
     
     Returns:
-        处理结果字典
+        处理结果字典（仅包含本节点处理的论文）
     """
+    from agent.source import is_paper_file
     results = {}
-    pdf_files = list(Path(dir_path).glob("*.pdf"))
+    # PDF、LaTeX源码（.tex，启用时包括源码包）和HTML论文，按文件类型选择提取器
+    pdf_files = [f for f in Path(dir_path).iterdir() if f.is_file() and is_paper_file(f.name, source_bundles)]
     
     if not pdf_files:
-        logger.warning(f"目录中未找到PDF文件: {dir_path}")
+        logger.warning(f"目录中未找到论文文件: {dir_path}")
         return {}
     
-    logger.info(f"找到{len(pdf_files)}个PDF文件")
-    for pdf_file in pdf_files:
+    logger.info(f"找到{len(pdf_files)}个论文文件")
+    if shard is not None:
+        from tool.sharding import select_shard
+        pdf_files = select_shard(pdf_files, *shard)
+        logger.info(f"分片 {shard[0]}/{shard[1]}: 本节点负责{len(pdf_files)}个PDF文件")
+    paper_order = [f.name for f in pdf_files]
+    
+    if resume and checkpoint is not None:
+        completed = checkpoint.completed()
+        results.update({name: result for name, result in completed.items() if name in paper_order})
+        pdf_files = [f for f in pdf_files if f.name not in completed]
+        logger.info(f"从检查点恢复: 已完成{len(results)}篇，剩余{len(pdf_files)}篇")
+    
+    def record(paper: str, result: Dict[str, Any]):
+        """论文结果落盘后再在租约队列中标记完成，节点崩溃时未落盘的论文会被其他节点重做
+
+        处理失败的论文只释放租约而不标记完成，其他节点或之后的运行可以重试。
+        """
+        if checkpoint is not None:
+            checkpoint.append(paper, result)
+        if lease_queue is not None:
+            if "error" in result:
+                lease_queue.release(paper)
+            else:
+                lease_queue.complete(paper)
+    
+    track = checkpoint is not None or lease_queue is not None
+    # 使用下载规划器时，论文的下载在全部论文解析完后才执行，检查点推迟到计划执行之后再写
+    use_planner = planner_options is not None or plan_only
+    defer_record = track and use_planner and (download or plan_only)
+    record_now = track and not defer_record
+    if lease_queue is not None:
+        logger.info(f"租约队列状态: {lease_queue.status(f.name for f in pdf_files)}")
+        pdf_files = lease_queue.claim_each(pdf_files)
+    
+    # 整个批次共享一个下载队列：不同论文中指向同一目标的数据集只下载一次，
+    # 下载与后续论文的解析/LLM调用并行进行
+    download_queue = None
+    if download and not use_planner:
+        downloader = DatasetDownloader(download_dir=download_dir, **(downloader_options or {}))
+        download_queue = DownloadQueue(downloader, max_workers=download_workers)
+    
+    pending = {}
+    processed = []
+    interrupted = False
+    try:
+        if pipeline_options is not None:
+            # 流水线会引入asyncio和multiprocessing，只在启用时导入
+            from agent.pipeline import PaperPipeline
+            if verbose:
+                logging.getLogger().setLevel(logging.DEBUG)
+            registry = DatasetRegistry.shared(os.path.join(download_dir, REGISTRY_FILENAME),
+                                              (downloader_options or {}).get("catalog_paths"))
+            pipeline = PaperPipeline(Qwen2API(), registry, download_queue,
+                                     on_result=record if record_now else None, index=index, fanout=fanout,
+                                     **pipeline_options)
+            pipeline_results = pipeline.run(pdf_files)
+            results.update(pipeline_results)
+            processed.extend(pipeline_results)
+            pdf_files = []
+        
+        for pdf_file in pdf_files:
+            try:
+                logger.info(f"处理: {pdf_file.name}")
+                dataset_names, info = process_pdf(str(pdf_file), download and not use_planner, download_dir,
+                                                  verbose, downloader_options, download_queue, index, fanout)
+                results[pdf_file.name] = {
+                    "dataset_names": dataset_names,
+                    "download_info": info["download_info"],
+                    "download_results": info.get("download_results", {})
+                }
+                if "download_futures" in info:
+                    pending[pdf_file.name] = info["download_futures"]
+            except Exception as e:
+                logger.error(f"处理 {pdf_file.name} 失败: {str(e)}")
+                results[pdf_file.name] = {"error": str(e)}
+            processed.append(pdf_file.name)
+            if record_now:
+                checkpoint_after_downloads(record, pdf_file.name, results[pdf_file.name],
+                                           pending.get(pdf_file.name, {}))
+        
+        # 将合并后的下载结果分发回每篇论文
+        for name, futures in pending.items():
+            results[name]["download_results"] = DownloadQueue.collect(futures)
+        
+        if use_planner and (download or plan_only):
+            # 只规划本次运行处理的论文；从检查点恢复的论文保留其已有的下载结果
+            plan_requests = [(paper, name, info)
+                             for paper in processed
+                             for name, info in (results[paper].get("download_info") or {}).items()]
+            planned = run_download_plan(plan_requests, download_dir, downloader_options, planner_options,
+                                        plan_only, download_workers)
+            for paper, paper_results in planned.items():
+                results[paper]["download_results"] = paper_results
+            if defer_record:
+                for paper in processed:
+                    record(paper, results[paper])
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        if download_queue is not None:
+            download_queue.shutdown(cancel_pending=interrupted)
+    
+    return {name: results[name] for name in paper_order if name in results}
+
+def watch_directory(dir_path: str, download: bool = False, download_dir: str = "datasets", verbose: bool = False,
+                    downloader_options: Optional[Dict[str, Any]] = None, download_workers: int = 4,
+                    checkpoint: Optional["ResultCheckpoint"] = None, resume: bool = False,
+                    watch_options: Optional[Dict[str, Any]] = None, index: Optional["MentionIndex"] = None,
+                    fanout: Optional[DownloadInfoFanout] = None):
+    """持续监视目录，新增或修改的PDF写入完成后立即通过process_pdf处理
+    
+    Args:
+        dir_path: 监视的目录
+        download: 是否下载数据集
+        download_dir: 数据集下载目录
+        verbose: 是否显示详细日志
+        downloader_options: 传给DatasetDownloader的额外参数
+        download_workers: 共享下载队列的并行下载数
+        checkpoint: JSONL检查点，每篇论文完成后追加其结果
+        resume: 启动时跳过检查点中已成功完成的论文
+        watch_options: 传给FolderWatcher的参数（防抖时间、扫描间隔、并发数等）
+        index: 数据集提及索引，每处理一篇论文增量更新
+        fanout: 按数据集拆分并发查询下载信息
+    """
+    from agent.watcher import FolderWatcher
+    
+    completed = set(checkpoint.completed()) if (checkpoint is not None and resume) else set()
+    download_queue = None
+    if download:
+        downloader = DatasetDownloader(download_dir=download_dir, **(downloader_options or {}))
+        download_queue = DownloadQueue(downloader, max_workers=download_workers, retry_failed=True)
+    
+    def handle(pdf_path: str):
+        name = os.path.basename(pdf_path)
+        futures = {}
         try:
-            logger.info(f"处理: {pdf_file.name}")
-            dataset_names, info = process_pdf(str(pdf_file), download, download_dir, verbose)
-            results[pdf_file.name] = {
+            dataset_names, info = process_pdf(pdf_path, download, download_dir, verbose,
+                                              downloader_options, download_queue, index, fanout)
+            result = {
                 "dataset_names": dataset_names,
                 "download_info": info["download_info"],
-                "download_results": info["download_results"]
+                "download_results": info.get("download_results", {})
             }
+            futures = info.get("download_futures", {})
         except Exception as e:
-            logger.error(f"处理 {pdf_file.name} 失败: {str(e)}")
-            results[pdf_file.name] = {"error": str(e)}
+            logger.error(f"处理 {name} 失败: {str(e)}")
+            result = {"error": str(e)}
+        if checkpoint is not None:
+            checkpoint_after_downloads(checkpoint.append, name, result, futures)
     
-    return results
+    watcher = FolderWatcher(dir_path, handle, skip=lambda path: os.path.basename(path) in completed,
+                            **(watch_options or {}))
+    interrupted = False
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        interrupted = True
+        raise
+    finally:
+        if download_queue is not None:
+            download_queue.shutdown(cancel_pending=interrupted)
+
+def checkpoint_after_downloads(record: Callable[[str, Dict[str, Any]], None], paper: str, result: Dict[str, Any],
+                               futures: Dict[str, Any]):
+    """论文的下载任务全部完成后用record记录其结果（如写入检查点）；没有下载任务时立即记录
+
+    下载任务因中断被取消时不记录，论文保持未完成状态，--resume 时会重新处理。
+    """
+    if not futures:
+        record(paper, result)
+        return
+    
+    remaining = [len(futures)]
+    lock = threading.Lock()
+    
+    def on_done(_):
+        with lock:
+            remaining[0] -= 1
+            if remaining[0]:
+                return
+        if any(future.cancelled() for future in futures.values()):
+            return
+        record(paper, dict(result, download_results=DownloadQueue.collect(futures)))
+    
+    for future in futures.values():
+        future.add_done_callback(on_done)
 
 def save_results(results: Dict, output_path: str):
-    """保存结果到JSON文件
+    """保存结果到JSON文件（原子写入）
     
     Args:
         results: 处理结果字典
         output_path: 输出文件路径
     """
+    from tool.checkpoint import write_json_atomic
     try:
-        with open(output_path, 'w', encoding='utf-8') as f:
-            json.dump(results, f, ensure_ascii=False, indent=2)
+        write_json_atomic(results, output_path)
         logger.info(f"结果已保存到: {output_path}")
     except Exception as e:
         logger.error(f"保存结果失败: {str(e)}")
 
+def save_profile(trace_path: str):
+    """保存性能追踪结果并打印各阶段耗时汇总"""
+    try:
+        TRACER.save(trace_path)
+    except Exception as e:
+        logger.error(f"保存性能追踪失败: {str(e)}")
+        return
+    print("\n阶段耗时汇总:")
+    print(f"  {'阶段':<18}{'次数':>6}{'总耗时(ms)':>14}{'最长(ms)':>12}")
+    for name, item in sorted(TRACER.summary().items(), key=lambda kv: -kv[1]["total_ms"]):
+        print(f"  {name:<18}{item['count']:>6}{item['total_ms']:>14.1f}{item['max_ms']:>12.1f}")
+
+def query_index(index_path: str, names: Optional[List[str]] = None, papers: Optional[List[str]] = None,
+                list_datasets: bool = False, max_sentences: int = 3) -> Dict[str, Any]:
+    """查询数据集提及索引并打印结果，不解析PDF也不调用LLM
+    
+    Args:
+        index_path: 索引文件路径
+        names: 要查询的数据集名称，返回使用它们的论文、页码和句子
+        papers: 要查询的论文文件名，返回其使用的数据集
+        list_datasets: 列出索引中的全部数据集及论文数
+        max_sentences: 每篇论文最多打印的提及句子数
+    
+    Returns:
+        查询结果字典，可保存为JSON
+    """
+    from tool.mention_index import MentionIndex
+    if not os.path.exists(index_path):
+        logger.error(f"提及索引不存在: {index_path}，请先使用 --index 处理论文以建立索引")
+        return {}
+    index = MentionIndex(index_path)
+    results: Dict[str, Any] = {}
+    try:
+        for name in names or []:
+            found = index.find_papers(name, max_sentences)
+            results.setdefault("datasets", {})[name] = found
+            if found["key"] is None:
+                print(f"\n数据集 {name}: 索引中未找到")
+                continue
+            matched = f"（近似匹配 {found['key']}，非精确结果）" if found["approximate"] else ""
+            print(f"\n数据集 {name}{matched}: {len(found['papers'])}篇论文")
+            for item in found["papers"]:
+                pages = ",".join(str(page) for page in item["pages"]) or "-"
+                print(f"  {item['paper']}  页码: {pages}  提及: {item['mention_count']}次")
+                for mention in item["mentions"]:
+                    # LaTeX/HTML论文没有页码
+                    page = f"[p{mention['page']}] " if mention["page"] is not None else ""
+                    print(f"    {page}{mention['sentence'][:160]}")
+        for paper in papers or []:
+            datasets = index.paper_datasets(paper)
+            results.setdefault("papers", {})[paper] = datasets
+            print(f"\n论文 {paper}: {len(datasets)}个数据集")
+            for item in datasets:
+                target = f"  {item['source']}: {item['target']}" if item["target"] else ""
+                print(f"  {item['dataset']}  提及: {item['mention_count']}次{target}")
+        if list_datasets:
+            datasets = index.datasets()
+            results["all_datasets"] = datasets
+            print(f"\n索引中共{len(datasets)}个数据集（{index.stats()['papers']}篇论文）:")
+            for item in datasets:
+                print(f"  {item['dataset']:<40}{item['papers']:>6}篇论文")
+    finally:
+        index.close()
+    return results
+
+def build_downloader_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """从命令行参数构建DatasetDownloader的额外参数"""
+    from tool.download_planner import parse_size
+    return {
+        "hf_allow_patterns": args.hf_allow,
+        "hf_ignore_patterns": args.hf_ignore,
+        "hf_splits": args.hf_split,
+        "hf_configs": args.hf_config,
+        "hf_file_types": args.hf_file_type,
+        "hf_max_workers": args.hf_max_workers,
+        "hf_use_cache": not args.hf_no_cache,
+        "metadata_only": args.metadata_only,
+        "verify_sidecar_checksums": args.verify_checksums,
+        "url_bandwidth_limit": parse_size(args.url_bandwidth_limit),
+        "catalog_paths": args.catalog,
+        "extract_archives": args.extract,
+        "extract_include": args.extract_include,
+        "extract_exclude": args.extract_exclude
+    }
+
+def build_pipeline_options(args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """从命令行参数构建PaperPipeline的参数，未启用流水线时返回None"""
+    if not args.pipeline:
+        return None
+    return {
+        "parse_workers": args.parse_workers,
+        "llm_concurrency": args.llm_concurrency,
+        "queue_size": args.queue_size
+    }
+
+def build_watch_options(args: argparse.Namespace) -> Dict[str, Any]:
+    """从命令行参数构建FolderWatcher的参数"""
+    return {
+        "settle_seconds": args.watch_settle,
+        "poll_interval": args.watch_interval,
+        "max_workers": args.watch_workers,
+        "use_inotify": not args.watch_polling,
+        "source_bundles": args.source_bundles
+    }
+
+def build_planner_options(args: argparse.Namespace) -> Optional[Dict[str, Any]]:
+    """从命令行参数构建DownloadPlanner的参数，未启用预检时返回None"""
+    if not (args.plan or args.preflight):
+        return None
+    from tool.download_planner import parse_size
+    return {
+        "min_free_bytes": parse_size(args.min_free_space),
+        "max_dataset_bytes": parse_size(args.max_dataset_size),
+        "order": args.order,
+        "skip_unknown": args.skip_unknown_size
+    }
+
 def main():
     """主函数：解析命令行参数并处理PDF文件"""
     parser = argparse.ArgumentParser(description="论文数据集提取与下载工具")
-    parser.add_argument("path", help="PDF文件或包含PDF文件的目录路径")
+    parser.add_argument("path", nargs="?", help="PDF文件或包含PDF文件的目录路径，\"-\" 表示从标准输入读取PDF（--serve 模式下不需要）")
+    parser.add_argument("--name", help="从标准输入读取PDF时的论文名称，用于日志、结果和提及索引（默认 stdin.pdf）")
     parser.add_argument("--download", "-d", action="store_true", help="自动下载发现的数据集")
     parser.add_argument("--download-dir", type=str, default="datasets", help="数据集下载目录")
     parser.add_argument("--verbose", "-v", action="store_true", help="显示详细日志")
     parser.add_argument("--output", "-o", help="将结果保存到JSON文件")
     parser.add_argument("--batch", "-b", action="store_true", help="批处理模式，处理目录下所有PDF")
+    parser.add_argument("--source-bundles", action="store_true",
+                        help="把 .tar.gz/.tgz/.tar 当作arXiv LaTeX源码包处理（默认忽略，避免误处理数据集归档）")
+    # 批处理流水线
+    parser.add_argument("--pipeline", action="store_true", help="批处理时使用分阶段流水线，解析、LLM调用和下载并行进行")
+    parser.add_argument("--parse-workers", type=int, default=None, help="流水线PDF解析进程数，默认CPU核数；0表示在线程中解析")
+    parser.add_argument("--llm-concurrency", type=int, default=4, help="流水线并发LLM调用数")
+    parser.add_argument("--queue-size", type=int, default=8, help="流水线阶段间队列容量（背压阈值）")
+    # 检查点与断点续跑
+    parser.add_argument("--checkpoint", help="批处理结果的JSONL检查点路径，默认为 <output>.jsonl")
+    parser.add_argument("--resume", action="store_true", help="跳过检查点中已完成的论文，继续上次中断的批处理")
+    parser.add_argument("--catalog", nargs="+", help="额外加载的本地数据集目录JSON文件")
+    # 下载队列与完整性校验
+    parser.add_argument("--download-workers", type=int, default=4, help="批处理模式下全局下载队列的并行下载数")
+    parser.add_argument("--verify-checksums", action="store_true",
+                        help="URL下载时额外获取 <url>.sha256/.md5 校验文件进行校验")
+    # 下载预检规划
+    parser.add_argument("--plan", action="store_true", help="只打印下载计划（预估大小、磁盘检查、下载顺序），不下载")
+    parser.add_argument("--preflight", action="store_true", help="下载前先按计划预检：估算大小、检查磁盘并排序")
+    parser.add_argument("--order", choices=["size", "priority"], default="size",
+                        help="下载顺序：size 小文件优先；priority 被更多论文引用的优先")
+    parser.add_argument("--min-free-space", default="1GB", help="下载后至少保留的磁盘空间，如 10GB")
+    parser.add_argument("--max-dataset-size", help="单个数据集大小上限，超过则跳过，如 50GB")
+    parser.add_argument("--skip-unknown-size", action="store_true", help="跳过无法估算大小的数据集")
+    parser.add_argument("--url-bandwidth-limit", "--bandwidth-limit", dest="url_bandwidth_limit",
+                        help="URL直接下载的总带宽上限（每秒），如 20MB；HF、Git、Kaggle下载不受限制")
+    # URL下载的归档解包
+    parser.add_argument("--extract", action="store_true",
+                        help="解包URL下载的归档：tar/.tar.gz/.tar.zst等边下载边解包，zip下载后立即解包，不保留归档")
+    parser.add_argument("--extract-include", nargs="+", help="只解包匹配这些模式的成员，如 '*.csv' 'train/*'")
+    parser.add_argument("--extract-exclude", nargs="+", help="跳过匹配这些模式的成员")
+    # HuggingFace选择性下载
+    parser.add_argument("--hf-allow", nargs="+", help="仅下载匹配这些模式的HF文件，如 '*.parquet'；与--hf-split等条件同时设置时取交集")
+    parser.add_argument("--hf-ignore", nargs="+", help="跳过匹配这些模式的HF文件")
+    parser.add_argument("--hf-split", nargs="+", help="仅下载指定的数据划分，如 train validation")
+    parser.add_argument("--hf-config", nargs="+", help="仅下载指定的数据集配置")
+    parser.add_argument("--hf-file-type", nargs="+", help="仅下载指定类型的文件，如 parquet json")
+    parser.add_argument("--hf-max-workers", type=int, default=8, help="HF并行下载线程数")
+    parser.add_argument("--hf-no-cache", action="store_true", help="不复用HF缓存，下载副本到下载目录")
+    parser.add_argument("--metadata-only", action="store_true", help="仅记录HF数据集的文件列表和大小，不下载数据")
+    # 多节点分片
+    parser.add_argument("--shard", help="只处理第i个分片（共N个，按文件名哈希划分），格式 i/N，i从0开始")
+    parser.add_argument("--lease-dir", help="共享文件系统上的租约队列目录，多台机器动态领取论文")
+    parser.add_argument("--node-id", help="租约队列中的节点标识，默认 主机名-进程号")
+    parser.add_argument("--lease-seconds", type=float, default=600, help="租约超过多少秒未刷新视为节点失联，由其他节点接管")
+    parser.add_argument("--merge", nargs="+", metavar="RESULT_FILE",
+                        help="合并各分片/节点的结果文件（JSON或JSONL）到 --output 指定的文件")
+    # 监视目录
+    parser.add_argument("--watch", action="store_true", help="持续监视目录，处理新增或修改的PDF（Ctrl-C退出）")
+    parser.add_argument("--watch-settle", type=float, default=2.0, help="文件大小和修改时间保持不变多少秒后才处理（防抖）")
+    parser.add_argument("--watch-interval", type=float, default=2.0, help="定时扫描模式的扫描间隔（秒）")
+    parser.add_argument("--watch-workers", type=int, default=2, help="同时处理的PDF数上限")
+    parser.add_argument("--watch-polling", action="store_true", help="不使用inotify，始终定时扫描（如网络文件系统）")
+    # 常驻服务
+    parser.add_argument("--serve", nargs="?", const="127.0.0.1:8765", metavar="ADDRESS",
+                        help="以常驻服务模式运行，通过HTTP接口处理论文；地址为 host:port 或 unix:/path.sock，默认 127.0.0.1:8765")
+    parser.add_argument("--max-concurrent", type=int, default=4, help="服务模式下同时处理的论文数上限")
+    # 下载信息按数据集并发查询
+    parser.add_argument("--fanout", action="store_true",
+                        help="论文提到多个数据集时，为每个数据集单独发送只含相关句子的提示词并发查询下载信息，解析一个下载一个")
+    parser.add_argument("--fanout-concurrency", type=int, default=4, help="按数据集查询的全局并发LLM调用数（所有论文共享）")
+    # 数据集提及索引
+    parser.add_argument("--index", metavar="PATH",
+                        help="处理论文时增量更新此数据集提及索引（SQLite）；查询时默认读取 <download-dir>/mention_index.sqlite")
+    parser.add_argument("--query", nargs="+", metavar="DATASET", help="查询使用指定数据集的论文、页码和句子，如 --query HotPotQA")
+    parser.add_argument("--query-paper", nargs="+", metavar="PAPER", help="查询指定论文（文件名）使用的数据集")
+    parser.add_argument("--list-datasets", action="store_true", help="列出索引中的全部数据集及引用它们的论文数")
+    parser.add_argument("--max-sentences", type=int, default=3, help="查询时每篇论文最多显示的提及句子数")
+    # 性能追踪
+    parser.add_argument("--profile", action="store_true",
+                        help="记录各阶段耗时并输出Chrome trace JSON，可在 chrome://tracing 或 Perfetto 中查看")
+    parser.add_argument("--trace-out", default="trace.json", metavar="TRACE_JSON",
+                        help="--profile 的trace输出路径，默认为 trace.json")
+    parser.add_argument("--profile-stats", metavar="DIR", help="与 --profile 一起使用，按阶段输出cProfile结果 <阶段>.prof 到该目录")
     
     args = parser.parse_args()
+    from tool.mention_index import MentionIndex, INDEX_FILENAME
+    downloader_options = build_downloader_options(args)
+    planner_options = build_planner_options(args)
+    pipeline_options = build_pipeline_options(args)
+    
+    if args.query or args.query_paper or args.list_datasets:
+        index_path = args.index or os.path.join(args.download_dir, INDEX_FILENAME)
+        results = query_index(index_path, args.query, args.query_paper, args.list_datasets, args.max_sentences)
+        if args.output and results:
+            save_results(results, args.output)
+        return 0 if results else 1
+    
+    if args.serve:
+        # 服务相关模块只在服务模式下导入，不影响普通命令的启动速度
+        from agent.service import PaperService, serve
+        service = PaperService(args.download_dir, downloader_options, args.download_workers, args.max_concurrent,
+                               index=MentionIndex(args.index) if args.index else None,
+                               fanout=DownloadInfoFanout(args.fanout_concurrency) if args.fanout else None)
+        serve(args.serve, service)
+        return 0
     
-    # 检查路径是否存在
-    if not os.path.exists(args.path):
+    if args.merge:
+        if not args.output:
+            parser.error("--merge 需要指定 --output")
+        from tool.sharding import merge_results
+        merge_results(args.merge, args.output)
+        return 0
+    
+    if not args.path:
+        parser.error("需要指定PDF文件或目录路径")
+    
+    # 检查路径是否存在（"-" 为标准输入）
+    if args.path != "-" and not os.path.exists(args.path):
         logger.error(f"路径不存在: {args.path}")
         return 1
     
+    if args.profile_stats:
+        args.profile = True
+    if args.profile:
+        TRACER.start(args.profile_stats)
+    
+    # 指定 --index 时增量更新数据集提及索引，之后可用 --query 直接查询
+    index = MentionIndex(args.index) if args.index else None
+    fanout = DownloadInfoFanout(args.fanout_concurrency) if args.fanout else None
     try:
         results = {}
         
+        if args.watch:
+            if not os.path.isdir(args.path):
+                logger.error(f"--watch 需要指定目录: {args.path}")
+                return 1
+            from tool.checkpoint import ResultCheckpoint
+            checkpoint_path = args.checkpoint or (f"{args.output}.jsonl" if args.output else None)
+            checkpoint = ResultCheckpoint(checkpoint_path) if checkpoint_path else None
+            try:
+                watch_directory(args.path, args.download, args.download_dir, args.verbose, downloader_options,
+                                args.download_workers, checkpoint, args.resume, build_watch_options(args), index,
+                                fanout)
+            except KeyboardInterrupt:
+                pass
+            # 退出时将检查点压缩为常规的JSON输出
+            if checkpoint is not None and args.output and os.path.exists(checkpoint_path):
+                checkpoint.compact(args.output)
+            return 0
+        
         # 判断是处理单个文件还是目录
         if os.path.isdir(args.path) or args.batch:
             # 处理目录
             logger.info(f"批处理目录: {args.path}")
-            results = process_directory(args.path, args.download, args.download_dir, args.verbose)
+            from tool.checkpoint import ResultCheckpoint
+            from tool.sharding import LeaseQueue, parse_shard, shard_output_path, default_node_id
+            shard = parse_shard(args.shard) if args.shard else None
+            lease_queue = None
+            if args.lease_dir:
+                lease_queue = LeaseQueue(args.lease_dir, args.node_id or default_node_id(), args.lease_seconds)
+            # 多节点运行时每个分片/节点写各自的结果文件，最后用 --merge 合并
+            if args.output and (shard or lease_queue):
+                suffix = f"shard-{shard[0]}-of-{shard[1]}" if shard else ""
+                if lease_queue is not None:
+                    suffix = ".".join(filter(None, [suffix, f"node-{lease_queue.node_id}"]))
+                args.output = shard_output_path(args.output, suffix)
+                logger.info(f"本节点结果文件: {args.output}")
+            checkpoint_path = args.checkpoint or (f"{args.output}.jsonl" if args.output else None)
+            if args.resume and not checkpoint_path:
+                logger.error("--resume 需要指定 --checkpoint 或 --output")
+                return 1
+            checkpoint = ResultCheckpoint(checkpoint_path) if checkpoint_path else None
+            if checkpoint is not None and not args.resume and lease_queue is None and os.path.exists(checkpoint_path):
+                # 非续跑模式下重新开始，避免混入上一次运行的结果（租约队列的完成标记与检查点对应，不能删除）
+                os.remove(checkpoint_path)
+            try:
+                results = process_directory(args.path, args.download, args.download_dir, args.verbose,
+                                            downloader_options, args.download_workers, planner_options, args.plan,
+                                            pipeline_options, checkpoint, args.resume, shard, lease_queue, index,
+                                            fanout, args.source_bundles)
+            finally:
+                if lease_queue is not None:
+                    lease_queue.close()
+            
+            # 最后将检查点压缩为常规的JSON输出
+            if checkpoint is not None and args.output:
+                checkpoint.compact(args.output, order=list(results))
+                return 0
         else:
-            # 处理单个PDF文件
+            # 处理单个PDF文件；"-" 时整篇PDF读入内存处理，不落盘
             pdf_path = args.path
-            if not pdf_path.lower().endswith('.pdf'):
-                logger.error(f"文件不是PDF格式: {pdf_path}")
+            paper_name = None
+            from agent.source import is_paper_file
+            if pdf_path == "-":
+                pdf_path = sys.stdin.buffer.read()
+                paper_name = args.name or "stdin.pdf"
+            elif not is_paper_file(pdf_path, args.source_bundles):
+                logger.error(f"不支持的文件格式（支持PDF、LaTeX源码 .tex 和HTML，源码包需加 --source-bundles）: {pdf_path}")
                 return 1
                 
-            dataset_names, info = process_pdf(pdf_path, args.download, args.download_dir, args.verbose)
+            download = args.download and planner_options is None
+            download_queue = None
+            if download and fanout is not None:
+                # 按数据集拆分查询时，每个数据集解析后立即开始下载
+                downloader = DatasetDownloader(download_dir=args.download_dir, **downloader_options)
+                download_queue = DownloadQueue(downloader, max_workers=args.download_workers)
+            interrupted = False
+            try:
+                dataset_names, info = process_pdf(pdf_path, download, args.download_dir, args.verbose,
+                                                  downloader_options, download_queue, index, fanout, paper_name)
+                download_results = info.get("download_results", {})
+                if "download_futures" in info:
+                    download_results = DownloadQueue.collect(info["download_futures"])
+            except KeyboardInterrupt:
+                interrupted = True
+                raise
+            finally:
+                if download_queue is not None:
+                    download_queue.shutdown(cancel_pending=interrupted)
+            pdf_path = paper_name or pdf_path
             results = {
                 "pdf": pdf_path,
                 "dataset_names": dataset_names,
                 "download_info": info["download_info"],
-                "download_results": info["download_results"]
+                "download_results": download_results
             }
+            if planner_options is not None and (args.download or args.plan):
+                plan_requests = [(pdf_path, name, dl_info) for name, dl_info in (info["download_info"] or {}).items()]
+                planned = run_download_plan(plan_requests, args.download_dir, downloader_options, planner_options,
+                                            args.plan, args.download_workers)
+                results["download_results"] = planned.get(pdf_path, {})
         
         # 保存结果到JSON文件
         if args.output:
@@ -231,14 +827,27 @@ def main():
             
         return 0
         
+    except KeyboardInterrupt:
+        logger.warning("处理被中断，已完成的论文保存在检查点中，可使用 --resume 继续")
+        return 130
     except Exception as e:
         logger.error(f"处理过程中出错: {str(e)}")
         if args.verbose:
             import traceback
             traceback.print_exc()
         return 1
+    finally:
+        if fanout is not None:
+            fanout.shutdown()
+        if index is not None:
+            index.close()
+        if args.profile:
+            save_profile(args.trace_out)
 
 if __name__ == "__main__":
+    # 仅在作为脚本运行时切换工作目录，避免导入时的副作用
+    os.chdir(MODULE_PATH)
+    
     # 如果直接运行，使用默认参数
     if len(sys.argv) == 1:
         # 使用默认示例PDF文件
@@ -1,12 +1,14 @@
-import fitz  # PyMuPDF
 import re
+import ast
 import json
-import requests
 import os
 import sys
 import logging
-from typing import Tuple, Dict, Any, Optional
+from typing import Tuple, Dict, Any, Optional, List, Callable
 import time
+import hashlib
+import threading
+from collections import OrderedDict
 
 # 设置日志记录
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
@@ -18,8 +20,10 @@ sys.path.append(MODULE_PATH)  # 添加项目根目录到Python路径
 
 from prompt.get_paper_name import (
     GET_PAPER_NAME_PROMPT,
-    GET_DOWNLOAD_URL
+    GET_DOWNLOAD_URL,
+    REPAIR_DOWNLOAD_INFO_PROMPT
 )
+from tool.profiler import TRACER
 
 class LLMClient:
     """基础LLM客户端类，可以扩展支持不同的模型"""
@@ -35,11 +39,15 @@ class LLMClient:
 class Qwen2API(LLMClient):
     
     def __init__(self, api_key="your_api_key", 
-                engine_name="chatgpt-4o-latest", max_retries=3, retry_delay=2):
+                engine_name="chatgpt-4o-latest", max_retries=3, retry_delay=2, pool_size=8):
         super().__init__()
         self.api_key = api_key
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        # 复用HTTP连接的会话，首次调用时创建，多线程共享同一连接池
+        self.pool_size = pool_size
+        self._session = None
+        self._session_lock = threading.Lock()
         
         # 解析模型名称和温度
         if "#" in engine_name:
@@ -50,6 +58,20 @@ class Qwen2API(LLMClient):
             self.engine_name = engine_name
             self.temperature = 0.7  # 默认温度
 
+    def session(self):
+        """获取带连接池的requests会话（keep-alive，避免每次调用重新建立TLS连接）"""
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    import requests
+                    from requests.adapters import HTTPAdapter
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("https://", adapter)
+                    session.mount("http://", adapter)
+                    self._session = session
+        return self._session
+
     def call(self, prompt: str) -> Tuple[str, Dict[str, Any]]:
         """调用API并处理重试逻辑"""
         params = {
@@ -63,7 +85,7 @@ class Qwen2API(LLMClient):
         for attempt in range(self.max_retries):
             try:
                 logger.info(f"调用API，尝试 {attempt+1}/{self.max_retries}")
-                response = requests.post(
+                response = self.session().post(
                     "your_api_url",
                     headers=headers,
                     json=params,
@@ -93,46 +115,354 @@ class Qwen2API(LLMClient):
                     return f"API调用异常: {str(e)}", {"error": str(e)}
 
     def parse_dataset_response(self, response: str) -> Dict[str, Tuple[str, str]]:
-        """解析API返回的数据集信息"""
-        try:
-            # 提取格式化部分
-            if "####" in response:
-                print("*"*30)
-                print(response)
-                print("*"*30)
-                response = response.split("####")[-2].strip()
-                print("*"*30)
-                print(response)
-                print("*"*30)
-            
-            # 尝试解析JSON字典
-            return json.loads(response)
-        except Exception as e:
-            logger.error(f"解析数据集响应失败: {str(e)}")
+        """解析API返回的数据集信息，格式不规范时尽量在本地修复（见 parse_download_info）"""
+        download_info, repairs = parse_download_info(response)
+        if download_info is None:
+            logger.error("解析数据集响应失败: 未找到可解析的字典")
             logger.debug(f"原始响应: {response}")
             return {}
+        if repairs:
+            logger.warning(f"数据集响应格式已修复: {', '.join(repairs)}")
+        return download_info
+
+class CachedLLMClient(LLMClient):
+    """带LRU响应缓存的LLM客户端包装
+
+    以提示词的SHA-256为键缓存 (响应, 用量)，同一论文或相同上下文再次提交时不再调用API。
+    调用失败的响应不缓存。适用于长时间运行的服务。
+    """
+    def __init__(self, client: LLMClient, max_entries: int = 1024):
+        super().__init__()
+        self.client = client
+        self.max_entries = max_entries
+        self._cache: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def call(self, prompt: str) -> Tuple[str, Dict[str, Any]]:
+        key = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return self._cache[key]
+            self.misses += 1
+        response, usage = self.client.call(prompt)
+        if response and not response.startswith(("API调用失败", "API调用异常")):
+            with self._lock:
+                self._cache[key] = (response, usage)
+                self._cache.move_to_end(key)
+                while len(self._cache) > self.max_entries:
+                    self._cache.popitem(last=False)
+        return response, usage
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._cache), "hits": self.hits, "misses": self.misses}
+
+# 响应中的Markdown代码块
+FENCE_PATTERN = re.compile(r'```[\w-]*[ \t]*\n?(.*?)```', re.DOTALL)
+TRAILING_COMMA_PATTERN = re.compile(r',(\s*[}\]\)])')
+# 换行分隔但缺少逗号的相邻条目，如 `["git", "..."]\n  "B": ...`
+MISSING_COMMA_PATTERN = re.compile(r'([\]\)"\'])(\s*\n\s*["\'])')
+SMART_QUOTES = str.maketrans({"\u201c": '"', "\u201d": '"', "\u2018": "'", "\u2019": "'"})
+
+def _response_candidates(response: str):
+    """按可信度从高到低产出可能包含下载信息字典的文本块"""
+    if "####" in response:
+        parts = response.split("####")
+        # 成对 #### 之间的内容，从后往前；只有一个标记时取其后的内容
+        blocks = parts[1:-1] if len(parts) > 2 else parts[1:]
+        for block in reversed(blocks):
+            yield block
+    for match in FENCE_PATTERN.finditer(response):
+        yield match.group(1)
+    yield response
+
+def _scan_code(text: str):
+    """逐字符扫描类JSON文本，产出 (位置, 字符, 是否在字符串字面量中)，支持单双引号和反斜杠转义"""
+    quote = None
+    escaped = False
+    for i, char in enumerate(text):
+        if quote is None:
+            if char in "\"'":
+                quote = char
+                yield i, char, True
+                continue
+            yield i, char, False
+        else:
+            yield i, char, True
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == quote:
+                quote = None
+
+def _strip_comments(text: str) -> str:
+    """去掉字符串字面量之外的 // 和 # 注释（整行或行尾），保留 "https://" 等字符串中的内容"""
+    out = []
+    skip_to_newline = False
+    for i, char, in_string in _scan_code(text):
+        if skip_to_newline:
+            if char != "\n":
+                continue
+            skip_to_newline = False
+        elif not in_string and (text.startswith("//", i) or char == "#"):
+            skip_to_newline = True
+            continue
+        out.append(char)
+    return "".join(out)
+
+def _dict_snippets(text: str) -> List[str]:
+    """文本中所有最外层的 {...} 片段（跳过字符串中的花括号），按出现顺序返回
+
+    只在花括号内部识别字符串，片段之间说明文字中的撇号（如 "Here's"）不影响配对。
+    """
+    snippets, depth, start = [], 0, 0
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "{":
+            if depth == 0:
+                start = i
+            depth += 1
+        elif char == "}" and depth:
+            depth -= 1
+            if depth == 0:
+                snippets.append(text[start:i + 1])
+        elif char in "\"'" and depth:
+            # 跳到字符串结束处
+            i += 1
+            while i < len(text) and text[i] != char:
+                i += 2 if text[i] == "\\" else 1
+        i += 1
+    return snippets
+
+def _parse_literal(text: str) -> Tuple[Optional[Any], List[str]]:
+    """按严格JSON、Python字面量、修复后重试的顺序解析一个 {...} 文本"""
+    try:
+        return json.loads(text), []
+    except ValueError:
+        pass
+    try:
+        return ast.literal_eval(text), ["python_literal"]
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        pass
+    
+    repairs = []
+    repaired = text.translate(SMART_QUOTES)
+    if repaired != text:
+        repairs.append("smart_quotes")
+    fixed = _strip_comments(repaired)
+    if fixed != repaired:
+        repairs.append("comments")
+        repaired = fixed
+    for pattern, replacement, label in ((TRAILING_COMMA_PATTERN, r"\1", "trailing_comma"),
+                                        (MISSING_COMMA_PATTERN, r"\1,\2", "missing_comma")):
+        fixed = pattern.sub(replacement, repaired)
+        if fixed != repaired:
+            repairs.append(label)
+            repaired = fixed
+    try:
+        return json.loads(repaired), repairs
+    except ValueError:
+        pass
+    # JSON风格的 true/false/null 转为Python字面量后再试
+    literal = re.sub(r'\b(true|false|null)\b',
+                     lambda m: {"true": "True", "false": "False", "null": "None"}[m.group(1)], repaired)
+    try:
+        return ast.literal_eval(literal), repairs + ["python_literal"]
+    except (ValueError, SyntaxError, MemoryError, RecursionError):
+        return None, []
+
+def _load_dict_literal(text: str) -> Tuple[Optional[Any], List[str]]:
+    """把JSON或类JSON/Python字面量文本解析为对象，返回 (对象, 修复项)，失败时对象为None"""
+    text = text.strip()
+    # 规范的响应本身就是一个JSON对象，不需要查找和切片
+    if text.startswith("{") and text.endswith("}"):
+        data, repairs = _parse_literal(text)
+        if data is not None:
+            return data, repairs
+    # 文本块中仍可能带有代码块标记或说明文字：先取第一个 { 到最后一个 } 之间的部分，
+    # 失败时（如先给出示例字典再给出答案）逐个尝试最外层的字典片段，靠后的优先
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None, []
+    sliced = text[start:end + 1]
+    if sliced != text:
+        data, repairs = _parse_literal(sliced)
+        if data is not None:
+            return data, repairs
+    snippets = _dict_snippets(sliced)
+    if len(snippets) > 1:
+        for snippet in reversed(snippets):
+            data, repairs = _parse_literal(snippet)
+            if isinstance(data, dict) and data:
+                return data, repairs + ["multiple_dicts"]
+    return None, []
+
+def _is_canonical(data: Dict[Any, Any]) -> bool:
+    """所有条目都已是 {"名称": [平台, 路径]} 形式（严格JSON响应的常见情况）"""
+    for name, value in data.items():
+        if (type(name) is not str or type(value) is not list or len(value) != 2
+                or type(value[0]) is not str or type(value[1]) is not str):
+            return False
+    return True
+
+def _normalize_download_info(data: Dict[Any, Any]) -> Tuple[Dict[str, Any], List[str]]:
+    """把各种写法的条目统一为 {"名称": [平台, 路径]}，无法识别的条目丢弃"""
+    if _is_canonical(data):
+        return data, []
+    info, repairs = {}, []
+    for name, value in data.items():
+        # 常见的规范条目直接保留
+        if type(value) is list and len(value) == 2 and isinstance(value[0], str) and isinstance(value[1], str):
+            info[name if isinstance(name, str) else str(name)] = value
+            continue
+        name = str(name).strip()
+        if isinstance(value, tuple):
+            value = list(value)
+            repairs.append(f"tuple:{name}")
+        if isinstance(value, dict):
+            lowered = {str(k).lower(): v for k, v in value.items()}
+            source = next((lowered[k] for k in ("platform", "source", "平台") if k in lowered), None)
+            path = next((lowered[k] for k in ("url", "path", "link", "链接") if k in lowered), None)
+            if source is None or path is None:
+                repairs.append(f"dropped:{name}")
+                continue
+            value = [source, path]
+            repairs.append(f"object:{name}")
+        if isinstance(value, list):
+            if len(value) == 1:
+                value = value[0]
+                repairs.append(f"single_item:{name}")
+            elif len(value) > 2:
+                value = value[:2]
+                repairs.append(f"extra_fields:{name}")
+        if isinstance(value, list) and all(isinstance(v, str) for v in value):
+            info[name] = [v.strip() for v in value]
+        elif isinstance(value, str) and value.strip():
+            # 单个字符串（URL或数据集名称）由下载器自动识别
+            info[name] = value.strip()
+        else:
+            repairs.append(f"dropped:{name}")
+    return info, repairs
+
+def parse_download_info(response: str) -> Tuple[Optional[Dict[str, Any]], List[str]]:
+    """容错解析LLM返回的数据集下载信息
+    
+    依次尝试 #### 标记之间的内容、Markdown代码块和整段文本；每个文本块先按严格JSON
+    解析，失败后按Python字面量（单引号、元组）解析，再修复智能引号、注释、
+    多余/缺少的逗号后重试。
+    
+    Returns:
+        (下载信息, 修复项列表)；所有文本块都无法解析时下载信息为None
+    """
+    if not response:
+        return None, []
+    for candidate in _response_candidates(response):
+        data, repairs = _load_dict_literal(candidate)
+        if isinstance(data, dict):
+            info, normalized = _normalize_download_info(data)
+            return info, repairs + normalized
+    return None, []
+
+def parse_dataset_names(dataset_names: str) -> List[str]:
+    """解析 "name: xxx,xxx" 格式的数据集名称列表，提取失败的结果返回空列表"""
+    text = dataset_names.strip()
+    if text.startswith(("错误:", "API调用失败", "API调用异常")):
+        return []
+    if text.lower().startswith("name:"):
+        text = text[len("name:"):]
+    return [name.strip() for name in re.split(r'[,，;；\n]', text) if name.strip()]
+
+def traced_call(llm_client: LLMClient, prompt: str, purpose: str) -> Tuple[str, Dict[str, Any]]:
+    """调用LLM并记录llm_call区间（提示词/响应字符数和token用量）"""
+    with TRACER.span("llm_call", purpose=purpose, prompt_chars=len(prompt)) as span:
+        response, usage = llm_client.call(prompt)
+        span["response_chars"] = len(response or "")
+        if isinstance(usage, dict):
+            span.update({k: v for k, v in usage.items() if k.endswith("tokens")})
+    return response, usage
+
+def dataset_context(name: str, sentences: List[str], max_sentences: int = 20) -> List[str]:
+    """选出提到某个数据集的句子，作为单个数据集下载信息查询的上下文
+
+    名称按 registry_key 规范化后以完整词匹配（与提及索引相同，"CIFAR-100" 不算 CIFAR-10 的提及）；
+    没有句子提到该数据集时退回到含URL的句子，仍然没有时使用前 max_sentences 个句子。
+    """
+    from tool.dataset_registry import registry_key
+    from tool.download_queue import normalize_dataset_name
+    from tool.mention_index import mentions, tokenize
+    key = registry_key(name) or normalize_dataset_name(name)
+    matched = [sentence for sentence in sentences if key and mentions(key, tokenize(sentence))]
+    if not matched:
+        matched = [sentence for sentence in sentences if "http" in sentence or "github" in sentence.lower()]
+    return (matched or sentences)[:max_sentences]
+
+class DownloadInfoFanout:
+    """按数据集拆分下载信息查询
+
+    论文提到多个数据集时，不再把全部名称放进一个大提示词等待完整的字典，而是为每个
+    数据集发送一个只带相关句子的小提示词，并发执行，结果到达一个合并一个（可立即开始
+    该数据集的下载）。所有论文共享同一个线程池，max_concurrent 即全局并发上限。
+    """
+    def __init__(self, max_concurrent: int = 4, min_datasets: int = 2, max_context_sentences: int = 20):
+        from concurrent.futures import ThreadPoolExecutor
+        self.max_concurrent = max(1, max_concurrent)
+        # 少于 min_datasets 个待查询数据集时仍使用单个提示词
+        self.min_datasets = max(1, min_datasets)
+        self.max_context_sentences = max_context_sentences
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrent, thread_name_prefix="llm-fanout")
+
+    def shutdown(self):
+        self.executor.shutdown(wait=True)
 
 class PaperAnalyzer:
-    """论文分析器类，整合PDF提取和LLM分析"""
-    def __init__(self, pdf_path: str, llm_client: Optional[LLMClient] = None):
+    """论文分析器类，整合PDF提取和LLM分析
+    
+    pdf_path 可以是路径、内存中的PDF（bytes/memoryview/mmap/文件对象）或已打开的提取器；
+    需要时只创建一次提取器，PDF只打开一次。
+    """
+    def __init__(self, pdf_path, llm_client: Optional[LLMClient] = None, registry=None,
+                 fanout: Optional[DownloadInfoFanout] = None):
+        from agent.agent import source_name
         self.pdf_path = pdf_path
+        self.name = source_name(pdf_path)
+        self.extractor = pdf_path if hasattr(pdf_path, "extract_sentences") else None
         self.llm_client = llm_client or Qwen2API()
+        # 本地数据集目录（tool.dataset_registry.DatasetRegistry），能解析的名称不再询问LLM
+        self.registry = registry
+        # 提供时多个数据集的下载信息按数据集拆分并发查询
+        self.fanout = fanout
+        # 最近一次下载信息解析的修复情况 {"repairs": [...], "reprompted": bool}
+        self.parse_report: Dict[str, Any] = {"repairs": [], "reprompted": False}
         
-    def extract_dataset_names(self) -> str:
-        """从PDF提取数据集名称"""
-        from agent.agent import ExtractDatasetName
+    def extract_dataset_names(self, dataset_sentences: Optional[List[str]] = None) -> str:
+        """从PDF提取数据集名称
+        
+        Args:
+            dataset_sentences: 已提取的数据集相关句子；提供时不再重新解析PDF
+        """
+        from agent.source import create_extractor
         
         try:
-            extractor = ExtractDatasetName(self.pdf_path)
-            dataset_sentences = extractor.extract_sentences()
-            text = "\n".join(dataset_sentences)
+            if dataset_sentences is None:
+                if self.extractor is None:
+                    self.extractor = create_extractor(self.pdf_path)
+                dataset_sentences = self.extractor.extract_sentences()
+            with TRACER.span("prompt_build", purpose="dataset_names") as span:
+                text = "\n".join(dataset_sentences)
+                prompt = GET_PAPER_NAME_PROMPT.format(text=text)
+                span.update(sentences=len(dataset_sentences), chars=len(prompt))
             
-            prompt = GET_PAPER_NAME_PROMPT.format(text=text)
-            response, _ = self.llm_client.call(prompt)
+            response, _ = traced_call(self.llm_client, prompt, "dataset_names")
             
             # 提取格式化部分
-            if "####" in response:
-                response = response.split("####")[-1].strip()
+            with TRACER.span("response_parse", purpose="dataset_names", chars=len(response)):
+                if "####" in response:
+                    response = response.split("####")[-1].strip()
                 
             logger.info(f"提取的数据集名称: {response}")
             return response
@@ -140,27 +470,122 @@ class PaperAnalyzer:
             logger.error(f"提取数据集名称失败: {str(e)}")
             return f"错误: {str(e)}"
             
-    def get_dataset_download_info(self, dataset_names: str, context_text: str) -> Dict[str, Tuple[str, str]]:
-        """获取数据集下载信息"""
+    def get_dataset_download_info(self, dataset_names: str, context_text: str,
+                                  on_resolved: Optional[Callable[[str, Any], None]] = None) -> Dict[str, Tuple[str, str]]:
+        """获取数据集下载信息，先查本地数据集目录，只把目录无法解析的名称发给LLM
+        
+        Args:
+            dataset_names: extract_dataset_names 的结果（"name: xxx,xxx"）
+            context_text: 数据集相关句子，每行一句
+            on_resolved: 每得到一个数据集的下载信息即调用 on_resolved(名称, 下载信息)，
+                可用于立即提交下载，不必等待全部数据集解析完成
+        """
+        resolved = {}
+        def resolve(name: str, info: Any):
+            if name in resolved:
+                return
+            resolved[name] = info
+            if on_resolved is not None:
+                try:
+                    on_resolved(name, info)
+                except Exception as e:
+                    logger.error(f"处理数据集 {name} 的下载信息失败: {str(e)}")
+        
         try:
-            prompt = GET_DOWNLOAD_URL.format(text=dataset_names, text_1=context_text)
-            response, _ = self.llm_client.call(prompt)
+            names = parse_dataset_names(dataset_names)
+            unresolved = names
+            if self.registry is not None:
+                unresolved = []
+                for name in names:
+                    info = self.registry.lookup(name)
+                    if info is not None:
+                        resolve(name, info)
+                    else:
+                        unresolved.append(name)
+                if names and not unresolved:
+                    logger.info(f"所有数据集均已在本地目录中解析，跳过LLM调用: {list(resolved)}")
+                    return resolved
+                if resolved:
+                    logger.info(f"本地目录解析了{len(resolved)}个数据集，其余{len(unresolved)}个交给LLM")
+                    dataset_names = "name: " + ",".join(unresolved)
             
-            # 解析响应
-            if isinstance(self.llm_client, Qwen2API):
-                return self.llm_client.parse_dataset_response(response)
-            else:
-                # 简单解析
-                if "####" in response:
-                    response = response.split("####")[1].strip()
-                try:
-                    return json.loads(response)
-                except:
-                    logger.error("无法解析下载信息JSON")
-                    return {}
+            if self.fanout is not None and len(unresolved) >= self.fanout.min_datasets:
+                self._fanout_download_info(unresolved, context_text.split("\n"), resolve)
+                return resolved
+            
+            download_info, repairs, reprompted = self._request_download_info(dataset_names, context_text)
+            self.parse_report = {"repairs": repairs, "reprompted": reprompted}
+            for name, info in download_info.items():
+                resolve(name, info)
+            return resolved
         except Exception as e:
             logger.error(f"获取下载信息失败: {str(e)}")
+            return resolved
+
+    def _request_download_info(self, dataset_names: str, context_text: str) -> Tuple[Dict[str, Any], List[str], bool]:
+        """发送一次下载信息提示词并解析，返回 (下载信息, 本地修复项, 是否重新请求了修正)"""
+        with TRACER.span("prompt_build", purpose="download_info") as span:
+            prompt = GET_DOWNLOAD_URL.format(text=dataset_names, text_1=context_text)
+            span["chars"] = len(prompt)
+        response, _ = traced_call(self.llm_client, prompt, "download_info")
+        
+        # 解析响应，本地无法解析时才用修复提示词重新请求
+        with TRACER.span("response_parse", purpose="download_info", chars=len(response)) as span:
+            download_info, repairs = parse_download_info(response)
+            span.update(repairs=repairs, datasets=len(download_info) if download_info is not None else None)
+        if repairs:
+            logger.warning(f"下载信息响应格式已修复: {', '.join(repairs)}")
+        reprompted = download_info is None
+        if download_info is None:
+            download_info = self.repair_download_info(response)
+        return download_info, repairs, reprompted
+
+    def _fanout_download_info(self, names: List[str], sentences: List[str], resolve: Callable[[str, Any], None]):
+        """每个数据集一个小提示词，在共享线程池中并发查询，按完成顺序合并结果"""
+        from concurrent.futures import as_completed
+        paper = self.name
+        
+        def lookup(name: str):
+            context = dataset_context(name, sentences, self.fanout.max_context_sentences)
+            # 线程池中的线程不继承调用方的论文标记，重新标记以便追踪
+            with TRACER.paper(paper), TRACER.span("download_info_lookup", dataset=name, sentences=len(context)):
+                return self._request_download_info(f"name: {name}", "\n".join(context))
+        
+        logger.info(f"按数据集并发查询{len(names)}个数据集的下载信息")
+        futures = {self.fanout.executor.submit(lookup, name): name for name in names}
+        repairs: List[str] = []
+        reprompted = False
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                download_info, item_repairs, item_reprompted = future.result()
+            except Exception as e:
+                logger.error(f"获取数据集 {name} 的下载信息失败: {str(e)}")
+                continue
+            repairs.extend(repair for repair in item_repairs if repair not in repairs)
+            reprompted = reprompted or item_reprompted
+            if not download_info:
+                logger.warning(f"未找到数据集 {name} 的下载信息")
+            for resolved_name, info in download_info.items():
+                resolve(resolved_name, info)
+        self.parse_report = {"repairs": repairs, "reprompted": reprompted}
+
+    def repair_download_info(self, response: str) -> Dict[str, Any]:
+        """本地解析失败时，只把原始回复（不含论文上下文）发给LLM修正格式"""
+        if not response.strip() or response.startswith(("API调用失败", "API调用异常")):
+            logger.error("无法解析下载信息: LLM调用失败或响应为空")
+            return {}
+        logger.warning("本地无法解析下载信息，请求LLM修正格式")
+        prompt = REPAIR_DOWNLOAD_INFO_PROMPT.format(response=response)
+        repaired, _ = traced_call(self.llm_client, prompt, "repair")
+        download_info, repairs = parse_download_info(repaired)
+        if download_info is None:
+            logger.error("修正后的下载信息仍无法解析")
+            logger.debug(f"原始响应: {response}")
             return {}
+        if repairs:
+            logger.warning(f"修正后的下载信息格式已修复: {', '.join(repairs)}")
+        return download_info
 
 
 if __name__ == "__main__":
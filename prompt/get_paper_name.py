@@ -95,3 +95,17 @@ DATASET_DESCRIPTION_PROMPT = """
 }}
 ####
 """
+
+REPAIR_DOWNLOAD_INFO_PROMPT = """
+下面是一段本应为数据集下载信息的回复，但无法解析为JSON。请只修正格式，不要增删或修改任何数据集、平台和URL。
+
+原始回复：
+{response}
+
+请返回含双引号的有效JSON字典，格式如下：
+####
+{{
+    "数据集名称": ["平台", "URL"]
+}}
+####
+"""
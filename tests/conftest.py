@@ -0,0 +1,7 @@
+import os
+import sys
+
+# 与 main.py 相同，把项目根目录加入Python路径，使 tool/model/agent 可直接导入
+MODULE_PATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if MODULE_PATH not in sys.path:
+    sys.path.insert(0, MODULE_PATH)
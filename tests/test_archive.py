@@ -0,0 +1,68 @@
+import io
+import os
+import tarfile
+
+import pytest
+
+from tool.archive import safe_member_path, extract_tar_stream
+
+
+def make_tar(members, compression=""):
+    """构造内存中的tar归档，members 为 [(名称, 内容)]，内容为None时添加指向 /etc/passwd 的符号链接"""
+    buffer = io.BytesIO()
+    with tarfile.open(fileobj=buffer, mode=f"w:{compression}" if compression else "w") as tar:
+        for name, data in members:
+            info = tarfile.TarInfo(name)
+            if data is None:
+                info.type = tarfile.SYMTYPE
+                info.linkname = "/etc/passwd"
+                tar.addfile(info)
+            else:
+                info.size = len(data)
+                tar.addfile(info, io.BytesIO(data))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.mark.parametrize("name", [
+    "../evil.txt",
+    "data/../../evil.txt",
+    "..",
+    "/etc/passwd",
+    "\\\\server\\share\\evil.txt",
+    "C:/Windows/evil.txt",
+    "c:evil.txt",
+    "",
+    "./",
+])
+def test_unsafe_member_paths_rejected(tmp_path, name):
+    with pytest.raises(ValueError):
+        safe_member_path(str(tmp_path), name)
+
+
+@pytest.mark.parametrize("name, expected", [
+    ("data.csv", "data.csv"),
+    ("./train/part-0.csv", os.path.join("train", "part-0.csv")),
+    ("train//a.csv", os.path.join("train", "a.csv")),
+    ("dir\\file.txt", os.path.join("dir", "file.txt")),
+])
+def test_safe_member_paths(tmp_path, name, expected):
+    assert safe_member_path(str(tmp_path), name) == os.path.join(str(tmp_path), expected)
+
+
+@pytest.mark.parametrize("name", ["../evil.txt", "/tmp/evil.txt", "ok/../../evil.txt"])
+@pytest.mark.parametrize("compression", ["", "gz"])
+def test_extract_rejects_traversal(tmp_path, name, compression):
+    dest = tmp_path / "out"
+    archive = make_tar([("ok.txt", b"ok"), (name, b"evil")], compression)
+    with pytest.raises(ValueError):
+        extract_tar_stream(archive, str(dest), compression)
+    assert not (tmp_path / "evil.txt").exists()
+
+
+def test_extract_skips_links_and_filters(tmp_path):
+    archive = make_tar([("train/a.csv", b"a,b"), ("test/b.csv", b"c,d"), ("notes.txt", b"x"), ("link", None)], "gz")
+    stats = extract_tar_stream(archive, str(tmp_path), "gz", include=["*.csv"], exclude=["test/*"])
+    assert stats == {"files": 1, "bytes": 3, "skipped": 3}
+    assert (tmp_path / "train" / "a.csv").read_bytes() == b"a,b"
+    assert not (tmp_path / "link").exists()
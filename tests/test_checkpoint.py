@@ -0,0 +1,23 @@
+import json
+
+from tool.checkpoint import ResultCheckpoint
+
+
+def test_torn_last_line_is_ignored_and_not_glued(tmp_path):
+    path = tmp_path / "results.jsonl"
+    path.write_text(json.dumps({"paper": "a.pdf", "result": {"dataset_names": ["A"]}}) + "\n"
+                    + '{"paper": "b.pdf", "result": {"datas', encoding="utf-8")
+    checkpoint = ResultCheckpoint(str(path))
+    assert list(checkpoint.load()) == ["a.pdf"]
+
+    # 新记录不能与崩溃留下的半行粘连
+    checkpoint.append("c.pdf", {"dataset_names": ["C"]})
+    assert list(ResultCheckpoint(str(path)).load()) == ["a.pdf", "c.pdf"]
+
+
+def test_completed_skips_errors_and_keeps_last_record(tmp_path):
+    checkpoint = ResultCheckpoint(str(tmp_path / "results.jsonl"))
+    checkpoint.append("a.pdf", {"error": "timeout"})
+    checkpoint.append("b.pdf", {"error": "timeout"})
+    checkpoint.append("b.pdf", {"dataset_names": ["B"]})
+    assert checkpoint.completed() == {"b.pdf": {"dataset_names": ["B"]}}
@@ -0,0 +1,49 @@
+import pytest
+
+from tool.download_queue import target_key
+
+# 每组中的写法都应得到同一个目标标识
+EQUIVALENT = [
+    ("hf:squad", [
+        ("huggingface", "squad"),
+        "https://huggingface.co/datasets/squad",
+        "https://huggingface.co/datasets/squad/tree/main",
+        "https://hf-mirror.com/datasets/squad",
+    ]),
+    ("hf:rajpurkar/squad", [
+        ("huggingface", "rajpurkar/squad"),
+        ("huggingface", "Rajpurkar/SQuAD"),
+        "rajpurkar/squad",
+        "https://huggingface.co/datasets/rajpurkar/squad",
+        "https://www.huggingface.co/datasets/rajpurkar/squad/blob/main/README.md",
+    ]),
+    ("git:github.com/owner/repo", [
+        ("git", "https://github.com/owner/repo"),
+        ("git", "https://github.com/owner/repo.git"),
+        ("github", "http://github.com/Owner/Repo/"),
+        ("git", "git@github.com:owner/repo.git"),
+        "https://github.com/owner/repo",
+        "https://github.com/owner/repo/tree/main/data",
+    ]),
+    ("url:https://example.org/data.zip?a=1&b=2", [
+        ("url", "https://example.org/data.zip?b=2&a=1"),
+        ("url", "http://www.example.org:80/data.zip?a=1&b=2#frag"),
+        ("official", "HTTPS://Example.org/data.zip?a=1&b=2"),
+    ]),
+    ("kaggle:owner/dataset", [("kaggle", "owner/dataset"), ("kaggle", "Owner/Dataset")]),
+]
+
+
+@pytest.mark.parametrize("expected, variants", EQUIVALENT)
+def test_equivalent_targets(expected, variants):
+    assert {target_key(variant) for variant in variants} == {expected}
+
+
+@pytest.mark.parametrize("first, second", [
+    (("url", "https://example.org/a.zip"), ("url", "https://example.org/b.zip")),
+    (("huggingface", "org/data"), ("huggingface", "org/data-v2")),
+    (("git", "https://github.com/owner/repo"), ("git", "https://github.com/owner/repo2")),
+    (("url", "https://example.org/data.zip?v=1"), ("url", "https://example.org/data.zip?v=2")),
+])
+def test_distinct_targets(first, second):
+    assert target_key(first) != target_key(second)
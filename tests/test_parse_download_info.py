@@ -0,0 +1,42 @@
+import pytest
+
+from model.model import parse_download_info
+
+GIT_A = {"A": ["git", "https://github.com/a/b"]}
+
+# (响应文本, 期望结果, 期望包含的修复项)
+CASES = [
+    ('####\n{"A": ["git", "https://github.com/a/b"]}\n####', GIT_A, []),
+    ('```json\n{"A": ["git", "https://github.com/a/b"]}\n```', GIT_A, []),
+    ("####\n{'A': ('git', 'https://github.com/a/b'),}\n####", GIT_A, ["python_literal", "tuple:A"]),
+    # 多余的逗号和 # 注释在Python字面量中合法，直接按字面量解析
+    ('{"A": ["git", "https://github.com/a/b"],}', GIT_A, ["python_literal"]),
+    ('{“A”: [“git”, “https://github.com/a/b”]}', GIT_A, ["smart_quotes"]),
+    ('{\n  // 主仓库\n  "A": ["git", "https://github.com/a/b"]\n}', GIT_A, ["comments"]),
+    ('{"A": ["git", "https://github.com/a/b"], // main repo\n}', GIT_A, ["comments", "trailing_comma"]),
+    ('{"A": ["git", "https://github.com/a/b"]  # main repo\n}', GIT_A, ["python_literal"]),
+    ('{“A”: [“git”, “https://github.com/a/b”],}', GIT_A, ["smart_quotes", "trailing_comma"]),
+    ('{"A": ["git", "https://github.com/a/b"]\n "B": ["url", "http://x.org/b.zip"]}',
+     dict(GIT_A, B=["url", "http://x.org/b.zip"]), ["missing_comma"]),
+    ('{"A": {"platform": "git", "url": "https://github.com/a/b"}}', GIT_A, ["object:A"]),
+    ('{"A": ["git", "https://github.com/a/b", "main"]}', GIT_A, ["extra_fields:A"]),
+    ('{"A": ["https://github.com/a/b"]}', {"A": "https://github.com/a/b"}, ["single_item:A"]),
+    # 先给出示例字典、再给出答案：取最后一个能解析的字典
+    ('For example: {"X": ["url", "http://example.com"]}. Here\'s the answer: '
+     '{"A": ["git", "https://github.com/a/b"], // repo\n}', GIT_A, ["multiple_dicts"]),
+    # 字符串中的 // 和 # 不是注释
+    ('{"A": ["url", "http://x.org/a#b"], // c\n}', {"A": ["url", "http://x.org/a#b"]}, ["comments"]),
+]
+
+
+@pytest.mark.parametrize("response, expected, repairs", CASES)
+def test_parse_download_info(response, expected, repairs):
+    info, applied = parse_download_info(response)
+    assert info == expected
+    for repair in repairs:
+        assert repair in applied
+
+
+@pytest.mark.parametrize("response", ["", "没有找到下载信息", "{not a dict", "####\n[1, 2]\n####"])
+def test_unparseable_response(response):
+    assert parse_download_info(response) == (None, [])
@@ -0,0 +1,198 @@
+import os
+import re
+import sys
+import shutil
+import fnmatch
+import logging
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 文件名后缀 -> (归档类型, 压缩方式)，较长的后缀在前
+ARCHIVE_SUFFIXES = [
+    (".tar.gz", ("tar", "gz")), (".tgz", ("tar", "gz")),
+    (".tar.bz2", ("tar", "bz2")), (".tbz2", ("tar", "bz2")),
+    (".tar.xz", ("tar", "xz")), (".txz", ("tar", "xz")),
+    (".tar.zst", ("tar", "zst")), (".tzst", ("tar", "zst")),
+    (".tar", ("tar", "")),
+    (".zip", ("zip", "")),
+]
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+
+def archive_type(filename: str) -> Optional[Tuple[str, str]]:
+    """根据文件名判断归档类型，返回 (tar|zip, 压缩方式)，不是归档时返回None"""
+    lower = filename.lower()
+    for suffix, kind in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix):
+            return kind
+    return None
+
+
+def archive_stem(filename: str) -> str:
+    """去掉归档后缀后的名称，作为解包目录名，如 data.tar.gz -> data"""
+    lower = filename.lower()
+    for suffix, _ in ARCHIVE_SUFFIXES:
+        if lower.endswith(suffix) and len(filename) > len(suffix):
+            return filename[:-len(suffix)]
+    return filename
+
+
+def needs_zstd_module() -> bool:
+    """Python 3.14 之前的标准库不支持zstd，需要 zstandard 包"""
+    return sys.version_info < (3, 14)
+
+
+def match_member(name: str, include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> bool:
+    """成员过滤：匹配任一 include 模式（未设置时全部保留）且不匹配任何 exclude 模式
+
+    模式按 fnmatch 匹配成员的完整路径，* 可跨越目录，如 "*.csv"、"train/*"。
+    """
+    if include and not any(fnmatch.fnmatch(name, pattern) for pattern in include):
+        return False
+    return not (exclude and any(fnmatch.fnmatch(name, pattern) for pattern in exclude))
+
+
+def safe_member_path(dest_dir: str, name: str) -> str:
+    """把成员名称解析为 dest_dir 下的路径，拒绝绝对路径和 .. 等越出目标目录的名称"""
+    normalized = name.replace("\\", "/")
+    if normalized.startswith("/") or re.match(r'^[A-Za-z]:', normalized):
+        raise ValueError(f"不安全的成员路径（绝对路径）: {name}")
+    parts = [part for part in normalized.split("/") if part not in ("", ".")]
+    if not parts or ".." in parts:
+        raise ValueError(f"不安全的成员路径: {name}")
+    target = os.path.join(dest_dir, *parts)
+    root = os.path.realpath(dest_dir)
+    if not os.path.realpath(target).startswith(root + os.sep):
+        raise ValueError(f"不安全的成员路径（越出目标目录）: {name}")
+    return target
+
+
+class ChunkReader:
+    """把下载的数据块迭代器包装成只读文件对象，供 tarfile 流模式和解压器按需读取
+
+    数据块在被读取时才从迭代器中取出，因此下载、校验和解包在同一循环中推进，
+    压缩包本身不会写入磁盘。
+    """
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks: Iterator[bytes] = iter(chunks)
+        self._buffer = b""
+        self._offset = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def read(self, size: Optional[int] = -1) -> bytes:
+        if size is None or size < 0:
+            data = self._buffer[self._offset:] + b"".join(self._chunks)
+            self._buffer, self._offset = b"", 0
+            return data
+        while self._offset >= len(self._buffer):
+            try:
+                self._buffer = next(self._chunks)
+            except StopIteration:
+                return b""
+            self._offset = 0
+        data = self._buffer[self._offset:self._offset + size]
+        self._offset += len(data)
+        return data
+
+    def drain(self) -> int:
+        """读完剩余数据（tar结尾的填充块等），保证校验值覆盖完整响应，返回丢弃的字节数"""
+        count = len(self._buffer) - self._offset
+        self._buffer, self._offset = b"", 0
+        for chunk in self._chunks:
+            count += len(chunk)
+        return count
+
+
+def open_zstd_reader(fileobj):
+    """返回解压zstd数据的文件对象：Python 3.14+ 使用标准库，否则使用 zstandard 包"""
+    if not needs_zstd_module():
+        from compression import zstd
+        return zstd.ZstdFile(fileobj)
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError("解包 .tar.zst 需要安装 zstandard")
+    return zstandard.ZstdDecompressor().stream_reader(fileobj)
+
+
+def _write_member(source, target: str):
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    with open(target, 'wb') as f:
+        shutil.copyfileobj(source, f, COPY_BUFFER_SIZE)
+
+
+def extract_tar_stream(fileobj, dest_dir: str, compression: str = "",
+                       include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> Dict[str, int]:
+    """以流模式顺序解包tar归档（可为gz/bz2/xz/zst压缩），不需要随机访问或完整的归档文件
+
+    只解包普通文件；符号链接、硬链接和设备文件一律跳过，成员路径越出 dest_dir 时抛出ValueError。
+
+    Returns:
+        {"files": 解包文件数, "bytes": 解包后字节数, "skipped": 跳过的成员数}
+    """
+    import tarfile
+    stream = open_zstd_reader(fileobj) if compression == "zst" else fileobj
+    mode = f"r|{compression}" if compression in ("gz", "bz2", "xz") else "r|"
+    stats = {"files": 0, "bytes": 0, "skipped": 0}
+    os.makedirs(dest_dir, exist_ok=True)
+    try:
+        with tarfile.open(fileobj=stream, mode=mode) as tar:
+            for member in tar:
+                if member.isdir():
+                    continue
+                if not member.isfile():
+                    logger.debug(f"跳过非普通文件成员: {member.name}")
+                    stats["skipped"] += 1
+                    continue
+                if not match_member(member.name, include, exclude):
+                    stats["skipped"] += 1
+                    continue
+                target = safe_member_path(dest_dir, member.name)
+                _write_member(tar.extractfile(member), target)
+                os.utime(target, (member.mtime, member.mtime))
+                stats["files"] += 1
+                stats["bytes"] += member.size
+    finally:
+        if stream is not fileobj:
+            stream.close()
+    return stats
+
+
+def extract_zip(path: str, dest_dir: str, include: Optional[List[str]] = None,
+                exclude: Optional[List[str]] = None) -> Dict[str, int]:
+    """解包zip文件（中央目录位于文件末尾，只能在下载完成后解包）
+
+    过滤和路径检查规则与 extract_tar_stream 相同，Unix符号链接成员跳过。
+    """
+    import zipfile
+    stats = {"files": 0, "bytes": 0, "skipped": 0}
+    os.makedirs(dest_dir, exist_ok=True)
+    with zipfile.ZipFile(path) as archive:
+        for info in archive.infolist():
+            if info.is_dir():
+                continue
+            is_symlink = (info.external_attr >> 16) & 0o170000 == 0o120000
+            if is_symlink or not match_member(info.filename, include, exclude):
+                stats["skipped"] += 1
+                continue
+            target = safe_member_path(dest_dir, info.filename)
+            with archive.open(info) as source:
+                _write_member(source, target)
+            stats["files"] += 1
+            stats["bytes"] += info.file_size
+    return stats
+
+
+def replace_directory(tmp_dir: str, target: str):
+    """用解包完成的临时目录替换目标（已有的旧版本先删除）"""
+    if os.path.isdir(target) and not os.path.islink(target):
+        shutil.rmtree(target)
+    elif os.path.lexists(target):
+        os.remove(target)
+    os.replace(tmp_dir, target)
@@ -0,0 +1,128 @@
+import os
+import json
+import socket
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, Any, Optional
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def write_json_atomic(data: Any, output_path: str):
+    """先写临时文件再重命名，保证输出文件要么是旧内容要么是完整的新内容"""
+    # 临时文件名带主机名和进程号，多个节点同时写同一共享文件时不会互相覆盖临时文件
+    tmp_path = f"{output_path}.{socket.gethostname()}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, output_path)
+
+
+# 锁文件路径 -> 进程内线程锁；fcntl锁属于进程，同一进程的不同线程之间不互斥
+_thread_locks: Dict[str, threading.Lock] = {}
+_thread_locks_guard = threading.Lock()
+
+
+@contextmanager
+def file_lock(lock_path: str):
+    """跨线程、跨进程和跨节点的排他文件锁（POSIX fcntl.lockf，NFS上由锁服务协调）
+
+    不支持fcntl的平台上只在进程内互斥。
+    """
+    key = os.path.abspath(lock_path)
+    with _thread_locks_guard:
+        thread_lock = _thread_locks.setdefault(key, threading.Lock())
+    with thread_lock:
+        try:
+            import fcntl
+        except ImportError:
+            yield
+            return
+        fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.lockf(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+
+class ResultCheckpoint:
+    """批处理结果的JSONL检查点
+
+    每篇论文处理完成后立即追加一行 {"paper": 名称, "result": 结果}。每条记录通过一次
+    O_APPEND 写入并fsync，崩溃或Ctrl-C最多丢失正在写入的那一行；加载时忽略不完整的行。
+    同一论文出现多条记录时以最后一条为准。
+    """
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._checked_tail = False
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """读取检查点中已完成的结果 {"论文": 结果}"""
+        results: Dict[str, Dict[str, Any]] = {}
+        if not os.path.exists(self.path):
+            return results
+        skipped = 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                    results[record["paper"]] = record["result"]
+                except (ValueError, KeyError, TypeError):
+                    # 崩溃时可能留下半行，跳过即可
+                    skipped += 1
+        if skipped:
+            logger.warning(f"检查点中有{skipped}行不完整，已忽略")
+        return results
+
+    def completed(self) -> Dict[str, Dict[str, Any]]:
+        """已成功完成的论文（出错的论文在恢复时会重新处理）"""
+        return {paper: result for paper, result in self.load().items() if "error" not in result}
+
+    def append(self, paper: str, result: Dict[str, Any]):
+        """原子追加一篇论文的结果"""
+        line = json.dumps({"paper": paper, "result": result}, ensure_ascii=False) + "\n"
+        data = line.encode('utf-8')
+        with self._lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                if not self._checked_tail:
+                    # 上次崩溃留下的半行没有换行符，先补上换行，避免与新记录粘连
+                    self._checked_tail = True
+                    size = os.fstat(fd).st_size
+                    if size:
+                        with open(self.path, 'rb') as f:
+                            f.seek(size - 1)
+                            if f.read(1) != b"\n":
+                                data = b"\n" + data
+                # 单次write配合O_APPEND，多个进程/线程追加时行不会交错
+                os.write(fd, data)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+
+    def compact(self, output_path: str, order: Optional[list] = None) -> Dict[str, Dict[str, Any]]:
+        """将检查点压缩为与 --output 相同格式的JSON文件
+
+        Args:
+            output_path: 输出JSON路径
+            order: 可选的论文顺序，未列出的论文排在后面
+        """
+        results = self.load()
+        if order:
+            ranked = {paper: i for i, paper in enumerate(order)}
+            results = dict(sorted(results.items(), key=lambda item: ranked.get(item[0], len(ranked))))
+        write_json_atomic(results, output_path)
+        logger.info(f"检查点已压缩: {self.path} -> {output_path} ({len(results)}篇论文)")
+        return results
@@ -1,71 +1,202 @@
 import os
+import re
+import glob
+import shutil
+import base64
+import hashlib
 import logging
 import json
 from typing import Dict, Tuple, List, Union, Optional
-from tqdm import tqdm
-import requests
+import importlib
 import importlib.util
+import threading
+
+from tool.download_planner import BandwidthLimiter
+from tool.dataset_registry import DatasetRegistry, REGISTRY_FILENAME
+from tool.profiler import TRACER
+from tool.checkpoint import file_lock, write_json_atomic
+from tool.archive import (archive_type, archive_stem, needs_zstd_module, ChunkReader,
+                          extract_tar_stream, extract_zip, replace_directory)
 
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# 可选依赖：模块名 -> pip包名
+OPTIONAL_DEPENDENCIES = {
+    "datasets": "datasets",
+    "git": "GitPython",
+    "kaggle": "kaggle",
+    "zstandard": "zstandard"
+}
+
+# 进程级缓存：依赖探测结果与已尝试安装的包，避免每次下载都重复探测/调用pip
+_dependency_cache: Dict[str, bool] = {}
+_install_attempted: set = set()
+
+# 设置文件过滤时始终保留的元数据文件
+HF_METADATA_PATTERNS = ["README.md", "*.py", "dataset_infos.json"]
+
+
+def is_module_available(module: str) -> bool:
+    """检查模块是否可导入，结果在进程内缓存"""
+    if module not in _dependency_cache:
+        _dependency_cache[module] = importlib.util.find_spec(module) is not None
+    return _dependency_cache[module]
+
+
+# 各摘要算法的十六进制长度，用于根据摘要长度推断算法
+HASH_HEX_LENGTHS = {"md5": 32, "sha1": 40, "sha256": 64, "sha512": 128}
+
+
+def parse_expected_hash(value: str) -> Dict[str, str]:
+    """解析期望校验值："sha256:<hex>"、"md5=<hex>" 或按长度推断算法的裸十六进制摘要"""
+    value = value.strip()
+    match = re.match(r'^(md5|sha1|sha256|sha512)[:=](.+)$', value, re.IGNORECASE)
+    if match:
+        return {match.group(1).lower(): match.group(2).strip().lower()}
+    for algorithm, length in HASH_HEX_LENGTHS.items():
+        if len(value) == length:
+            return {algorithm: value.lower()}
+    raise ValueError(f"无法识别的校验值: {value}")
+
+
+def parse_digest_header(value: str) -> Dict[str, str]:
+    """解析 Digest / Repr-Digest / x-goog-hash 响应头中的base64摘要，返回十六进制摘要"""
+    checksums = {}
+    for item in value.split(","):
+        algorithm, _, encoded = item.strip().partition("=")
+        algorithm = algorithm.lower().replace("-", "")
+        if algorithm not in HASH_HEX_LENGTHS or not encoded:
+            continue
+        # Repr-Digest 格式为 sha-256=:<base64>:
+        encoded = encoded.strip().strip(":")
+        try:
+            digest = base64.b64decode(encoded + "=" * (-len(encoded) % 4)).hex()
+        except Exception:
+            continue
+        if len(digest) == HASH_HEX_LENGTHS[algorithm]:
+            checksums[algorithm] = digest
+    return checksums
+
+
+def build_hf_allow_patterns(splits: Optional[List[str]] = None,
+                            configs: Optional[List[str]] = None,
+                            file_types: Optional[List[str]] = None) -> List[str]:
+    """根据划分、配置和文件类型生成HF仓库文件的allow_patterns
+
+    例如 configs=["distractor"], splits=["train"], file_types=["parquet"]
+    生成 ["*distractor/*train*.parquet"]（fnmatch中 * 可跨越目录）。
+    """
+    if not (splits or configs or file_types):
+        return []
+    patterns = []
+    for config in (configs or [None]):
+        for split in (splits or [None]):
+            for file_type in (file_types or [None]):
+                pattern = "*"
+                if config:
+                    pattern += f"{config}/*"
+                if split:
+                    pattern += f"{split}*"
+                if file_type:
+                    pattern += f".{file_type.lstrip('.')}"
+                elif not pattern.endswith("*"):
+                    pattern += "*"
+                patterns.append(pattern)
+    return patterns
+
 class DatasetDownloader:
-    def __init__(self, download_dir="datasets"):
+    def __init__(self, download_dir="datasets", hf_allow_patterns: Optional[List[str]] = None,
+                 hf_ignore_patterns: Optional[List[str]] = None, hf_splits: Optional[List[str]] = None,
+                 hf_configs: Optional[List[str]] = None, hf_file_types: Optional[List[str]] = None,
+                 hf_max_workers: int = 8, hf_use_cache: bool = True, metadata_only: bool = False,
+                 verify_sidecar_checksums: bool = False, url_bandwidth_limit: Optional[int] = None,
+                 catalog_paths: Optional[List[str]] = None, extract_archives: bool = False,
+                 extract_include: Optional[List[str]] = None, extract_exclude: Optional[List[str]] = None):
         self.download_dir = download_dir
-        self.dataset_mapping = {
-            "HumanEval": ("huggingface", "openai/human-eval"),
-            "HotPotQA": ("huggingface", "hotpot_qa"),
-            "MBPP": ("huggingface", "mbpp"),
-            "AlfWorld": ("git", "https://github.com/alfworld/alfworld.git"),
-            "WebShop": ("git", "https://github.com/princeton-nlp/WebShop"),
-            # 可以添加更多预设的数据集映射
-        }
+        # HuggingFace选择性下载配置
+        self.hf_allow_patterns = hf_allow_patterns
+        self.hf_ignore_patterns = hf_ignore_patterns
+        self.hf_splits = hf_splits
+        self.hf_configs = hf_configs
+        self.hf_file_types = hf_file_types
+        self.hf_max_workers = hf_max_workers
+        self.hf_use_cache = hf_use_cache
+        self.metadata_only = metadata_only
+        # URL下载时是否额外请求 <url>.sha256 / <url>.md5 校验文件
+        self.verify_sidecar_checksums = verify_sidecar_checksums
+        # URL直接下载的带宽上限（字节/秒），同一下载器的所有URL下载线程共享；
+        # HF、datasets、Git和Kaggle由各自的库完成传输，不经过此限速器
+        self.bandwidth_limiter = BandwidthLimiter(url_bandwidth_limit) if url_bandwidth_limit else None
+        # URL下载的归档是否解包：tar系列边下载边解包，zip下载完成后立即解包，随后不保留归档
+        self.extract_archives = extract_archives
+        self.extract_include = extract_include
+        self.extract_exclude = extract_exclude
+        # 本地数据集目录：内置映射 + 额外目录文件 + 从成功下载中学到的映射
+        self.registry = DatasetRegistry.shared(os.path.join(download_dir, REGISTRY_FILENAME), catalog_paths)
         os.makedirs(self.download_dir, exist_ok=True)
         
-        # 记录下载历史
+        # 记录下载历史（下载队列会在多个线程中并发写入）
+        self._history_lock = threading.RLock()
         self.history_file = os.path.join(self.download_dir, "download_history.json")
         self.load_history()
 
+    @property
+    def dataset_mapping(self) -> Dict[str, Tuple[str, str]]:
+        """预设的数据集映射 {"数据集名称": (source, path)}，由本地数据集目录生成"""
+        return {entry["name"]: (entry["source"], entry["path"]) for entry in self.registry.entries}
+
     def load_history(self):
         """加载下载历史"""
+        self.history = self._read_history_file()
+        # 上次与磁盘同步时各条目的内容，用于判断哪些条目是本进程修改的
+        self._history_synced = {key: dict(entry) for key, entry in self.history.items()}
+
+    def _read_history_file(self) -> Dict:
         if os.path.exists(self.history_file):
             try:
                 with open(self.history_file, 'r') as f:
-                    self.history = json.load(f)
+                    return json.load(f)
             except Exception as e:
                 logger.error(f"加载历史记录失败: {str(e)}")
-                self.history = {}
-        else:
-            self.history = {}
+        return {}
 
     def save_history(self):
-        """保存下载历史"""
+        """保存下载历史
+        
+        多个进程或节点可能共享同一下载目录，因此在文件锁内先读取磁盘上的最新版本，
+        只用本进程修改过的条目覆盖，再原子写回；其他节点新增的条目同时合并到内存中。
+        """
         try:
-            with open(self.history_file, 'w') as f:
-                json.dump(self.history, f, indent=2)
+            os.makedirs(self.download_dir, exist_ok=True)
+            with self._history_lock, file_lock(f"{self.history_file}.lock"):
+                on_disk = self._read_history_file()
+                # 先复制快照，避免其他下载线程同时写入导致迭代出错
+                snapshot = dict(self.history)
+                for key, entry in snapshot.items():
+                    if self._history_synced.get(key) != entry:
+                        on_disk[key] = entry
+                for key, entry in on_disk.items():
+                    # 只替换本进程没有改动、且快照之后也没有被其他线程改写的条目
+                    if self.history.get(key) is snapshot.get(key) and snapshot.get(key) != entry:
+                        self.history[key] = entry
+                write_json_atomic(on_disk, self.history_file)
+                self._history_synced = {key: dict(entry) for key, entry in on_disk.items()}
         except Exception as e:
             logger.error(f"保存历史记录失败: {str(e)}")
 
     def check_dependencies(self) -> List[str]:
-        """检查并返回缺少的依赖项"""
-        missing = []
-        dependencies = {
-            "datasets": "datasets",
-            "git": "GitPython",
-            "kaggle": "kaggle"
-        }
-        
-        for module, package in dependencies.items():
-            if importlib.util.find_spec(module) is None:
-                missing.append(package)
-                
-        return missing
+        """检查并返回缺少的依赖项（探测结果在进程内缓存）"""
+        return [package for module, package in OPTIONAL_DEPENDENCIES.items()
+                if not is_module_available(module)]
 
     def install_dependencies(self, packages: List[str]):
-        """安装缺少的依赖项"""
+        """安装缺少的依赖项，每个包在进程内最多尝试安装一次"""
+        packages = [p for p in packages if p not in _install_attempted]
         if not packages:
             return
+        _install_attempted.update(packages)
             
         try:
             import pip
@@ -75,53 +206,148 @@ class DatasetDownloader:
         except Exception as e:
             logger.error(f"安装依赖失败: {str(e)}")
             logger.info(f"请手动安装以下依赖: {', '.join(packages)}")
+        finally:
+            # 安装后重新探测
+            importlib.invalidate_caches()
+            for module, package in OPTIONAL_DEPENDENCIES.items():
+                if package in packages:
+                    _dependency_cache.pop(module, None)
+
+    def ensure_dependency(self, module: str):
+        """确保某个可选依赖可用，仅在首次缺失时尝试安装"""
+        if not is_module_available(module):
+            self.install_dependencies([OPTIONAL_DEPENDENCIES.get(module, module)])
+
+    def _hf_repo_id(self, dataset_path: str) -> str:
+        """从HuggingFace URL或路径中提取数据集ID"""
+        if dataset_path.startswith(("http://", "https://")):
+            # 从 URL 提取数据集 ID
+            if "huggingface.co/datasets/" in dataset_path:
+                dataset_path = dataset_path.split("huggingface.co/datasets/")[-1]
+            elif "hf-mirror.com/datasets/" in dataset_path:
+                dataset_path = dataset_path.split("hf-mirror.com/datasets/")[-1]
+            else:
+                logger.warning(f"无法从URL提取数据集ID: {dataset_path}")
+                # 尝试使用最后一部分作为数据集ID
+                return dataset_path.rstrip("/").split("/")[-1]
+            # 去掉 /tree/main 等子路径
+            parts = dataset_path.strip("/").split("/")
+            dataset_path = "/".join(parts[:2])
+        return dataset_path
+
+    def _hf_patterns(self, repo_id: str, allow_patterns=None, ignore_patterns=None) -> Tuple[Optional[List[str]], Optional[List[str]]]:
+        """合并实例级与调用级的HF文件过滤模式
+
+        显式的allow模式与splits/configs/file_types生成的模式取交集：两者都设置时列出仓库文件，
+        只保留同时匹配两组模式的文件，并以转义后的文件名作为allow模式返回。
+        """
+        explicit = list(allow_patterns if allow_patterns is not None else (self.hf_allow_patterns or []))
+        generated = build_hf_allow_patterns(self.hf_splits, self.hf_configs, self.hf_file_types)
+        ignore = list(ignore_patterns if ignore_patterns is not None else (self.hf_ignore_patterns or []))
+        if explicit and generated:
+            from huggingface_hub import HfApi
+            from huggingface_hub.utils import filter_repo_objects
+            files = HfApi().list_repo_files(repo_id, repo_type="dataset")
+            selected = filter_repo_objects(filter_repo_objects(files, allow_patterns=explicit),
+                                           allow_patterns=generated)
+            allow = [glob.escape(path) for path in selected]
+            if not allow:
+                logger.warning(f"{repo_id} 中没有同时匹配 allow={explicit} 与 {generated} 的文件")
+        else:
+            allow = explicit or generated
+        if explicit or generated:
+            # 保留数据集卡片和加载脚本，保证过滤后的快照仍可被datasets加载
+            allow.extend(p for p in HF_METADATA_PATTERNS if p not in allow)
+        return (allow or None), (ignore or None)
+
+    def fetch_huggingface_metadata(self, dataset_path: str, allow_patterns=None, ignore_patterns=None) -> str:
+        """仅记录HF数据集的文件列表和大小，不下载数据"""
+        try:
+            os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
+            from huggingface_hub import HfApi
+            from huggingface_hub.utils import filter_repo_objects
+
+            repo_id = self._hf_repo_id(dataset_path)
+            allow, ignore = self._hf_patterns(repo_id, allow_patterns, ignore_patterns)
+            info = HfApi().dataset_info(repo_id, files_metadata=True)
+            siblings = list(filter_repo_objects(
+                info.siblings or [],
+                allow_patterns=allow,
+                ignore_patterns=ignore,
+                key=lambda s: s.rfilename
+            ))
+            files = [{"path": s.rfilename, "size": s.size} for s in siblings]
+            total_size = sum(f["size"] or 0 for f in files)
+
+            metadata = {
+                "revision": info.sha,
+                "files": files,
+                "total_size": total_size,
+                "date": self._get_current_timestamp()
+            }
+            # 合并到已有的下载记录中，不覆盖其本地路径；没有下载记录时单独记录元数据
+            entry = self.history.get(repo_id) or {"source": "huggingface_metadata", "path": ""}
+            self.history[repo_id] = {**entry, "metadata": metadata}
+            self.save_history()
+
+            return f"已记录元数据: {repo_id}, {len(files)}个文件, 共{total_size}字节"
+        except Exception as e:
+            logger.error(f"获取HuggingFace元数据失败: {str(e)}")
+            return f"获取HuggingFace元数据失败: {str(e)}"
+
+    def download_from_huggingface(self, dataset_path: str, allow_patterns: Optional[List[str]] = None,
+                                  ignore_patterns: Optional[List[str]] = None,
+                                  max_workers: Optional[int] = None) -> str:
+        """从HuggingFace或镜像站点下载数据集
+
+        Args:
+            dataset_path: 数据集ID或URL
+            allow_patterns: 仅下载匹配的文件（默认使用实例配置及splits/configs/file_types生成的模式）
+            ignore_patterns: 跳过匹配的文件
+            max_workers: 并行下载线程数（默认使用实例配置）
+        """
+        if self.metadata_only:
+            return self.fetch_huggingface_metadata(dataset_path, allow_patterns, ignore_patterns)
 
-    def download_from_huggingface(self, dataset_path: str) -> str:
-        """从HuggingFace或镜像站点下载数据集"""
         try:
             # 设置环境变量使用镜像站点
             os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
             
             # 处理完整 URL 的情况
-            if dataset_path.startswith(("http://", "https://")):
-                # 从 URL 提取数据集 ID
-                if "huggingface.co/datasets/" in dataset_path:
-                    dataset_path = dataset_path.split("huggingface.co/datasets/")[-1]
-                elif "hf-mirror.com/datasets/" in dataset_path:
-                    dataset_path = dataset_path.split("hf-mirror.com/datasets/")[-1]
-                else:
-                    logger.warning(f"无法从URL提取数据集ID: {dataset_path}")
-                    # 尝试使用最后一部分作为数据集ID
-                    dataset_path = dataset_path.rstrip("/").split("/")[-1]
+            dataset_path = self._hf_repo_id(dataset_path)
             
             # 首先尝试使用huggingface_hub的snapshot_download功能
             try:
+                allow, ignore = self._hf_patterns(dataset_path, allow_patterns, ignore_patterns)
                 logger.info(f"尝试从HF镜像站点下载数据集: {dataset_path}")
                 from huggingface_hub import snapshot_download
                 
-                # 确定本地保存路径
-                save_path = os.path.join(self.download_dir, dataset_path.replace("/", "_"))
-                os.makedirs(save_path, exist_ok=True)
+                kwargs = {}
+                if self.hf_use_cache:
+                    # 复用标准HF缓存：已缓存且未变化的文件不会重复下载
+                    save_path_desc = "HF缓存"
+                else:
+                    save_path = os.path.join(self.download_dir, dataset_path.replace("/", "_"))
+                    os.makedirs(save_path, exist_ok=True)
+                    kwargs["local_dir"] = save_path
+                    save_path_desc = save_path
                 
-                # 使用镜像站点下载
-                with tqdm(desc=f"从HF镜像下载 {dataset_path}") as pbar:
-                    def progress_callback(progress):
-                        pbar.update(progress - pbar.n)
-                    
-                    snapshot_download(
-                        repo_id=dataset_path,
-                        repo_type="dataset",
-                        local_dir=save_path,
-                        local_dir_use_symlinks=False,
-                        resume_download=True,
-                        max_workers=4,  # 增加并行下载的工作线程数
-                        tqdm_class=lambda *args, **kwargs: pbar  # 使用现有进度条
-                    )
+                logger.info(f"下载至{save_path_desc}, 文件过滤: allow={allow}, ignore={ignore}")
+                save_path = snapshot_download(
+                    repo_id=dataset_path,
+                    repo_type="dataset",
+                    allow_patterns=allow,
+                    ignore_patterns=ignore,
+                    max_workers=max_workers or self.hf_max_workers,
+                    **kwargs
+                )
                 
                 # 更新历史
                 self.history[dataset_path] = {
                     "source": "huggingface_mirror",
                     "path": save_path,
+                    "allow_patterns": allow,
+                    "ignore_patterns": ignore,
                     "date": self._get_current_timestamp()
                 }
                 self.save_history()
@@ -132,39 +358,57 @@ class DatasetDownloader:
                 logger.warning(f"使用HF镜像直接下载失败: {str(e)}，尝试使用datasets库")
                 
                 # 如果直接下载失败，尝试使用datasets库
+                self.ensure_dependency("datasets")
                 import datasets
                 
                 # 规范化数据集名称
                 normalized_name = dataset_path.replace("-", "_").lower()
                 logger.info(f"使用datasets库从镜像下载数据集: {normalized_name}")
                 
-                # 创建进度条
-                with tqdm(desc=f"下载 {normalized_name}", unit="MB") as pbar:
-                    def progress_callback(dl_size, total_size):
-                        if total_size:
-                            pbar.total = total_size / 1024 / 1024
-                        pbar.update((dl_size / 1024 / 1024) - pbar.n)
+                # 只加载所需的配置和划分，复用datasets缓存而不是强制重新下载；
+                # 与snapshot_download一致，指定了多个配置时逐个加载
+                configs = self.hf_configs or [None]
+                save_paths = []
+                for config in configs:
+                    load_kwargs = {}
+                    if config:
+                        load_kwargs["name"] = config
+                    if self.hf_splits:
+                        load_kwargs["split"] = "+".join(self.hf_splits)
                     
-                    # 下载数据集
                     try:
-                        dataset = datasets.load_dataset(normalized_name, download_mode="force_redownload")
+                        dataset = datasets.load_dataset(normalized_name, **load_kwargs)
                     except Exception as inner_error:
                         # 尝试使用原始路径
                         logger.warning(f"使用规范化路径失败: {str(inner_error)}，尝试使用原始路径")
-                        dataset = datasets.load_dataset(dataset_path, download_mode="force_redownload")
-                    
-                    save_path = os.path.join(self.download_dir, normalized_name.split('/')[-1])
-                    dataset.save_to_disk(save_path)
+                        dataset = datasets.load_dataset(dataset_path, **load_kwargs)
                     
-                    # 更新历史
-                    self.history[normalized_name] = {
-                        "source": "huggingface",
-                        "path": save_path,
-                        "date": dataset.info.download_timestamp
-                    }
-                    self.save_history()
-                    
-                    return f"数据集已保存至 {save_path}"
+                    if self.hf_use_cache:
+                        # 数据已在datasets缓存中，无需再保存一份副本
+                        cache_files = dataset.cache_files
+                        if isinstance(cache_files, dict):
+                            cache_files = [f for files in cache_files.values() for f in files]
+                        config_path = os.path.dirname(cache_files[0]["filename"]) if cache_files else ""
+                    else:
+                        config_path = os.path.join(self.download_dir, normalized_name.split('/')[-1])
+                        if len(configs) > 1:
+                            config_path = os.path.join(config_path, config)
+                        dataset.save_to_disk(config_path)
+                    save_paths.append(config_path)
+                
+                found = [path for path in save_paths if path]
+                save_path = found[0] if len(found) == 1 else (os.path.commonpath(found) if found else "")
+                
+                # 更新历史
+                self.history[normalized_name] = {
+                    "source": "huggingface",
+                    "path": save_path,
+                    "configs": self.hf_configs,
+                    "date": self._get_current_timestamp()
+                }
+                self.save_history()
+                
+                return f"数据集已保存至 {save_path}"
                     
         except Exception as e:
             logger.error(f"HuggingFace下载失败: {str(e)}")
@@ -174,9 +418,7 @@ class DatasetDownloader:
         """从Git仓库克隆数据集（简化版，无进度报告）"""
         try:
             # 检查GitPython是否已安装
-            missing = self.check_dependencies()
-            if "GitPython" in missing:
-                self.install_dependencies(["GitPython"])
+            self.ensure_dependency("git")
                 
             from git import Repo
             repo_name = repo_url.split("/")[-1].replace(".git", "")
@@ -211,9 +453,7 @@ class DatasetDownloader:
     def download_from_kaggle(self, dataset_identifier: str) -> str:
         """从Kaggle下载数据集"""
         try:
-            missing = self.check_dependencies()
-            if "kaggle" in missing:
-                self.install_dependencies(["kaggle"])
+            self.ensure_dependency("kaggle")
                 
             import kaggle
             dataset_path = os.path.join(self.download_dir, "kaggle", dataset_identifier.replace("/", "_"))
@@ -239,45 +479,203 @@ class DatasetDownloader:
             logger.error(f"Kaggle下载失败: {str(e)}")
             return f"Kaggle下载失败: {str(e)}"
 
-    def download_from_url(self, url: str, filename: Optional[str] = None) -> str:
-        """通用URL下载方法"""
+    def _published_checksums(self, url: str, headers) -> Dict[str, str]:
+        """收集服务器公布的校验值 {算法: 十六进制摘要}
+
+        来源包括 Digest/Repr-Digest、Content-MD5、x-goog-hash 响应头，
+        以及开启 verify_sidecar_checksums 时的 <url>.sha256 / <url>.md5 旁路文件。
+        """
+        checksums = {}
+        for header in ("repr-digest", "digest", "x-goog-hash"):
+            value = headers.get(header)
+            if value:
+                checksums.update(parse_digest_header(value))
+        if headers.get("content-md5"):
+            checksums.update(parse_digest_header(f"md5={headers['content-md5']}"))
+
+        if self.verify_sidecar_checksums:
+            import requests
+            for algorithm in ("sha256", "md5"):
+                try:
+                    sidecar = requests.get(f"{url}.{algorithm}", timeout=10)
+                    if sidecar.status_code == 200:
+                        digest = sidecar.text.strip().split()[0].lower() if sidecar.text.strip() else ""
+                        if re.fullmatch(r'[0-9a-f]+', digest) and len(digest) == HASH_HEX_LENGTHS[algorithm]:
+                            checksums.setdefault(algorithm, digest)
+                except Exception as e:
+                    logger.debug(f"获取校验文件失败: {url}.{algorithm}, {str(e)}")
+        return checksums
+
+    def download_from_url(self, url: str, filename: Optional[str] = None,
+                          expected_hash: Optional[str] = None) -> str:
+        """通用URL下载方法
+
+        已下载过的文件使用条件请求(If-None-Match / If-Modified-Since)，未变化时服务器返回304，
+        不再重复下载。下载过程中同步计算校验值，并与公布的校验值比对。
+
+        开启 extract_archives 时，.tar/.tar.gz/.tar.bz2/.tar.xz/.tar.zst 在数据到达时即以流模式
+        解包，归档本身不落盘；.zip 下载完成后立即解包并删除归档。解包先写入 <目录>.part，
+        校验通过后才替换为 <下载目录>/<归档名去掉后缀>，校验失败或中断时整体删除。
+
+        Args:
+            url: 文件URL
+            filename: 保存的文件名，默认取URL最后一段
+            expected_hash: 期望的校验值，格式为 "sha256:<hex>" 或直接给出十六进制摘要（按长度推断算法）
+        """
+        import requests
+        from tqdm import tqdm
+        extract_tmp = None
+        tmp_path = None
         try:
             if not filename:
                 filename = url.split("/")[-1]
                 
             save_path = os.path.join(self.download_dir, filename)
+            previous = self.history.get(filename, {})
+            kind = archive_type(filename) if self.extract_archives else None
+            if kind is not None:
+                # 解包后的目录是最终结果，也用于判断能否发送条件请求
+                save_path = os.path.join(self.download_dir, archive_stem(filename))
+                extract_tmp = save_path + ".part"
+                if kind[1] == "zst" and needs_zstd_module():
+                    self.ensure_dependency("zstandard")
+            
+            # 条件请求：文件仍在且来自同一URL时携带上次记录的ETag/Last-Modified
+            request_headers = {}
+            if previous.get("url") == url and os.path.exists(save_path):
+                if previous.get("etag"):
+                    request_headers["If-None-Match"] = previous["etag"]
+                if previous.get("last_modified"):
+                    request_headers["If-Modified-Since"] = previous["last_modified"]
+            
             logger.info(f"从URL下载文件: {url} -> {save_path}")
+            response = requests.get(url, stream=True, headers=request_headers, timeout=30)
+            
+            if response.status_code == 304:
+                response.close()
+                logger.info(f"文件未变化，跳过下载: {save_path}")
+                TRACER.annotate(status=304, bytes=0)
+                previous["checked"] = self._get_current_timestamp()
+                self.history[filename] = previous
+                self.save_history()
+                return f"文件未变化: {save_path}"
+            response.raise_for_status()
             
-            # 流式下载并显示进度
-            response = requests.get(url, stream=True)
             total_size = int(response.headers.get('content-length', 0))
+            # 传输时被压缩的响应，其Content-Length和Digest针对的是压缩后的字节，无法直接比对
+            encoded = response.headers.get("content-encoding", "identity") != "identity"
+            expected = parse_expected_hash(expected_hash) if expected_hash else {}
+            if not encoded:
+                # 显式给出的校验值优先
+                for algorithm, digest in self._published_checksums(url, response.headers).items():
+                    expected.setdefault(algorithm, digest)
+            
+            # 边下载边计算摘要，避免下载完成后再读一遍文件
+            hashers = {algorithm: hashlib.new(algorithm) for algorithm in set(expected) | {"sha256"}}
+            tmp_path = os.path.join(self.download_dir, filename) + ".part"
+            received = 0
+            extracted = None
+            if extract_tmp is not None and os.path.exists(extract_tmp):
+                shutil.rmtree(extract_tmp)
             
-            with open(save_path, 'wb') as f, tqdm(
+            # 流式下载并显示进度
+            with tqdm(
                 desc=filename,
                 total=total_size,
                 unit='B',
                 unit_scale=True,
                 unit_divisor=1024,
             ) as pbar:
-                for chunk in response.iter_content(chunk_size=8192):
-                    if chunk:
-                        f.write(chunk)
-                        pbar.update(len(chunk))
+                def chunks():
+                    nonlocal received
+                    for chunk in response.iter_content(chunk_size=1024 * 1024):
+                        if chunk:
+                            if self.bandwidth_limiter:
+                                self.bandwidth_limiter.consume(len(chunk))
+                            for hasher in hashers.values():
+                                hasher.update(chunk)
+                            received += len(chunk)
+                            pbar.update(len(chunk))
+                            yield chunk
+                
+                if kind is not None and kind[0] == "tar":
+                    # tar按成员顺序存储，可以边下载边解包，归档不写入磁盘
+                    reader = ChunkReader(chunks())
+                    extracted = extract_tar_stream(reader, extract_tmp, kind[1],
+                                                   self.extract_include, self.extract_exclude)
+                    reader.drain()
+                else:
+                    with open(tmp_path, 'wb') as f:
+                        for chunk in chunks():
+                            f.write(chunk)
+            
+            def discard():
+                if extracted is not None:
+                    shutil.rmtree(extract_tmp, ignore_errors=True)
+                else:
+                    os.remove(tmp_path)
+            
+            # 完整性校验
+            if total_size and not encoded and received != total_size:
+                discard()
+                return f"URL下载失败: 文件不完整({received}/{total_size}字节)"
+            for algorithm, digest in expected.items():
+                actual = hashers[algorithm].hexdigest()
+                if actual != digest:
+                    discard()
+                    logger.error(f"{algorithm}校验失败: 期望 {digest}, 实际 {actual}")
+                    return f"URL下载失败: {algorithm}校验失败"
+            if kind is not None and kind[0] == "zip":
+                # zip的中央目录在文件末尾，只能下载完成后解包
+                try:
+                    extracted = extract_zip(tmp_path, extract_tmp, self.extract_include, self.extract_exclude)
+                finally:
+                    os.remove(tmp_path)
+            if extracted is not None:
+                replace_directory(extract_tmp, save_path)
+                logger.info(f"已解包 {extracted['files']} 个文件（{extracted['bytes']}字节）至: {save_path}")
+            else:
+                os.replace(tmp_path, save_path)
+            TRACER.annotate(status=response.status_code, bytes=received)
             
             # 更新历史
             self.history[filename] = {
                 "source": "url",
                 "path": save_path,
                 "url": url,
+                "etag": response.headers.get("etag"),
+                "last_modified": response.headers.get("last-modified"),
+                "size": received,
+                "sha256": hashers["sha256"].hexdigest(),
+                "verified": sorted(expected),
+                "extracted": extracted,
                 "date": self._get_current_timestamp()
             }
             self.save_history()
             
+            if extracted is not None:
+                return f"文件已下载并解包至: {save_path}（{extracted['files']}个文件）"
             return f"文件已下载至: {save_path}"
         except Exception as e:
+            # 下载或写入中途出错时删除未完成的 .part 文件/目录
+            if extract_tmp is not None and os.path.exists(extract_tmp):
+                shutil.rmtree(extract_tmp, ignore_errors=True)
+            if tmp_path is not None and os.path.exists(tmp_path):
+                os.remove(tmp_path)
             logger.error(f"URL下载失败: {str(e)}")
             return f"URL下载失败: {str(e)}"
 
+    def resolve_dataset_info(self, dataset_info: Union[str, Tuple[str, str], List[str]]) -> Union[str, Tuple[str, str], List[str]]:
+        """将数据集名称通过本地数据集目录解析为 (source, path)，支持模糊匹配
+
+        无法解析时原样返回。
+        """
+        if isinstance(dataset_info, str) and not dataset_info.startswith(("http://", "https://")):
+            info = self.registry.lookup(dataset_info)
+            if info is not None:
+                return tuple(info)
+        return dataset_info
+
     def download(self, dataset_info: Union[str,  List[str]]) -> str:
         """增强版下载方法，支持多种格式
     
@@ -290,10 +688,7 @@ class DatasetDownloader:
         Returns:
             下载结果描述
         """
-        # 检查依赖
-        missing = self.check_dependencies()
-        if missing:
-            self.install_dependencies(missing)
+        # 依赖按来源在各下载方法中按需检查，这里不再逐次探测全部依赖
         
         # 处理元组格式 (source, path)
         if isinstance(dataset_info, tuple) and len(dataset_info) == 2:
@@ -308,8 +703,9 @@ class DatasetDownloader:
         # 处理字符串格式
         if isinstance(dataset_info, str):
             # 检查预设映射
-            if dataset_info in self.dataset_mapping:
-                return self.download(self.dataset_mapping[dataset_info])
+            resolved = self.resolve_dataset_info(dataset_info)
+            if resolved is not dataset_info:
+                return self.download(resolved)
             
             # 自动识别格式
             if "/" in dataset_info and not dataset_info.startswith(("http://", "https://")):
@@ -383,6 +779,12 @@ class DatasetDownloader:
                 results[name] = f"下载失败: {str(e)}"
             
         return results
+
+    @staticmethod
+    def is_successful(result: str) -> bool:
+        """根据下载方法返回的结果消息判断下载是否成功"""
+        return not any(marker in result for marker in ("失败", "未识别", "需要手动", "已跳过"))
+
     def _get_current_timestamp(self) -> str:
         """获取当前时间戳"""
         from datetime import datetime
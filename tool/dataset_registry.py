@@ -0,0 +1,223 @@
+import os
+import re
+import json
+import logging
+import threading
+from typing import Dict, Tuple, List, Union, Optional, Any
+
+from tool.download_queue import normalize_dataset_name, target_key
+from tool.checkpoint import file_lock, write_json_atomic
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+REGISTRY_FILENAME = "dataset_registry.json"
+
+# 内置目录：原 DatasetDownloader.dataset_mapping 中的预设映射
+BUILTIN_CATALOG = [
+    {"name": "HumanEval", "aliases": ["human-eval", "openai_humaneval"], "source": "huggingface", "path": "openai/human-eval"},
+    {"name": "HotPotQA", "aliases": ["hotpot_qa"], "source": "huggingface", "path": "hotpot_qa"},
+    {"name": "MBPP", "aliases": [], "source": "huggingface", "path": "mbpp"},
+    {"name": "AlfWorld", "aliases": [], "source": "git", "path": "https://github.com/alfworld/alfworld.git"},
+    {"name": "WebShop", "aliases": [], "source": "git", "path": "https://github.com/princeton-nlp/WebShop"},
+]
+
+
+# 名称中不影响数据集身份的泛称，如 "WebShop benchmark"、"HotPotQA dataset"
+GENERIC_WORDS = re.compile(r'\b(datasets?|data\s+sets?|benchmarks?|corpus|corpora)\b', re.IGNORECASE)
+
+
+# "HumanEval-X"、"MBPP-S" 这类连字符后的单字母后缀表示不同的数据集变体
+VARIANT_SUFFIX = re.compile(r'(?<=[0-9A-Za-z])-([A-Za-z])\b')
+
+
+def registry_key(name: str) -> str:
+    """目录查找用的规范化名称：去掉泛称后再规范化，去掉后为空时保留原名称
+
+    "+" 记为 "plus"，使 "HumanEval+" 与 "HumanEval" 得到不同的键。
+    """
+    name = name.replace("+", " plus ")
+    return normalize_dataset_name(GENERIC_WORDS.sub(" ", name)) or normalize_dataset_name(name)
+
+
+def variant_tokens(name: str) -> Tuple[Tuple[str, ...], bool, Tuple[str, ...]]:
+    """名称中区分数据集版本的部分：(数字/版本号, 是否带"+"/Plus, "-X"式后缀)
+
+    模糊匹配只在两者完全相同时成立，避免 CIFAR-100 -> CIFAR-10、MultiWOZ 2.2 -> MultiWOZ 2.1、
+    HumanEval-X -> HumanEval 这类误匹配。
+    """
+    text = GENERIC_WORDS.sub(" ", name)
+    numbers = tuple(re.findall(r'\d+', text))
+    plus = "+" in text or re.search(r'plus\b', text, re.IGNORECASE) is not None
+    suffixes = tuple(suffix.lower() for suffix in VARIANT_SUFFIX.findall(text))
+    return numbers, plus, suffixes
+
+
+def trigrams(normalized: str) -> set:
+    """带边界标记的字符三元组，用于模糊匹配"""
+    padded = f"$${normalized}$"
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class DatasetRegistry:
+    """本地数据集目录索引
+
+    记录数据集名称、别名与 (source, path) 的对应关系，支持按规范化名称精确查找
+    （"HotPotQA" 与 "hotpot_qa" 视为同一名称），以及基于三元组(trigram)相似度的模糊查找。
+    模糊结果只作提示，lookup() 仅自动解析精确或别名匹配，其余交给LLM。
+    下载成功后会学习新的名称映射并持久化到JSON文件。
+    """
+    _shared: Dict[str, "DatasetRegistry"] = {}
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path: Optional[str] = None, catalogs: Optional[List[str]] = None,
+                 min_score: float = 0.8, builtin: bool = True):
+        self.path = path
+        self.min_score = min_score
+        self.entries: List[Dict[str, Any]] = []
+        self._exact: Dict[str, int] = {}
+        self._grams: Dict[str, set] = {}
+        # 规范化下载目标 -> 条目下标
+        self._targets: Dict[str, int] = {}
+        self._lock = threading.RLock()
+        self.loaded_catalogs: List[str] = []
+
+        if builtin:
+            for entry in BUILTIN_CATALOG:
+                self.add(entry["name"], (entry["source"], entry["path"]), entry["aliases"])
+        for catalog in catalogs or []:
+            self.load(catalog)
+        if path and os.path.exists(path):
+            self.load(path)
+
+    @classmethod
+    def shared(cls, path: str, catalogs: Optional[List[str]] = None) -> "DatasetRegistry":
+        """获取进程内共享的目录实例，同一路径只加载一次"""
+        key = os.path.abspath(path)
+        with cls._shared_lock:
+            registry = cls._shared.get(key)
+            if registry is None:
+                registry = cls._shared[key] = cls(path, catalogs)
+            else:
+                for catalog in catalogs or []:
+                    if catalog not in registry.loaded_catalogs:
+                        registry.load(catalog)
+            return registry
+
+    def load(self, path: str):
+        """从JSON目录文件加载条目，格式为 {"datasets": [{"name", "aliases", "source", "path"}]}"""
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            entries = data.get("datasets", []) if isinstance(data, dict) else data
+            for entry in entries:
+                self.add(entry["name"], (entry["source"], entry["path"]), entry.get("aliases", []),
+                         hits=entry.get("hits", 0))
+            self.loaded_catalogs.append(path)
+            logger.info(f"已加载数据集目录: {path}, 共{len(entries)}条")
+        except Exception as e:
+            logger.error(f"加载数据集目录失败: {path}, {str(e)}")
+
+    def save(self):
+        """在文件锁内合并其他进程/节点已写入的条目后原子地写回目录文件"""
+        if not self.path:
+            return
+        with self._lock:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+                with file_lock(f"{self.path}.lock"):
+                    if os.path.exists(self.path):
+                        with open(self.path, 'r', encoding='utf-8') as f:
+                            data = json.load(f)
+                        for entry in data.get("datasets", []) if isinstance(data, dict) else data:
+                            self.add(entry["name"], (entry["source"], entry["path"]), entry.get("aliases", []),
+                                     hits=entry.get("hits", 0))
+                    data = {"version": 1, "datasets": [dict(entry) for entry in self.entries]}
+                    write_json_atomic(data, self.path)
+            except Exception as e:
+                logger.error(f"保存数据集目录失败: {str(e)}")
+
+    def _index(self, index: int, name: str):
+        normalized = registry_key(name)
+        if not normalized:
+            return
+        self._exact.setdefault(normalized, index)
+        for gram in trigrams(normalized):
+            self._grams.setdefault(gram, set()).add(index)
+
+    def add(self, name: str, dataset_info: Union[Tuple[str, str], List[str]],
+            aliases: Optional[List[str]] = None, hits: int = 0) -> Dict[str, Any]:
+        """添加或更新条目，同一 (source, path) 的不同名称合并为别名"""
+        source, path = dataset_info[0], dataset_info[1]
+        key = target_key((source, path))
+        with self._lock:
+            index = self._targets.get(key)
+            if index is None:
+                index = self._targets[key] = len(self.entries)
+                self.entries.append({"name": name, "aliases": [], "source": source, "path": path, "hits": 0})
+            entry = self.entries[index]
+            entry["hits"] = max(entry["hits"], hits)
+            for alias in [name] + list(aliases or []):
+                known = [entry["name"]] + entry["aliases"]
+                if registry_key(alias) not in {registry_key(k) for k in known}:
+                    entry["aliases"].append(alias)
+                self._index(index, alias)
+            return entry
+
+    def match(self, name: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        """查找最相近的条目，返回 (条目, 相似度)；精确或别名匹配时相似度为1.0
+
+        模糊匹配要求数字/版本号和 "+"、"-X" 等后缀完全相同（见 variant_tokens），
+        相似度低于 min_score 时返回None。
+        """
+        normalized = registry_key(name)
+        if not normalized:
+            return None
+        with self._lock:
+            if normalized in self._exact:
+                return self.entries[self._exact[normalized]], 1.0
+
+            grams = trigrams(normalized)
+            variant = variant_tokens(name)
+            counts: Dict[int, int] = {}
+            for gram in grams:
+                for index in self._grams.get(gram, ()):
+                    counts[index] = counts.get(index, 0) + 1
+            best, best_score = None, 0.0
+            for index in counts:
+                entry = self.entries[index]
+                # 对条目的每个名称/别名分别计算Dice系数，取最大值
+                for candidate in [entry["name"]] + entry["aliases"]:
+                    if variant_tokens(candidate) != variant:
+                        continue
+                    other = trigrams(registry_key(candidate))
+                    score = 2 * len(grams & other) / (len(grams) + len(other))
+                    if score > best_score:
+                        best, best_score = entry, score
+            if best is not None and best_score >= self.min_score:
+                return best, best_score
+        return None
+
+    def lookup(self, name: str) -> Optional[List[str]]:
+        """将数据集名称解析为 [source, path]，无法解析时返回None
+
+        只接受精确或别名匹配；模糊匹配的名称可能是同一数据集的不同版本，不自动解析。
+        """
+        result = self.match(name)
+        if result is None:
+            return None
+        entry, score = result
+        if score < 1.0:
+            logger.info(f"数据集 {name} 与目录中的 {entry['name']} 相近 (相似度 {score:.2f})，不自动解析")
+            return None
+        return [entry["source"], entry["path"]]
+
+    def learn(self, name: str, dataset_info: Union[Tuple[str, str], List[str]]):
+        """从成功的下载中学习名称映射并持久化"""
+        if not isinstance(dataset_info, (tuple, list)) or len(dataset_info) != 2:
+            return
+        with self._lock:
+            entry = self.add(name, dataset_info)
+            entry["hits"] += 1
+        self.save()
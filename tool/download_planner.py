@@ -0,0 +1,276 @@
+import os
+import re
+import time
+import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Tuple, List, Union, Optional, Any
+from urllib.parse import urlsplit
+
+from tool.download_queue import target_key, history_target_key
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+SIZE_UNITS = {"": 1, "B": 1, "K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+
+
+def parse_size(text: Union[str, int, None]) -> Optional[int]:
+    """解析人类可读的大小，如 "500MB"、"1.5G"、"2TiB"，返回字节数"""
+    if text is None or isinstance(text, int):
+        return text
+    match = re.fullmatch(r'\s*([\d.]+)\s*([KMGT]?)(?:I?B)?\s*', text.upper())
+    if not match:
+        raise ValueError(f"无法解析的大小: {text}")
+    return int(float(match.group(1)) * SIZE_UNITS[match.group(2)])
+
+
+def format_size(size: Optional[int]) -> str:
+    """将字节数格式化为人类可读的大小"""
+    if size is None:
+        return "未知"
+    value = float(size)
+    for unit in ("B", "KB", "MB", "GB", "TB"):
+        if value < 1024 or unit == "TB":
+            return f"{value:.1f} {unit}" if unit != "B" else f"{int(value)} B"
+        value /= 1024
+
+
+def hf_cache_dir() -> str:
+    """HuggingFace Hub缓存目录（hf_use_cache=True 时HF数据集实际写入的位置）"""
+    try:
+        from huggingface_hub import constants
+        return constants.HF_HUB_CACHE
+    except ImportError:
+        hf_home = os.environ.get("HF_HOME", os.path.join(os.path.expanduser("~"), ".cache", "huggingface"))
+        return os.environ.get("HF_HUB_CACHE", os.path.join(hf_home, "hub"))
+
+
+def _existing_parent(path: str) -> str:
+    """返回path本身或其最近的已存在上级目录，目录尚未创建时也能查询所在文件系统"""
+    path = os.path.abspath(path)
+    while not os.path.exists(path) and os.path.dirname(path) != path:
+        path = os.path.dirname(path)
+    return path
+
+
+class BandwidthLimiter:
+    """令牌桶限速器，多个下载线程共享同一个带宽上限（只作用于调用 consume() 的URL下载）"""
+    def __init__(self, bytes_per_second: int, burst: Optional[int] = None):
+        self.rate = float(bytes_per_second)
+        self.capacity = float(burst or bytes_per_second)
+        self.tokens = self.capacity
+        self.timestamp = time.monotonic()
+        self._lock = threading.Lock()
+
+    def consume(self, size: int):
+        """消耗size字节的配额，配额不足时阻塞等待"""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.timestamp) * self.rate)
+            self.timestamp = now
+            self.tokens -= size
+            # 允许透支，之后按欠额睡眠；持锁睡眠使各线程依次排队，总速率不超过上限
+            if self.tokens < 0:
+                time.sleep(-self.tokens / self.rate)
+
+
+class DownloadPlanner:
+    """下载前的预检规划器
+
+    把每个下载目标解析为预估大小（URL的HEAD请求、HF仓库文件列表、Kaggle元数据、
+    GitHub仓库大小），检查目标所在文件系统的剩余空间，并按大小或优先级排序下载任务。
+    下载历史中已存在的目标不计入空间预算。
+    """
+    def __init__(self, downloader, min_free_bytes: int = 1024 ** 3, max_dataset_bytes: Optional[int] = None,
+                 order: str = "size", skip_unknown: bool = False, max_workers: int = 8):
+        self.downloader = downloader
+        self.min_free_bytes = min_free_bytes
+        self.max_dataset_bytes = max_dataset_bytes
+        self.order = order
+        self.skip_unknown = skip_unknown
+        self.max_workers = max_workers
+
+    def _estimate_url(self, url: str) -> Optional[int]:
+        import requests
+        response = requests.head(url, allow_redirects=True, timeout=15)
+        if response.ok and response.headers.get("content-length"):
+            return int(response.headers["content-length"])
+        # 部分服务器不支持HEAD，退化为只取1字节的Range请求
+        response = requests.get(url, headers={"Range": "bytes=0-0"}, stream=True, timeout=15)
+        response.close()
+        content_range = response.headers.get("content-range", "")
+        if "/" in content_range and content_range.rsplit("/", 1)[-1].isdigit():
+            return int(content_range.rsplit("/", 1)[-1])
+        return None
+
+    def _estimate_huggingface(self, dataset_path: str) -> Optional[int]:
+        os.environ["HF_ENDPOINT"] = "https://hf-mirror.com"
+        from huggingface_hub import HfApi
+        from huggingface_hub.utils import filter_repo_objects
+
+        repo_id = self.downloader._hf_repo_id(dataset_path)
+        allow, ignore = self.downloader._hf_patterns(repo_id)
+        info = HfApi().dataset_info(repo_id, files_metadata=True)
+        siblings = filter_repo_objects(info.siblings or [], allow_patterns=allow,
+                                       ignore_patterns=ignore, key=lambda s: s.rfilename)
+        return sum(s.size or 0 for s in siblings)
+
+    def _estimate_kaggle(self, identifier: str) -> Optional[int]:
+        self.downloader.ensure_dependency("kaggle")
+        import kaggle
+        files = kaggle.api.dataset_list_files(identifier).files
+        sizes = [getattr(f, "totalBytes", None) or getattr(f, "total_bytes", None) for f in files]
+        if not sizes or any(size is None for size in sizes):
+            return None
+        return sum(int(size) for size in sizes)
+
+    def _estimate_git(self, repo_url: str) -> Optional[int]:
+        parts = urlsplit(repo_url if "://" in repo_url else "https://" + repo_url)
+        segments = [s for s in parts.path.split("/") if s]
+        if (parts.hostname or "").lower().removeprefix("www.") != "github.com" or len(segments) < 2:
+            return None
+        import requests
+        owner, repo = segments[0], segments[1].removesuffix(".git")
+        response = requests.get(f"https://api.github.com/repos/{owner}/{repo}", timeout=15)
+        if not response.ok:
+            return None
+        # GitHub API返回的size单位为KB
+        return int(response.json().get("size", 0)) * 1024
+
+    def estimate_size(self, dataset_info: Union[str, Tuple[str, str], List[str]]) -> Optional[int]:
+        """估算单个下载目标的大小（字节），无法估算时返回None"""
+        dataset_info = self.downloader.resolve_dataset_info(dataset_info)
+        key = target_key(dataset_info)
+        path = dataset_info[1] if isinstance(dataset_info, (tuple, list)) else dataset_info
+        try:
+            if key.startswith("hf:"):
+                return self._estimate_huggingface(path)
+            if key.startswith("git:"):
+                return self._estimate_git(path)
+            if key.startswith("kaggle:"):
+                return self._estimate_kaggle(path)
+            if key.startswith("url:"):
+                return self._estimate_url(path)
+        except Exception as e:
+            logger.warning(f"估算大小失败: {dataset_info}, {str(e)}")
+        return None
+
+    def storage_dir(self, key: str) -> str:
+        """下载目标实际写入的目录：使用HF缓存时HF数据集写入缓存目录，其余写入下载目录"""
+        if key.startswith("hf:") and getattr(self.downloader, "hf_use_cache", False):
+            return hf_cache_dir()
+        return self.downloader.download_dir
+
+    def downloaded_keys(self) -> Dict[str, str]:
+        """下载历史中本地文件仍存在的目标，返回 目标标识 -> 本地路径"""
+        downloaded = {}
+        for name, entry in self.downloader.history.items():
+            key = history_target_key(name, entry)
+            if key and entry.get("path") and os.path.exists(entry["path"]):
+                downloaded[key] = entry["path"]
+        return downloaded
+
+    def plan(self, requests: List[Tuple[str, str, Any]]) -> Dict[str, Any]:
+        """生成下载计划
+
+        Args:
+            requests: [(论文, 数据集名称, 下载信息)] 列表，指向同一目标的请求会合并为一个任务
+
+        Returns:
+            计划字典，包含按执行顺序排列的 "jobs"、"skipped" 以及磁盘空间统计
+        """
+        jobs: Dict[str, Dict[str, Any]] = {}
+        for paper, name, info in requests:
+            resolved = self.downloader.resolve_dataset_info(info)
+            key = target_key(resolved)
+            job = jobs.setdefault(key, {"key": key, "info": resolved, "names": [], "papers": [], "requests": []})
+            job["requests"].append((paper, name))
+            if name not in job["names"]:
+                job["names"].append(name)
+            if paper not in job["papers"]:
+                job["papers"].append(paper)
+
+        # 并发估算大小，HEAD请求和元数据查询都以网络延迟为主
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            sizes = executor.map(lambda job: self.estimate_size(job["info"]), jobs.values())
+            for job, size in zip(jobs.values(), sizes):
+                job["estimated_size"] = size
+
+        # 大小已知的在前；priority按请求论文数从多到少，其次按大小
+        def sort_key(job):
+            size = job["estimated_size"]
+            unknown = size is None
+            if self.order == "priority":
+                return (unknown, -len(job["papers"]), size or 0)
+            return (unknown, size or 0)
+
+        os.makedirs(self.downloader.download_dir, exist_ok=True)
+        downloaded = self.downloaded_keys()
+        # 按文件系统分别计算预算，HF缓存可能与下载目录不在同一个磁盘上
+        storage: Dict[int, Dict[str, Any]] = {}
+
+        def storage_for(directory: str) -> Dict[str, Any]:
+            existing = _existing_parent(directory)
+            device = os.stat(existing).st_dev
+            if device not in storage:
+                free_bytes = shutil.disk_usage(existing).free
+                storage[device] = {"dir": directory, "free_bytes": free_bytes,
+                                   "budget": free_bytes - self.min_free_bytes, "planned_bytes": 0}
+            return storage[device]
+
+        storage_for(self.downloader.download_dir)
+        scheduled, skipped = [], []
+        for job in sorted(jobs.values(), key=sort_key):
+            size = job["estimated_size"]
+            job["downloaded"] = job["key"] in downloaded
+            if job["downloaded"]:
+                # 已下载的目标不会再占用空间，排入计划但不计入预算
+                scheduled.append(job)
+                continue
+            disk = storage_for(self.storage_dir(job["key"]))
+            if size is None and self.skip_unknown:
+                job["reason"] = "大小未知"
+            elif size is not None and self.max_dataset_bytes is not None and size > self.max_dataset_bytes:
+                job["reason"] = f"超过单个数据集大小上限 {format_size(self.max_dataset_bytes)}"
+            elif size is not None and disk["planned_bytes"] + size > disk["budget"]:
+                job["reason"] = f"磁盘剩余空间不足 ({disk['dir']})"
+            else:
+                disk["planned_bytes"] += size or 0
+                scheduled.append(job)
+                continue
+            skipped.append(job)
+
+        return {
+            "download_dir": self.downloader.download_dir,
+            "storage": list(storage.values()),
+            "reserved_bytes": self.min_free_bytes,
+            "planned_bytes": sum(disk["planned_bytes"] for disk in storage.values()),
+            "downloaded_jobs": sum(1 for job in scheduled if job["downloaded"]),
+            "unknown_size_jobs": sum(1 for job in scheduled
+                                     if job["estimated_size"] is None and not job["downloaded"]),
+            "jobs": scheduled,
+            "skipped": skipped
+        }
+
+    @staticmethod
+    def format_plan(plan: Dict[str, Any]) -> str:
+        """将下载计划格式化为便于阅读的文本"""
+        lines = [f"下载目录: {plan['download_dir']}"]
+        for disk in plan["storage"]:
+            lines.append(f"剩余空间: {format_size(disk['free_bytes'])} (保留 {format_size(plan['reserved_bytes'])}，"
+                         f"计划占用 {format_size(disk['planned_bytes'])})  {disk['dir']}")
+        lines.append(f"计划下载: {len(plan['jobs'])}个目标，共约 {format_size(plan['planned_bytes'])}"
+                     + (f"，其中{plan['downloaded_jobs']}个已下载" if plan['downloaded_jobs'] else "")
+                     + (f"，另有{plan['unknown_size_jobs']}个大小未知" if plan['unknown_size_jobs'] else ""))
+        for i, job in enumerate(plan["jobs"], 1):
+            size = "已下载" if job["downloaded"] else format_size(job["estimated_size"])
+            lines.append(f"  {i}. [{size:>10}] {job['key']}  "
+                         f"({', '.join(job['names'])}; {len(job['papers'])}篇论文)")
+        if plan["skipped"]:
+            lines.append(f"跳过: {len(plan['skipped'])}个目标")
+            for job in plan["skipped"]:
+                lines.append(f"  - [{format_size(job['estimated_size']):>10}] {job['key']}  {job['reason']}")
+        return "\n".join(lines)
@@ -0,0 +1,234 @@
+import os
+import re
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, Future, CancelledError
+from typing import Dict, Tuple, List, Union, Optional
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from tool.profiler import TRACER
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# 视为HuggingFace数据集页面的域名
+HF_HOSTS = ("huggingface.co", "hf-mirror.com")
+# 仓库路径大小写不敏感的Git托管域名
+GIT_HOSTS = ("github.com", "gitlab.com", "bitbucket.org")
+# 视为普通URL下载的来源类型（与DatasetDownloader._process_by_source保持一致）
+URL_SOURCES = ("url", "official", "官方网站", "官方出版物", "官方数据库")
+
+
+def normalize_dataset_name(name: str) -> str:
+    """规范化数据集名称："HotPotQA"、"HotpotQA"、"hotpot_qa" 均得到 "hotpotqa" """
+    return re.sub(r'[^0-9a-z]', '', name.lower())
+
+
+def canonical_url(url: str) -> str:
+    """规范化URL：小写协议和域名、统一https、去掉默认端口/www/片段/末尾斜杠，并排序查询参数"""
+    parts = urlsplit(url.strip())
+    scheme = "https" if parts.scheme in ("http", "https") else parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def _git_key(url: str) -> str:
+    """Git仓库标识：有无.git后缀、http/https、末尾斜杠视为同一仓库"""
+    if not url.startswith(("http://", "https://", "git@", "ssh://")):
+        url = "https://" + url.lstrip("/")
+    if url.startswith("git@"):
+        # git@github.com:owner/repo.git -> https://github.com/owner/repo.git
+        url = "https://" + url[4:].replace(":", "/", 1)
+    parts = urlsplit(canonical_url(url))
+    path = parts.path
+    if path.endswith(".git"):
+        path = path[:-4]
+    host = parts.netloc
+    if host in GIT_HOSTS:
+        # 只保留 owner/repo，忽略 /tree/main 等子路径
+        path = "/".join(path.strip("/").split("/")[:2]).lower()
+    return f"git:{host}/{path.strip('/')}"
+
+
+def _hf_key(repo_id: str) -> str:
+    return f"hf:{repo_id.strip('/').lower()}"
+
+
+def target_key(dataset_info: Union[str, Tuple[str, str], List[str]]) -> str:
+    """计算下载目标的规范化标识，指向同一数据的不同写法得到相同的标识
+
+    支持HF仓库ID/URL、带或不带.git的Git地址、普通URL以及Kaggle标识。
+    """
+    if isinstance(dataset_info, (tuple, list)) and len(dataset_info) == 2:
+        source, path = str(dataset_info[0]).lower(), str(dataset_info[1]).strip()
+    else:
+        source, path = "", str(dataset_info).strip()
+
+    if path.lower().startswith(("http://", "https://")):
+        parts = urlsplit(path)
+        host = (parts.hostname or "").lower()
+        if host.startswith("www."):
+            host = host[4:]
+        segments = [s for s in parts.path.split("/") if s]
+        if host in HF_HOSTS and segments[:1] == ["datasets"] and len(segments) >= 2:
+            # 无命名空间的仓库后面可能直接跟 /tree/main、/blob/... 等子路径
+            repo = segments[1:2] if segments[2:3] in (["tree"], ["blob"], ["resolve"]) else segments[1:3]
+            return _hf_key("/".join(repo))
+        if source in ("git", "github") or (host in GIT_HOSTS and len(segments) >= 2 and source not in URL_SOURCES):
+            return _git_key(path)
+        if host in GIT_HOSTS and len(segments) == 2:
+            # 指向仓库首页的URL与Git克隆地址视为同一目标
+            return _git_key(path)
+        return f"url:{canonical_url(path)}"
+
+    if source in ("git", "github") or "github.com" in path.lower():
+        return _git_key(path)
+    if source == "kaggle":
+        return f"kaggle:{path.lower()}"
+    if source == "huggingface" or "/" in path or not source:
+        return _hf_key(path)
+    return f"{source}:{path}"
+
+
+def history_target_key(name: str, entry: Dict) -> Optional[str]:
+    """根据下载历史条目还原其下载目标标识"""
+    source = entry.get("source", "")
+    if source.startswith("huggingface"):
+        return _hf_key(name)
+    if source == "git":
+        return _git_key(entry.get("url", name))
+    if source == "kaggle":
+        return f"kaggle:{name.lower()}"
+    if source == "url" and entry.get("url"):
+        return target_key(("url", entry["url"]))
+    return None
+
+
+class DownloadQueue:
+    """一次运行内共享的全局下载队列
+
+    对下载目标做规范化后合并：相同目标只会产生一个进行中的下载任务，
+    其结果通过同一个Future分发给所有请求它的论文。
+
+    retry_failed=True 时失败的任务完成后即从队列中移除，之后的请求会重新下载；
+    适用于长时间运行的服务，批处理中默认同一目标失败后不再重试。
+    """
+    def __init__(self, downloader, max_workers: int = 4, retry_failed: bool = False):
+        self.downloader = downloader
+        self.max_workers = max_workers
+        self.retry_failed = retry_failed
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download")
+        self._jobs: Dict[str, Future] = {}
+        # 可重入：已完成的Future添加回调时回调会在持锁的提交线程中立即执行
+        self._lock = threading.RLock()
+        self.submitted = 0
+        self.coalesced = 0
+        self._history_keys = self._index_history()
+
+    def _index_history(self) -> Dict[str, str]:
+        """建立 目标标识 -> 本地路径 的索引，用于跳过已下载的数据集"""
+        index = {}
+        for name, entry in self.downloader.history.items():
+            key = history_target_key(name, entry)
+            if key and entry.get("path"):
+                index[key] = entry["path"]
+        return index
+
+    def submit(self, name: str, dataset_info: Union[str, Tuple[str, str], List[str]],
+               paper: Optional[str] = None) -> Future:
+        """提交下载任务，相同目标复用已有的任务
+
+        只按规范化后的下载目标合并：名称相同但指向不同目标的请求（如同名数据集的不同版本）分别下载。
+        paper 为发起下载的论文，记录在download区间中；默认取提交线程当前正在处理的论文。
+        """
+        paper = paper or TRACER.current_paper()
+        dataset_info = self.downloader.resolve_dataset_info(dataset_info)
+        key = target_key(dataset_info)
+
+        with self._lock:
+            self.submitted += 1
+            if key in self._jobs:
+                self.coalesced += 1
+                logger.info(f"数据集 {name} 与已有下载任务相同({key})，合并处理")
+                self._learn_on_success(self._jobs[key], name, dataset_info)
+                return self._jobs[key]
+
+            path = self._history_keys.get(key)
+            # URL目标交给download_from_url做条件请求，未变化时只需一次304往返
+            if path and os.path.exists(path) and not key.startswith("url:"):
+                logger.info(f"数据集 {name} 已存在于下载历史，跳过下载")
+                future = Future()
+                future.set_result(f"已存在: {path}")
+            else:
+                logger.info(f"下载数据集: {name} ({key})")
+                future = self.executor.submit(self._download, name, key, dataset_info, paper)
+            self._jobs[key] = future
+            self._learn_on_success(future, name, dataset_info)
+            if self.retry_failed:
+                future.add_done_callback(lambda done, key=key: self._forget_failed(key, done))
+            return future
+
+    def _forget_failed(self, key: str, future: Future):
+        """移除失败的任务，使后续请求重新下载"""
+        if future.exception() is None and self.downloader.is_successful(future.result()):
+            return
+        with self._lock:
+            if self._jobs.get(key) is future:
+                del self._jobs[key]
+
+    def _download(self, name: str, key: str, dataset_info, paper: Optional[str] = None) -> str:
+        """在下载线程中执行下载，并记录带论文ID的download区间"""
+        with TRACER.paper(paper), TRACER.span("download", dataset=name, target=key) as span:
+            result = self.downloader.download(dataset_info)
+            span["success"] = self.downloader.is_successful(result)
+            return result
+
+    def _learn_on_success(self, future: Future, name: str, dataset_info):
+        """下载成功后把论文中的数据集名称记入本地数据集目录"""
+        registry = getattr(self.downloader, "registry", None)
+        if registry is None or not isinstance(dataset_info, (tuple, list)):
+            return
+
+        def learn(done: Future):
+            try:
+                if not done.exception() and self.downloader.is_successful(done.result()):
+                    registry.learn(name, dataset_info)
+            except Exception as e:
+                logger.warning(f"更新数据集目录失败: {str(e)}")
+
+        future.add_done_callback(learn)
+
+    @staticmethod
+    def collect(futures: Dict[str, Future]) -> Dict[str, str]:
+        """等待一组下载任务完成，返回 {"数据集名称": "结果消息"}"""
+        results = {}
+        for name, future in futures.items():
+            try:
+                results[name] = future.result()
+            except CancelledError:
+                results[name] = "已取消"
+            except Exception as e:
+                logger.error(f"下载 {name} 时出错: {str(e)}")
+                results[name] = f"下载失败: {str(e)}"
+        return results
+
+    def shutdown(self, wait: bool = True, cancel_pending: bool = False):
+        """关闭下载线程池
+
+        cancel_pending=True（如被Ctrl-C中断时）取消尚未开始的下载，只等待正在进行的下载结束。
+        """
+        if cancel_pending:
+            with self._lock:
+                cancelled = sum(1 for future in self._jobs.values() if future.cancel())
+            if cancelled:
+                logger.warning(f"已取消{cancelled}个排队中的下载任务")
+        self.executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+        if self.submitted:
+            logger.info(f"下载队列: 共{self.submitted}个请求，合并{self.coalesced}个重复目标")
@@ -0,0 +1,217 @@
+import os
+import re
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional, Any, Iterable, Tuple
+
+from tool.dataset_registry import registry_key, trigrams, variant_tokens
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+INDEX_FILENAME = "mention_index.sqlite"
+
+TOKEN_PATTERN = re.compile(r'[0-9a-z]+|\+')
+# 紧跟在名称之后、表示另一个版本的内容："+"、"-X"、版本号（"-100"、".1"、" 2.2"、"v2"）
+VARIANT_FOLLOWER = re.compile(r'\+|-[a-z]\b|(?:[-.]|\s?v?)\d')
+
+
+def tokenize(text: str) -> Tuple[str, List[Tuple[str, int]]]:
+    """返回小写文本及其 (词, 结束位置) 列表，"+" 记为 "plus"，与 registry_key 一致"""
+    lowered = text.lower()
+    return lowered, [("plus" if m.group() == "+" else m.group(), m.end()) for m in TOKEN_PATTERN.finditer(lowered)]
+
+
+def mentions(key: str, tokenized: Tuple[str, List[Tuple[str, int]]]) -> bool:
+    """规范化的数据集键是否以完整词的形式出现在句子中
+
+    键必须恰好等于若干个连续词的拼接（"Hotpot QA"、"CIFAR-10" 均可匹配），且其后不能紧跟
+    版本号或变体后缀，因此 "CIFAR-100" 不算 CIFAR-10 的提及，"HumanEval+" 不算 HumanEval 的提及。
+    """
+    lowered, tokens = tokenized
+    for start in range(len(tokens)):
+        joined = ""
+        for token, end in tokens[start:]:
+            joined += token
+            if not key.startswith(joined):
+                break
+            if joined == key:
+                if not VARIANT_FOLLOWER.match(lowered, end):
+                    return True
+                break
+    return False
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    paper TEXT PRIMARY KEY,
+    path TEXT,
+    sentences INTEGER,
+    indexed_at TEXT
+);
+CREATE TABLE IF NOT EXISTS paper_datasets (
+    paper TEXT,
+    key TEXT,
+    dataset TEXT,
+    source TEXT,
+    target TEXT,
+    PRIMARY KEY (paper, key)
+);
+CREATE INDEX IF NOT EXISTS idx_paper_datasets_key ON paper_datasets(key);
+CREATE TABLE IF NOT EXISTS mentions (
+    key TEXT,
+    paper TEXT,
+    page INTEGER,
+    sentence TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_mentions_key ON mentions(key, paper);
+CREATE INDEX IF NOT EXISTS idx_mentions_paper ON mentions(paper);
+"""
+
+
+class MentionIndex:
+    """语料级的数据集提及倒排索引（SQLite）
+
+    记录 数据集 -> 论文、页码、句子 以及 论文 -> 数据集 两个方向的映射。每篇论文处理完成后
+    增量更新（同一论文重新处理时整体替换），查询时不需要重新解析PDF或调用LLM。
+    数据集按 registry_key 规范化，"HotPotQA"、"hotpot_qa"、"HotpotQA dataset" 视为同一数据集。
+    查询名称不在索引中时，只接受版本号和后缀一致的模糊匹配，并在结果中标记为近似（approximate）。
+    """
+    def __init__(self, path: str):
+        import sqlite3
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add_paper(self, paper: str, dataset_names: Iterable[str], download_info: Optional[Dict[str, Any]] = None,
+                  sentences: Optional[List[str]] = None, pages: Optional[List[int]] = None,
+                  path: Optional[str] = None):
+        """写入或替换一篇论文的索引
+
+        Args:
+            paper: 论文标识（文件名）
+            dataset_names: LLM提取或目录解析得到的数据集名称
+            download_info: {"数据集名称": [平台, 路径]}，其中的名称同样计入索引
+            sentences: extract_sentences 提取的数据集相关句子
+            pages: 与 sentences 一一对应的页码（从1开始）
+            path: 论文文件路径
+        """
+        download_info = download_info or {}
+        sentences = sentences or []
+        pages = pages or []
+        datasets: Dict[str, Dict[str, Any]] = {}
+        for name in list(dataset_names) + list(download_info):
+            key = registry_key(name)
+            if not key or key in datasets:
+                continue
+            info = download_info.get(name)
+            source, target = (info[0], info[1]) if isinstance(info, (list, tuple)) and len(info) == 2 else (None, info)
+            datasets[key] = {"dataset": name, "source": source, "target": target}
+        # 下载信息中的名称通常比LLM原始输出更规范，补充其平台和目标
+        for name, info in download_info.items():
+            key = registry_key(name)
+            if key in datasets and datasets[key]["target"] is None and isinstance(info, (list, tuple)) and len(info) == 2:
+                datasets[key].update(source=info[0], target=info[1])
+
+        # 数据集名称以完整词出现在句子中即视为一次提及；过短的名称会大量误匹配，只记录论文级关联
+        tokenized = [tokenize(sentence) for sentence in sentences]
+        mention_rows = [(key, paper, pages[i] if i < len(pages) else None, sentences[i])
+                        for key in datasets if len(key) >= 3
+                        for i, text in enumerate(tokenized) if mentions(key, text)]
+
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM paper_datasets WHERE paper = ?", (paper,))
+            self._conn.execute("DELETE FROM mentions WHERE paper = ?", (paper,))
+            self._conn.execute("INSERT OR REPLACE INTO papers VALUES (?, ?, ?, ?)",
+                               (paper, path, len(sentences), datetime.now().isoformat()))
+            self._conn.executemany("INSERT INTO paper_datasets VALUES (?, ?, ?, ?, ?)",
+                                   [(paper, key, d["dataset"], d["source"],
+                                     d["target"] if isinstance(d["target"], (str, type(None))) else str(d["target"]))
+                                    for key, d in datasets.items()])
+            self._conn.executemany("INSERT INTO mentions VALUES (?, ?, ?, ?)", mention_rows)
+        logger.debug(f"已更新提及索引: {paper}, {len(datasets)}个数据集, {len(mention_rows)}条提及")
+
+    def _resolve_key(self, name: str, min_score: float = 0.8) -> Tuple[Optional[str], bool]:
+        """把查询名称解析为索引中的数据集键，返回 (键, 是否为近似匹配)
+
+        先精确匹配；否则做三元组模糊匹配，但只考虑数字/版本号和 "+"、"-X" 后缀与查询
+        完全相同的数据集（CIFAR-100 不会匹配到 CIFAR-10）。
+        """
+        key = registry_key(name)
+        with self._lock:
+            if self._conn.execute("SELECT 1 FROM paper_datasets WHERE key = ? LIMIT 1", (key,)).fetchone():
+                return key, False
+            rows = self._conn.execute("SELECT DISTINCT key, dataset FROM paper_datasets").fetchall()
+        grams = trigrams(key)
+        variant = variant_tokens(name)
+        best, best_score = None, 0.0
+        for candidate, dataset in rows:
+            if variant_tokens(dataset) != variant:
+                continue
+            other = trigrams(candidate)
+            score = 2 * len(grams & other) / (len(grams) + len(other))
+            if score > best_score:
+                best, best_score = candidate, score
+        return (best, True) if best_score >= min_score else (None, False)
+
+    def find_papers(self, name: str, max_sentences: int = 3) -> Dict[str, Any]:
+        """查询使用某数据集的论文及其提及位置；近似匹配的结果带 "approximate": True"""
+        key, approximate = self._resolve_key(name)
+        result = {"query": name, "key": key, "approximate": approximate, "papers": []}
+        if key is None:
+            return result
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.paper, d.dataset, d.source, d.target, p.path FROM paper_datasets d "
+                "LEFT JOIN papers p ON p.paper = d.paper WHERE d.key = ? ORDER BY d.paper", (key,)).fetchall()
+            mentions: Dict[str, List[Dict[str, Any]]] = {}
+            for paper, page, sentence in self._conn.execute(
+                    "SELECT paper, page, sentence FROM mentions WHERE key = ? ORDER BY paper, rowid", (key,)):
+                mentions.setdefault(paper, []).append({"page": page, "sentence": sentence})
+        for paper, dataset, source, target, path in rows:
+            paper_mentions = mentions.get(paper, [])
+            result["papers"].append({
+                "paper": paper,
+                "path": path,
+                "dataset": dataset,
+                "source": source,
+                "target": target,
+                "pages": sorted({m["page"] for m in paper_mentions if m["page"] is not None}),
+                "mention_count": len(paper_mentions),
+                "mentions": paper_mentions[:max_sentences] if max_sentences else paper_mentions
+            })
+        return result
+
+    def paper_datasets(self, paper: str) -> List[Dict[str, Any]]:
+        """查询一篇论文使用的数据集"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT d.dataset, d.key, d.source, d.target, "
+                "(SELECT COUNT(*) FROM mentions m WHERE m.paper = d.paper AND m.key = d.key) "
+                "FROM paper_datasets d WHERE d.paper = ? ORDER BY d.dataset", (paper,)).fetchall()
+        return [{"dataset": dataset, "key": key, "source": source, "target": target, "mention_count": count}
+                for dataset, key, source, target, count in rows]
+
+    def datasets(self) -> List[Dict[str, Any]]:
+        """所有数据集及其被引用的论文数，按论文数从多到少"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, MIN(dataset), COUNT(DISTINCT paper) AS papers FROM paper_datasets "
+                "GROUP BY key ORDER BY papers DESC, key").fetchall()
+        return [{"key": key, "dataset": dataset, "papers": papers} for key, dataset, papers in rows]
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "papers": self._conn.execute("SELECT COUNT(*) FROM papers").fetchone()[0],
+                "datasets": self._conn.execute("SELECT COUNT(DISTINCT key) FROM paper_datasets").fetchone()[0],
+                "mentions": self._conn.execute("SELECT COUNT(*) FROM mentions").fetchone()[0]
+            }
@@ -0,0 +1,206 @@
+import os
+import json
+import time
+import logging
+import threading
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Any
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+class Tracer:
+    """按阶段记录耗时区间（span），输出Chrome trace-event JSON
+
+    未启用时 span() 只返回一个空字典，几乎没有开销。启用后每个span记录为一个
+    "X"（完整）事件，可在 chrome://tracing 或 Perfetto 中查看；span参数会自动
+    带上当前线程正在处理的论文（见 paper()）。
+
+    指定 profile_dir 时，每个阶段（cat="stage"）额外用cProfile采样，结束时按阶段
+    输出 <阶段>.prof 文件，可用 `python -m pstats` 或 snakeviz 查看。同一线程中
+    嵌套的阶段只由最外层阶段采样。
+    """
+    def __init__(self):
+        self.enabled = False
+        self.profile_dir: Optional[str] = None
+        self.events: List[Dict[str, Any]] = []
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        # (阶段, 线程ID) -> cProfile.Profile，同一阶段在同一线程中反复启停累积
+        self._profiles: Dict[tuple, Any] = {}
+        self._threads: Dict[int, str] = {}
+
+    def start(self, profile_dir: Optional[str] = None):
+        """开始记录，profile_dir 不为空时同时按阶段采样cProfile"""
+        self.events = []
+        self._profiles = {}
+        self._threads = {}
+        self._start = time.perf_counter()
+        self.profile_dir = profile_dir
+        self.enabled = True
+
+    def _stack(self) -> List[Dict[str, Any]]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    @contextmanager
+    def paper(self, paper_id: str):
+        """标记当前线程正在处理的论文，期间的span自动带上paper参数"""
+        previous = getattr(self._local, "paper", None)
+        self._local.paper = paper_id
+        try:
+            yield
+        finally:
+            self._local.paper = previous
+
+    def current_paper(self) -> Optional[str]:
+        """当前线程正在处理的论文（由 paper() 设置），没有时返回None"""
+        return getattr(self._local, "paper", None)
+
+    @contextmanager
+    def span(self, name: str, cat: str = "stage", **args):
+        """记录一个耗时区间
+
+        Args:
+            name: 区间名称，如 pdf_open、llm_call
+            cat: 类别；"stage" 类别的区间在启用cProfile时按名称分别采样
+            args: 附加参数，如页数、字节数、token数
+
+        Yields:
+            参数字典，调用方可在区间内补充计数（也可用 annotate()）
+        """
+        if not self.enabled:
+            yield args
+            return
+        paper = getattr(self._local, "paper", None)
+        if paper is not None:
+            args.setdefault("paper", paper)
+        stack = self._stack()
+        stack.append(args)
+        profile = self._enable_profile(name) if cat == "stage" else None
+        start = time.perf_counter()
+        try:
+            yield args
+        except BaseException as e:
+            args["error"] = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            end = time.perf_counter()
+            if profile is not None:
+                profile.disable()
+                self._local.profiling = False
+            stack.pop()
+            self._record(name, cat, start, end, args)
+
+    def annotate(self, **args):
+        """给当前线程最内层的span补充参数，未启用或不在span中时忽略"""
+        if not self.enabled:
+            return
+        stack = self._stack()
+        if stack:
+            stack[-1].update(args)
+
+    def record(self, name: str, start: float, end: float, cat: str = "pipeline", **args):
+        """直接记录一个已结束的区间（start/end 为 time.perf_counter() 值）
+
+        协程在同一线程中交替执行，不能使用基于线程栈的 span()，改用此方法。
+        """
+        if self.enabled:
+            self._record(name, cat, start, end, args)
+
+    def _enable_profile(self, name: str):
+        if not self.profile_dir or getattr(self._local, "profiling", False):
+            return None
+        import cProfile
+        key = (name, threading.get_ident())
+        with self._lock:
+            profile = self._profiles.get(key)
+            if profile is None:
+                profile = self._profiles[key] = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError as e:
+            # Python 3.12+ 同一时刻只允许一个性能分析器，并发线程中的阶段跳过采样
+            logger.debug(f"跳过阶段 {name} 的cProfile采样: {str(e)}")
+            return None
+        self._local.profiling = True
+        return profile
+
+    def _record(self, name: str, cat: str, start: float, end: float, args: Dict[str, Any]):
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "cat": cat,
+            "ph": "X",
+            "ts": round((start - self._start) * 1e6, 1),
+            "dur": round((end - start) * 1e6, 1),
+            "pid": os.getpid(),
+            "tid": thread.ident,
+            "args": args
+        }
+        with self._lock:
+            self.events.append(event)
+            self._threads.setdefault(thread.ident, thread.name)
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        """按区间名称汇总次数和耗时（毫秒）"""
+        totals: Dict[str, Dict[str, Any]] = {}
+        with self._lock:
+            events = list(self.events)
+        for event in events:
+            item = totals.setdefault(event["name"], {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            duration = event["dur"] / 1000
+            item["count"] += 1
+            item["total_ms"] += duration
+            item["max_ms"] = max(item["max_ms"], duration)
+        for item in totals.values():
+            item["total_ms"] = round(item["total_ms"], 2)
+            item["max_ms"] = round(item["max_ms"], 2)
+        return totals
+
+    def save(self, trace_path: str) -> Dict[str, Any]:
+        """写出Chrome trace JSON；启用cProfile时同时按阶段写出 .prof 文件"""
+        pid = os.getpid()
+        with self._lock:
+            events = list(self.events)
+            threads = dict(self._threads)
+        metadata = [{"name": "process_name", "ph": "M", "pid": pid, "args": {"name": "paper_agent"}}]
+        metadata += [{"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}}
+                     for tid, name in threads.items()]
+        trace = {"traceEvents": metadata + events, "displayTimeUnit": "ms"}
+        os.makedirs(os.path.dirname(os.path.abspath(trace_path)), exist_ok=True)
+        with open(trace_path, 'w', encoding='utf-8') as f:
+            json.dump(trace, f, ensure_ascii=False, default=str)
+        logger.info(f"性能追踪已保存到: {trace_path} ({len(events)}个区间)")
+
+        if self.profile_dir:
+            self._dump_profiles()
+        return trace
+
+    def _dump_profiles(self):
+        import pstats
+        os.makedirs(self.profile_dir, exist_ok=True)
+        stages: Dict[str, List[Any]] = {}
+        with self._lock:
+            for (name, _), profile in self._profiles.items():
+                stages.setdefault(name, []).append(profile)
+        for name, profiles in stages.items():
+            try:
+                stats = pstats.Stats(profiles[0])
+                for profile in profiles[1:]:
+                    stats.add(profile)
+            except TypeError:
+                # 阶段从未成功采样（没有数据）
+                continue
+            path = os.path.join(self.profile_dir, f"{name}.prof")
+            stats.dump_stats(path)
+        logger.info(f"各阶段cProfile结果已保存到: {self.profile_dir}")
+
+
+# 进程内全局追踪器，由 main.py 的 --profile 启用
+TRACER = Tracer()
@@ -0,0 +1,232 @@
+import os
+import json
+import time
+import uuid
+import socket
+import hashlib
+import logging
+import threading
+from typing import Dict, List, Tuple, Iterable, Iterator, Optional, Any
+
+from tool.checkpoint import ResultCheckpoint, write_json_atomic
+
+# 设置日志
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def paper_hash(name: str) -> int:
+    """与机器和Python进程无关的稳定哈希（内置hash()每个进程随机化）"""
+    return int.from_bytes(hashlib.sha1(name.encode("utf-8")).digest()[:8], "big")
+
+
+def parse_shard(text: str) -> Tuple[int, int]:
+    """解析 "i/N" 形式的分片参数，i 从0开始"""
+    try:
+        index, count = (int(part) for part in text.split("/"))
+    except ValueError:
+        raise ValueError(f"分片格式应为 i/N，如 0/4: {text}")
+    if count < 1 or not 0 <= index < count:
+        raise ValueError(f"分片编号需满足 0 <= i < N: {text}")
+    return index, count
+
+
+def select_shard(paths: Iterable, index: int, count: int) -> List:
+    """按文件名哈希选出属于第index个分片（共count个）的文件，各节点的划分互不重叠"""
+    return [path for path in paths if paper_hash(os.path.basename(str(path))) % count == index]
+
+
+def default_node_id() -> str:
+    return f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseQueue:
+    """共享文件系统上基于租约的工作队列
+
+    每篇论文对应 <queue_dir>/leases/<键>.lease（处理中）和 <queue_dir>/done/<键>.done
+    （已完成）。节点以 O_CREAT|O_EXCL 原子地创建租约文件来领取论文，处理期间由后台
+    线程定期刷新租约的修改时间；节点崩溃后租约超过 lease_seconds 未刷新，其他节点
+    会接管该论文。
+    """
+    def __init__(self, queue_dir: str, node_id: Optional[str] = None, lease_seconds: float = 600.0):
+        self.queue_dir = queue_dir
+        self.node_id = node_id or default_node_id()
+        self.lease_seconds = lease_seconds
+        self.lease_dir = os.path.join(queue_dir, "leases")
+        self.done_dir = os.path.join(queue_dir, "done")
+        os.makedirs(self.lease_dir, exist_ok=True)
+        os.makedirs(self.done_dir, exist_ok=True)
+        # 论文名称 -> 本节点持有的租约令牌
+        self._held: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._heartbeat: Optional[threading.Thread] = None
+
+    @staticmethod
+    def _key(name: str) -> str:
+        return hashlib.sha1(name.encode("utf-8")).hexdigest()[:20]
+
+    def _lease_path(self, name: str) -> str:
+        return os.path.join(self.lease_dir, f"{self._key(name)}.lease")
+
+    def _done_path(self, name: str) -> str:
+        return os.path.join(self.done_dir, f"{self._key(name)}.done")
+
+    def _read_token(self, path: str) -> Optional[str]:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f).get("token")
+        except (OSError, ValueError, AttributeError):
+            return None
+
+    def is_done(self, name: str) -> bool:
+        return os.path.exists(self._done_path(name))
+
+    def claim(self, name: str) -> bool:
+        """尝试领取一篇论文，成功返回True"""
+        if self.is_done(name):
+            return False
+        lease_path = self._lease_path(name)
+        token = f"{self.node_id}:{uuid.uuid4().hex}"
+        record = json.dumps({"paper": name, "node": self.node_id, "token": token}, ensure_ascii=False)
+        try:
+            fd = os.open(lease_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644)
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(record)
+        except FileExistsError:
+            try:
+                age = time.time() - os.stat(lease_path).st_mtime
+            except FileNotFoundError:
+                # 租约刚被释放，交给下一轮领取
+                return False
+            if age < self.lease_seconds:
+                return False
+            # 租约过期：写临时文件后rename覆盖，再读回确认没有被其他节点抢先接管
+            tmp_path = f"{lease_path}.{self._key(token)}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write(record)
+            os.replace(tmp_path, lease_path)
+            time.sleep(0.05)
+            if self._read_token(lease_path) != token:
+                return False
+            logger.warning(f"接管过期租约: {name}（{age:.0f}秒未刷新）")
+        # 领取前后之间可能已被其他节点完成
+        if self.is_done(name):
+            self._remove_lease(name, token)
+            return False
+        with self._lock:
+            self._held[name] = token
+        self._ensure_heartbeat()
+        return True
+
+    def _remove_lease(self, name: str, token: str):
+        lease_path = self._lease_path(name)
+        if self._read_token(lease_path) == token:
+            try:
+                os.remove(lease_path)
+            except FileNotFoundError:
+                pass
+
+    def complete(self, name: str):
+        """标记论文已完成并释放租约"""
+        with self._lock:
+            token = self._held.pop(name, None)
+        write_json_atomic({"paper": name, "node": self.node_id, "date": time.time()}, self._done_path(name))
+        if token is not None:
+            self._remove_lease(name, token)
+
+    def release(self, name: str):
+        """放弃租约（未完成），其他节点可以立即领取"""
+        with self._lock:
+            token = self._held.pop(name, None)
+        if token is not None:
+            self._remove_lease(name, token)
+
+    def renew(self):
+        """刷新本节点持有的所有租约"""
+        with self._lock:
+            held = dict(self._held)
+        for name, token in held.items():
+            lease_path = self._lease_path(name)
+            if self._read_token(lease_path) != token:
+                logger.warning(f"租约已被其他节点接管: {name}")
+                with self._lock:
+                    self._held.pop(name, None)
+                continue
+            try:
+                os.utime(lease_path)
+            except OSError as e:
+                logger.warning(f"刷新租约失败: {name}, {str(e)}")
+
+    def _ensure_heartbeat(self):
+        if self._heartbeat is not None:
+            return
+        def beat():
+            while not self._stop.wait(max(1.0, self.lease_seconds / 3)):
+                self.renew()
+        self._heartbeat = threading.Thread(target=beat, name="lease-heartbeat", daemon=True)
+        self._heartbeat.start()
+
+    def claim_each(self, paths: Iterable) -> Iterator:
+        """依次领取并产出可处理的文件；各节点从不同位置开始遍历以减少争用"""
+        paths = list(paths)
+        if not paths:
+            return
+        start = paper_hash(self.node_id) % len(paths)
+        for path in paths[start:] + paths[:start]:
+            if self.claim(os.path.basename(str(path))):
+                yield path
+
+    def close(self):
+        """停止心跳并释放仍持有的租约"""
+        self._stop.set()
+        with self._lock:
+            held = list(self._held)
+        for name in held:
+            self.release(name)
+
+    def status(self, names: Iterable[str]) -> Dict[str, int]:
+        """统计队列状态：已完成、处理中、待处理"""
+        counts = {"done": 0, "leased": 0, "pending": 0}
+        for name in names:
+            if self.is_done(name):
+                counts["done"] += 1
+            elif os.path.exists(self._lease_path(name)):
+                counts["leased"] += 1
+            else:
+                counts["pending"] += 1
+        return counts
+
+
+def shard_output_path(output_path: str, suffix: str) -> str:
+    """分片/节点各自的结果文件路径，如 results.json -> results.shard-0-of-4.json"""
+    root, ext = os.path.splitext(output_path)
+    return f"{root}.{suffix}{ext or '.json'}"
+
+
+def merge_results(input_paths: List[str], output_path: str) -> Dict[str, Dict[str, Any]]:
+    """合并多个分片/节点的结果文件（JSON或JSONL检查点）为一个JSON文件
+
+    同一论文出现多次时，成功的结果优先于出错的结果，其余情况以后读入的为准。
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for path in input_paths:
+        try:
+            if path.endswith(".jsonl"):
+                results = ResultCheckpoint(path).load()
+            else:
+                with open(path, 'r', encoding='utf-8') as f:
+                    results = json.load(f)
+        except Exception as e:
+            logger.error(f"读取结果文件失败: {path}, {str(e)}")
+            continue
+        for paper, result in results.items():
+            previous = merged.get(paper)
+            if previous is not None and "error" not in previous and "error" in result:
+                continue
+            merged[paper] = result
+        logger.info(f"已合并: {path}（{len(results)}篇论文）")
+    merged = dict(sorted(merged.items()))
+    write_json_atomic(merged, output_path)
+    logger.info(f"合并结果已保存到: {output_path}（共{len(merged)}篇论文）")
+    return merged